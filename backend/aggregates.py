@@ -0,0 +1,415 @@
+# -*- coding: utf-8 -*-
+"""
+📊 Tables d'Agrégats Matérialisées
+===================================
+Agrégats par étudiant, module, filière, (filière, module) et (filière,
+année, module), calculés une seule fois par version du dataset dans load_data() puis lus par les routes.
+
+Les tables sont partagées entre toutes les requêtes: une route ne doit
+jamais les modifier en place (faire un .copy() avant d'ajouter des colonnes).
+
+La table des étudiants reçoit aussi le profil ML (K-Means) de chaque
+étudiant, calculé par l'API avec le modèle servi (attacher_profils_ml).
+
+Chaque table garde ses statistiques suffisantes (effectifs, sommes, sommes
+des carrés, min/max, échecs) pour que fusionner_agregats() puisse intégrer
+un lot de nouvelles notes sans tout recalculer.
+"""
+
+from itertools import repeat
+
+import pandas as pd
+import numpy as np
+
+# Seuils de profil (identiques à get_profil dans app.py)
+PROFILS_SEUILS = [
+    (14, "Excellence"),
+    (12, "Régulier"),
+    (10, "En Progression"),
+    (7, "En Difficulté"),
+]
+PROFIL_DEFAUT = "À Risque"
+
+
+def profil_vectorise(moyennes):
+    """Nom du profil pour chaque moyenne (version vectorisée de get_profil)"""
+    moyennes = np.asarray(moyennes, dtype=float)
+    conditions = [moyennes >= seuil for seuil, _ in PROFILS_SEUILS]
+    noms = [nom for _, nom in PROFILS_SEUILS]
+    return np.select(conditions, noms, default=PROFIL_DEFAUT).astype(object)
+
+
+def score_risque_niveau(moyennes, taux_echec):
+    """
+    Score de risque de /api/etudiants-risque: base selon la moyenne
+    + ajustement selon le taux d'échec (max +0.09)
+    """
+    moyennes = np.asarray(moyennes, dtype=float)
+    taux_echec = np.asarray(taux_echec, dtype=float)
+    score_base = np.select(
+        [moyennes < 5, moyennes < 7, moyennes < 10, moyennes < 12],
+        [0.90, 0.70, 0.50, 0.30],
+        default=0.10
+    )
+    bonus = (taux_echec / 100) * 0.09
+    # round() Python (arrondi décimal exact) pour garder les mêmes scores qu'avant
+    return np.array([round(s, 2) for s in np.minimum(0.99, score_base + bonus).tolist()])
+
+
+class Agregats:
+    """Conteneur immuable des agrégats d'une version du dataset"""
+
+    __slots__ = ('etudiants', 'modules', 'filieres', 'filiere_module',
+                 'filiere_annee_module', 'globales', 'profils_count')
+
+    def __init__(self, etudiants, modules, filieres, filiere_module, filiere_annee_module,
+                 globales, profils_count):
+        object.__setattr__(self, 'etudiants', etudiants)
+        object.__setattr__(self, 'modules', modules)
+        object.__setattr__(self, 'filieres', filieres)
+        object.__setattr__(self, 'filiere_module', filiere_module)
+        object.__setattr__(self, 'filiere_annee_module', filiere_annee_module)
+        object.__setattr__(self, 'globales', globales)
+        object.__setattr__(self, 'profils_count', profils_count)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Agregats est immuable - utiliser construire_agregats() ou fusionner_agregats()")
+
+    def modules_filiere(self, filiere, annee=None):
+        """
+        Modules suivis dans une filière (dans une année de la filière si
+        `annee`), lus dans les tables au lieu de parcourir le DataFrame.
+        """
+        if annee is None:
+            table, cle = self.filiere_module, filiere
+        else:
+            table, cle = self.filiere_annee_module, (filiere, annee)
+        try:
+            return table.loc[cle].index.tolist()
+        except KeyError:
+            return []
+
+
+# =============================================================================
+# STATISTIQUES SUFFISANTES
+# =============================================================================
+
+CLES = ['ID', 'Filiere', 'Module']
+
+
+def _valeurs(df):
+    """
+    Colonnes utiles aux agrégats: clés telles quelles (Categorical du
+    DataFrame compact, groupées avec observed=True, sans copie des colonnes
+    projetées en mémoire), mesures en float64.
+    """
+    return pd.DataFrame({
+        'ID': df['ID'],
+        'Filiere': df['Filiere'],
+        'Module': df['Module'],
+        'Annee': df['Annee'].astype(np.int64),
+        'Note_sur_20': df['Note_sur_20'].astype(np.float64),
+        'Total': df['Total'].astype(np.float64),
+        'Practical': df['Practical'].astype(np.float64),
+        'Theoretical': df['Theoretical'].astype(np.float64),
+        'Needs_Support': df['Needs_Support'].astype(np.int64),
+    }, copy=False)
+
+
+def _index_objet(t):
+    """Clés de la table en chaînes (object), que les clés groupées soient Categorical ou non"""
+    if isinstance(t.index, pd.MultiIndex):
+        t.index = pd.MultiIndex.from_arrays(
+            [t.index.get_level_values(i).astype(object) for i in range(t.index.nlevels)],
+            names=t.index.names
+        )
+    else:
+        t.index = t.index.astype(object)
+    return t
+
+
+def _stats_etudiants(v):
+    stats = v.groupby('ID', observed=True).agg(
+        filiere=('Filiere', 'first'),
+        annee=('Annee', 'max'),
+        nb_modules=('Module', 'count'),
+        modules_echec=('Needs_Support', 'sum'),
+        somme_note=('Note_sur_20', 'sum'),
+        min_note=('Note_sur_20', 'min'),
+        somme_total=('Total', 'sum'),
+        min_total=('Total', 'min'),
+        max_total=('Total', 'max'),
+        somme_practical=('Practical', 'sum'),
+        somme_theoretical=('Theoretical', 'sum')
+    )
+    stats['somme_carres_total'] = (v['Total'] ** 2).groupby(v['ID'], observed=True).sum()
+    stats['filiere'] = stats['filiere'].astype(object)
+    return _index_objet(stats)
+
+
+def _stats_modules(v):
+    return _index_objet(v.groupby('Module', observed=True).agg(
+        effectif=('ID', 'count'),
+        nb_echecs=('Needs_Support', 'sum'),
+        somme_note=('Note_sur_20', 'sum'),
+        somme_total=('Total', 'sum'),
+        nb_etudiants=('ID', 'nunique')
+    ))
+
+
+def _stats_filieres(v):
+    return _index_objet(v.groupby('Filiere', observed=True).agg(
+        effectif=('ID', 'count'),
+        nb_echecs=('Needs_Support', 'sum'),
+        somme_note=('Note_sur_20', 'sum'),
+        somme_total=('Total', 'sum'),
+        somme_practical=('Practical', 'sum'),
+        nb_etudiants=('ID', 'nunique'),
+        nb_modules=('Module', 'nunique')
+    ))
+
+
+def _stats_filiere_module(v):
+    return _index_objet(v.groupby(['Filiere', 'Module'], observed=True).agg(
+        effectif=('ID', 'count'),
+        nb_echecs=('Needs_Support', 'sum'),
+        somme_note=('Note_sur_20', 'sum'),
+        nb_etudiants=('ID', 'nunique')
+    ))
+
+
+def _stats_filiere_annee_module(v):
+    # Triée pour les sélections partielles (filière, année) sur le MultiIndex
+    return _index_objet(v.groupby(['Filiere', 'Annee', 'Module'], observed=True).agg(
+        effectif=('ID', 'count')
+    )).sort_index()
+
+
+# =============================================================================
+# COLONNES DÉRIVÉES
+# =============================================================================
+
+def _deriver_etudiants(t):
+    t['moyenne'] = t['somme_note'] / t['nb_modules']
+    t['taux_echec'] = t['modules_echec'] / t['nb_modules'] * 100
+    n = t['nb_modules']
+    variance = (t['somme_carres_total'] - t['somme_total'] ** 2 / n) / (n - 1)
+    t['ecart_type_total'] = np.sqrt(variance.clip(lower=0)).where(n > 1, 0.0)
+    t['profil'] = profil_vectorise(t['moyenne'])
+    t['score_risque'] = np.minimum(0.99, t['taux_echec'] / 100 + (10 - t['moyenne']) / 20)
+    t['score_niveau'] = score_risque_niveau(t['moyenne'], t['taux_echec'])
+    return t
+
+
+def _deriver_modules(t, traduire):
+    t['moyenne'] = t['somme_note'] / t['effectif']
+    t['taux_echec'] = t['nb_echecs'] / t['effectif']
+    t['avg_total'] = t['somme_total'] / t['effectif']
+    if traduire is not None:
+        t['nom_fr'] = [traduire(m) for m in t.index]
+    else:
+        t['nom_fr'] = t.index.astype(str)
+    return t
+
+
+def _deriver_filieres(t):
+    t['moyenne'] = t['somme_note'] / t['effectif']
+    t['taux_echec'] = t['nb_echecs'] / t['effectif']
+    t['avg_total'] = t['somme_total'] / t['effectif']
+    t['avg_practical'] = t['somme_practical'] / t['effectif']
+    return t
+
+
+def _deriver_filiere_module(t):
+    t['moyenne'] = t['somme_note'] / t['effectif']
+    t['taux_echec'] = t['nb_echecs'] / t['effectif']
+    return t
+
+
+def _profils_count(etudiants):
+    moyennes = etudiants['moyenne']
+    return {
+        "Excellence": int((moyennes >= 14).sum()),
+        "Régulier": int(((moyennes >= 12) & (moyennes < 14)).sum()),
+        "En Progression": int(((moyennes >= 10) & (moyennes < 12)).sum()),
+        "En Difficulté": int(((moyennes >= 7) & (moyennes < 10)).sum()),
+        "À Risque": int((moyennes < 7).sum())
+    }
+
+
+def _globales(etudiants, modules, filieres, nb_enregistrements, somme_note, nb_echecs):
+    return {
+        'nb_enregistrements': int(nb_enregistrements),
+        'nb_etudiants': int(len(etudiants)),
+        'nb_modules': int(len(modules)),
+        'nb_filieres': int(len(filieres)),
+        'somme_note': float(somme_note),
+        'nb_echecs': int(nb_echecs),
+        'moyenne_generale': float(somme_note / nb_enregistrements) if nb_enregistrements else 0.0,
+        'taux_echec_global': float(nb_echecs / nb_enregistrements * 100) if nb_enregistrements else 0.0,
+        'nb_etudiants_echec': int((etudiants['modules_echec'] > 0).sum())
+    }
+
+
+# =============================================================================
+# CONSTRUCTION COMPLÈTE
+# =============================================================================
+
+def construire_agregats(df, traduire=None):
+    """
+    Calcule toutes les tables d'agrégats à partir du DataFrame nettoyé.
+
+    - etudiants: indexé par ID (filiere, moyenne, modules_echec, nb_modules,
+      annee, taux_echec, ecart_type_total, profil, score_risque, score_niveau)
+    - modules: indexé par Module (moyenne, taux_echec, nb_etudiants,
+      effectif, avg_total, nom_fr)
+    - filieres (groupe de pairs): indexé par Filiere (moyenne, taux_echec,
+      nb_etudiants, nb_modules, avg_total, avg_practical)
+    - filiere_module: indexé par (Filiere, Module) (moyenne, taux_echec,
+      nb_echecs, effectif, nb_etudiants)
+    - filiere_annee_module: indexé par (Filiere, Annee, Module) (effectif),
+      modules proposés par année de chaque filière
+    """
+    v = _valeurs(df)
+    etudiants = _deriver_etudiants(_stats_etudiants(v))
+    modules = _deriver_modules(_stats_modules(v), traduire)
+    filieres = _deriver_filieres(_stats_filieres(v))
+    filiere_module = _deriver_filiere_module(_stats_filiere_module(v))
+    filiere_annee_module = _stats_filiere_annee_module(v)
+
+    globales = _globales(etudiants, modules, filieres, len(v),
+                         v['Note_sur_20'].sum(), v['Needs_Support'].sum())
+    # Moyenne et taux globaux exacts (identiques à df[...].mean())
+    globales['moyenne_generale'] = float(v['Note_sur_20'].mean())
+    globales['taux_echec_global'] = float(v['Needs_Support'].mean() * 100)
+
+    return Agregats(etudiants, modules, filieres, filiere_module, filiere_annee_module,
+                    globales, _profils_count(etudiants))
+
+
+# =============================================================================
+# MISE À JOUR INCRÉMENTALE
+# =============================================================================
+
+COLONNES_SOMMES = {
+    'etudiants': ['nb_modules', 'modules_echec', 'somme_note', 'somme_total',
+                  'somme_carres_total', 'somme_practical', 'somme_theoretical'],
+    'modules': ['effectif', 'nb_echecs', 'somme_note', 'somme_total', 'nb_etudiants'],
+    'filieres': ['effectif', 'nb_echecs', 'somme_note', 'somme_total', 'somme_practical',
+                 'nb_etudiants', 'nb_modules'],
+    'filiere_module': ['effectif', 'nb_echecs', 'somme_note', 'nb_etudiants'],
+    'filiere_annee_module': ['effectif'],
+}
+COLONNES_ENTIERES = ['annee', 'nb_modules', 'modules_echec', 'effectif', 'nb_echecs',
+                     'nb_etudiants']
+
+
+def _combiner(ancien, partiel, sommes, minimums=(), maximums=(), premiers=()):
+    """Combine les statistiques suffisantes de deux tables de même clé"""
+    index = ancien.index.union(partiel.index)
+    a = ancien.reindex(index)
+    p = partiel.reindex(index)
+    t = pd.DataFrame(index=index)
+    for col in premiers:
+        t[col] = a[col].where(a[col].notna(), p[col])
+    for col in sommes:
+        t[col] = a[col].fillna(0) + p[col].fillna(0)
+    for col in minimums:
+        t[col] = np.fmin(a[col], p[col])
+    for col in maximums:
+        t[col] = np.fmax(a[col], p[col])
+    for col in COLONNES_ENTIERES:
+        if col in t.columns:
+            t[col] = t[col].astype(np.int64)
+    return t
+
+
+def _compter_nouveaux(paires, cle):
+    """Nombre de nouvelles paires par clé (pour les colonnes nunique)"""
+    if not paires:
+        return pd.Series(dtype=np.int64)
+    return pd.DataFrame(list(paires)).groupby(cle).size()
+
+
+def fusionner_agregats(agregats, df_ancien, index_etudiants, nouvelles, traduire=None):
+    """
+    Intègre un lot de nouvelles lignes (déjà nettoyées) aux agrégats existants.
+    Seules les statistiques suffisantes des clés touchées sont additionnées;
+    les comptes distincts (nunique) sont corrigés en vérifiant, pour les seuls
+    étudiants concernés, les paires déjà présentes dans df_ancien.
+
+    Retourne (nouveaux agrégats, IDs des étudiants touchés).
+    """
+    # Lot (quelques lignes) aligné sur les clés des tables: chaînes
+    v = _valeurs(nouvelles.astype({cle: object for cle in CLES}))
+    ids_touches = pd.unique(v['ID']).tolist()
+
+    # Paires (ID, Filière, Module) déjà présentes pour les étudiants touchés
+    existants = set()
+    for sid in ids_touches:
+        lignes = index_etudiants.lignes(df_ancien, sid)
+        existants.update(zip(repeat(sid), lignes['Filiere'].astype(object), lignes['Module'].astype(object)))
+    triplets = set(zip(v['ID'], v['Filiere'], v['Module']))
+
+    paires_module = {(i, m) for i, _, m in triplets} - {(i, m) for i, _, m in existants}
+    paires_filiere = {(i, f) for i, f, _ in triplets} - {(i, f) for i, f, _ in existants}
+    nouveaux_triplets = triplets - existants
+    nouvelles_fm = {(f, m) for _, f, m in triplets} - set(agregats.filiere_module.index)
+
+    # Statistiques partielles du lot, comptes distincts corrigés
+    p_modules = _stats_modules(v)
+    p_modules['nb_etudiants'] = _compter_nouveaux(paires_module, 1).reindex(p_modules.index, fill_value=0)
+    p_filieres = _stats_filieres(v)
+    p_filieres['nb_etudiants'] = _compter_nouveaux(paires_filiere, 1).reindex(p_filieres.index, fill_value=0)
+    p_filieres['nb_modules'] = _compter_nouveaux(nouvelles_fm, 0).reindex(p_filieres.index, fill_value=0)
+    p_fm = _stats_filiere_module(v)
+    p_fm['nb_etudiants'] = _compter_nouveaux(nouveaux_triplets, [1, 2]).reindex(p_fm.index, fill_value=0)
+
+    etudiants = _deriver_etudiants(_combiner(
+        agregats.etudiants, _stats_etudiants(v), COLONNES_SOMMES['etudiants'],
+        minimums=['min_note', 'min_total'], maximums=['annee', 'max_total'], premiers=['filiere']
+    ))
+    if 'profil_ml' in agregats.etudiants:
+        # Profil ML conservé; à recalculer (None) pour les étudiants touchés
+        etudiants['profil_ml'] = agregats.etudiants['profil_ml'].reindex(etudiants.index)
+        etudiants.loc[ids_touches, 'profil_ml'] = None
+    modules = _deriver_modules(_combiner(
+        agregats.modules, p_modules, COLONNES_SOMMES['modules']), traduire)
+    filieres = _deriver_filieres(_combiner(
+        agregats.filieres, p_filieres, COLONNES_SOMMES['filieres']))
+    filiere_module = _deriver_filiere_module(_combiner(
+        agregats.filiere_module, p_fm, COLONNES_SOMMES['filiere_module']))
+    filiere_annee_module = _combiner(
+        agregats.filiere_annee_module, _stats_filiere_annee_module(v),
+        COLONNES_SOMMES['filiere_annee_module']).sort_index()
+
+    anciennes = agregats.globales
+    globales = _globales(
+        etudiants, modules, filieres,
+        anciennes['nb_enregistrements'] + len(v),
+        anciennes['somme_note'] + v['Note_sur_20'].sum(),
+        anciennes['nb_echecs'] + v['Needs_Support'].sum()
+    )
+
+    return (Agregats(etudiants, modules, filieres, filiere_module, filiere_annee_module,
+                     globales, _profils_count(etudiants)),
+            ids_touches)
+
+
+# =============================================================================
+# PROFIL ML
+# =============================================================================
+
+def attacher_profils_ml(agregats, profils):
+    """
+    Agrégats avec la colonne profil_ml de la table des étudiants mise à jour
+    pour les étudiants de `profils` (Series ID -> profil K-Means); les autres
+    gardent leur profil (None si jamais calculé).
+    """
+    etudiants = agregats.etudiants.copy()
+    if 'profil_ml' not in etudiants:
+        etudiants['profil_ml'] = pd.Series(None, index=etudiants.index, dtype=object)
+    profils = profils[profils.index.isin(etudiants.index)]
+    etudiants.loc[profils.index, 'profil_ml'] = profils.to_numpy()
+    return Agregats(etudiants, agregats.modules, agregats.filieres, agregats.filiere_module,
+                    agregats.filiere_annee_module, agregats.globales, agregats.profils_count)
@@ -6,7 +6,7 @@ Backend API pour l'interface React
 Avec Base de Données SQLite + Assistant IA OpenAI
 """
 
-from flask import Flask, jsonify, request, send_file
+from flask import Flask, jsonify, request, send_file, g
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
@@ -21,6 +21,7 @@ from email.mime.multipart import MIMEMultipart
 import hashlib
 import secrets
 import json
+import threading
 from functools import wraps
 from io import BytesIO
 
@@ -34,8 +35,42 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 # Importer le module de base de données
 from database import Database
 
-# Importer l'assistant IA OpenAI
-from openai_assistant import AssistantIA
+# Snapshot colonnaire des données nettoyées
+from data_snapshot import charger_donnees, empreinte_sources, version_snapshot
+
+# Tables d'agrégats matérialisées
+from aggregates import construire_agregats, attacher_profils_ml, profil_vectorise
+
+# Index ID étudiant -> lignes et index des noms de modules
+from indexes import trier_par_id, IndexEtudiants, IndexModules
+
+# Rechargement à chaud (état immuable + remplacement atomique)
+from reload import EtatDonnees, RechargeurDonnees
+
+# Ingestion incrémentale de nouvelles notes
+from ingestion import ingerer_lot
+
+# Moteur de traduction des noms de modules
+from traduction_modules import TraducteurModules
+
+# Cache des prédictions (étudiant, module) par version des données / du modèle
+from cache_predictions import CachePredictions
+
+# Table des risques précalculée (tâche nocturne score_risques.py)
+from table_risques import TableRisques, categorie_reussite, empreinte_historique, empreintes_historiques
+
+# Registre des modèles versionnés (version active / candidate)
+from registre_modeles import (lire_pointeurs, lister_versions, chemins_version, dossier_version,
+                              definir_candidat, promouvoir)
+
+# Évaluation du modèle candidat en mode ombre
+from evaluation_ombre import EvaluationOmbre
+
+# Modèle compilé (arbres XGBoost évalués avec NumPy)
+from modele_compile import compiler_modele, charger_modele_compile, centres_profils, centres_plus_proches
+
+# Features du modèle (mêmes calculs qu'à l'entraînement)
+from feature_engineering import tables_modele, preparer_entrainement, features_candidats, matrice_features
 
 app = Flask(__name__)
 CORS(app)  # Permettre les requêtes cross-origin depuis React
@@ -63,8 +98,6 @@ def init_default_users():
         else:
             print(f"   👤 Utilisateur existant: {username}")
 
-init_default_users()
-
 # =============================================================================
 # CONFIGURATION EMAIL - MULTIPLE SERVICES SUPPORTÉS
 # =============================================================================
@@ -151,9 +184,8 @@ def require_role(*roles):
         def decorated(*args, **kwargs):
             if not hasattr(request, 'current_user'):
                 return jsonify({'error': 'Non authentifié'}), 401
-            if request.current_user['role'] not in roles and 'admin' not in roles:
-                if request.current_user['role'] != 'admin':
-                    return jsonify({'error': 'Permission insuffisante'}), 403
+            if request.current_user['role'] not in roles and request.current_user['role'] != 'admin':
+                return jsonify({'error': 'Permission insuffisante'}), 403
             return f(*args, **kwargs)
         return decorated
     return decorator
@@ -268,10 +300,29 @@ BASE_PATH = Path(__file__).parent.parent
 RAW_PATH = BASE_PATH / "raw"
 OUTPUT_PATH = BASE_PATH / "output_projet4"
 MODEL_PATH = OUTPUT_PATH / "model_soutien_pedagogique.joblib"
+COMPILE_PATH = OUTPUT_PATH / "model_soutien_compile.npz"
+RISQUES_PATH = OUTPUT_PATH / "table_risques.db"
+REGISTRE_PATH = OUTPUT_PATH / "registre"
+OMBRE_PATH = OUTPUT_PATH / "ombre"
+
+# Surveillance des fichiers sources (secondes, 0 = désactivée)
+DATA_WATCH_INTERVAL = int(os.environ.get('DATA_WATCH_INTERVAL', '0'))
+
+# Colonnes projetées depuis le snapshot (pages partagées entre workers WSGI)
+DATA_MMAP = os.environ.get('DATA_MMAP', '1') != '0'
+
+# Cache des prédictions ML: nombre d'entrées (0 = désactivé) et durée de vie (secondes)
+PREDICTION_CACHE_TAILLE = int(os.environ.get('PREDICTION_CACHE_TAILLE', '50000'))
+PREDICTION_CACHE_TTL = int(os.environ.get('PREDICTION_CACHE_TTL', '3600'))
+cache_predictions = CachePredictions(PREDICTION_CACHE_TAILLE, PREDICTION_CACHE_TTL)
+
+# Table des risques: étudiants x modules non passés (taille des lots de calcul)
+table_risques = TableRisques(RISQUES_PATH)
+RISQUES_TAILLE_LOT = int(os.environ.get('RISQUES_TAILLE_LOT', '500'))
 
-# Variables globales
-df = None
-model_data = None
+# Mode ombre: part des prédictions recalculées avec le modèle candidat (0 = désactivé)
+OMBRE_TAUX = float(os.environ.get('OMBRE_TAUX', '0.1'))
+evaluation_ombre = EvaluationOmbre(OMBRE_PATH, OMBRE_TAUX)
 
 # Dictionnaire de traduction
 TRADUCTION_MODULES = {
@@ -303,74 +354,86 @@ TRADUCTION_MODULES = {
     'Unknown': 'Inconnu'
 }
 
+# Construit une fois: automate sur les clés arabes + mémo par nom distinct
+TRADUCTEUR_MODULES = TraducteurModules(TRADUCTION_MODULES)
+
 def traduire_module(nom):
     """Traduit le nom du module"""
-    for ar, fr in TRADUCTION_MODULES.items():
-        if ar in str(nom):
-            return fr
-    return nom
+    return TRADUCTEUR_MODULES.traduire(nom)
 
-def load_data():
-    """Charge les données et le modèle"""
-    global df, model_data
-    
-    print("📊 Chargement des données...")
-    df1 = pd.read_csv(RAW_PATH / "1- one_clean.csv", encoding='utf-8')
-    df2 = pd.read_csv(RAW_PATH / "2- two_clean.csv", encoding='utf-8')
-    df = pd.concat([df1, df2], ignore_index=True)
-    
-    # Nettoyage complet - supprimer tous les Unknown et null
-    taille_avant = len(df)
-    
-    # Supprimer les lignes avec ID null ou Unknown
-    df['ID'] = df['ID'].astype(str)
-    df = df[~df['ID'].isin(['Unknown', 'unknown', 'nan', 'None', ''])].copy()
-    
-    # Supprimer les lignes avec Major Unknown
-    df = df[~df['Major'].astype(str).str.lower().str.contains('unknown', na=False)].copy()
-    
-    # Supprimer les lignes avec Subject Unknown
-    df = df[~df['Subject'].astype(str).str.lower().str.contains('unknown', na=False)].copy()
-    
-    print(f"   • Enregistrements nettoyés: {taille_avant - len(df):,} supprimés")
-    
-    # Renommer colonnes
-    df = df.rename(columns={
-        'Major': 'Filiere', 
-        'Subject': 'Module', 
-        'MajorYear': 'Annee', 
-        'OfficalYear': 'AnneUniversitaire'
-    })
-    
-    df['Practical'] = pd.to_numeric(df['Practical'], errors='coerce').fillna(0)
-    df['Theoretical'] = pd.to_numeric(df['Theoretical'], errors='coerce').fillna(0)
-    df['Total'] = pd.to_numeric(df['Total'], errors='coerce').fillna(df['Practical'] + df['Theoretical'])
-    df['Note_sur_20'] = df['Total'] / 5
-    df['Annee'] = pd.to_numeric(df['Annee'], errors='coerce').fillna(1).astype(int)
-    df['Semester'] = pd.to_numeric(df['Semester'], errors='coerce').fillna(1).astype(int)
-    
-    df['Needs_Support'] = ((df['Status'] == 'Fail') | 
-                           (df['Total'] < 50) | 
-                           (df['Status'].isin(['Absent', 'Debarred', 'Withdrawal']))).astype(int)
-    
-    print(f"✅ {len(df):,} enregistrements chargés")
-    
-    # Charger le modèle ML
-    global model_data
-    if MODEL_PATH.exists():
-        model_data = joblib.load(MODEL_PATH)
-        print("✅ Modèle chargé")
-    else:
-        model_data = None
-        print("⚠️ Modèle non trouvé")
-    
-    # Initialiser l'assistant IA avec les données
-    global assistant_ia
-    
+def chemins_modele():
+    """
+    (chemin .joblib, chemin .npz, version) du modèle servi: version active du
+    registre s'il y en a une, sinon output_projet4/model_soutien_pedagogique.joblib
+    (version None).
+    """
+    actif = lire_pointeurs(REGISTRE_PATH)['actif']
+    if actif:
+        return (*chemins_version(actif, REGISTRE_PATH), actif)
+    return MODEL_PATH, COMPILE_PATH, None
+
+def empreinte_modele():
+    """
+    Version du modèle servi: numéro de version du registre, sinon empreinte
+    du fichier modèle (taille + date de modification), ou None
+    """
+    model_path, _, version = chemins_modele()
+    if version:
+        return version
+    if not model_path.exists():
+        return None
+    stat = model_path.stat()
+    return hashlib.sha1(f"{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+
+def empreinte_fichiers():
+    """Change dès qu'un fichier brut, le modèle ou le candidat du registre change (surveillance)"""
+    return (empreinte_sources(RAW_PATH), empreinte_modele(), lire_pointeurs(REGISTRE_PATH)['candidat'])
+
+def modele_compile(model_data, model_path=MODEL_PATH, compile_path=COMPILE_PATH):
+    """
+    Forme compilée du modèle: le .npz exporté s'il est plus récent que le
+    .joblib, sinon compilée au chargement. None si le modèle n'est pas
+    compilable (évaluation par scikit-learn / XGBoost).
+    """
+    try:
+        if compile_path.exists() and compile_path.stat().st_mtime >= model_path.stat().st_mtime:
+            modele = charger_modele_compile(compile_path)
+            if modele is not None and len(modele.moyenne) == len(model_data['feature_columns']):
+                return modele
+        return compiler_modele(model_data)
+    except Exception as e:
+        print(f"⚠️ Modèle compilé indisponible ({e}) - évaluation scikit-learn")
+        return None
+
+def charger_modele(model_path, compile_path, df):
+    """Charge un modèle (.joblib) avec ses tables de features et sa forme compilée"""
+    model_data = joblib.load(model_path)
+    if 'tables_features' not in model_data:
+        # Modèle antérieur aux tables de features: ajustées sur les données
+        model_data['tables_features'] = tables_modele(model_data, df)
+        print("✅ Tables de features ajustées sur les données")
+    model_data['modele_compile'] = modele_compile(model_data, model_path, compile_path)
+    return model_data
+
+def charger_candidat(version, df):
+    """Modèle candidat du registre {'version', 'model_data'}, ou None (pas de candidat / illisible)"""
+    if not version:
+        return None
+    try:
+        model_path, compile_path = chemins_version(version, REGISTRE_PATH)
+        candidat = {'version': version, 'model_data': charger_modele(model_path, compile_path, df)}
+        print(f"👥 Modèle candidat chargé (version {version}, mode ombre {OMBRE_TAUX:.0%})")
+        return candidat
+    except Exception as e:
+        print(f"⚠️ Modèle candidat {version} non chargé: {e}")
+        return None
+
+def creer_assistant(df, index_etudiants):
+    """Initialise l'assistant IA sur les données (None s'il est indisponible)"""
     # Utiliser la version simulée (gratuite et fonctionnelle)
     try:
         from openai_assistant_simule import AssistantIASimule
-        assistant_ia = AssistantIASimule(df=df)
+        assistant_ia = AssistantIASimule(df=df, index_etudiants=index_etudiants)
         print("✅ Assistant IA Simulé activé (gratuit - aucune API requise)")
     except Exception as e:
         print(f"❌ Assistant IA non disponible: {e}")
@@ -379,13 +442,122 @@ def load_data():
     # Si vous avez une clé OpenAI valide, décommentez ci-dessous:
     # try:
     #     from openai_assistant import AssistantIA
-    #     assistant_ia = AssistantIA(df=df)
+    #     assistant_ia = AssistantIA(df=df, index_etudiants=index_etudiants)
     #     print("🤖 Assistant IA OpenAI initialisé")
     # except Exception as e:
     #     print(f"⚠️ OpenAI non disponible ({e})")
     #     from openai_assistant_simule import AssistantIASimule
-    #     assistant_ia = AssistantIASimule(df=df)
+    #     assistant_ia = AssistantIASimule(df=df, index_etudiants=index_etudiants)
     #     print("✅ Assistant IA Simulé activé (gratuit)")
+    
+    return assistant_ia
+
+def construire_etat(signaler=None):
+    """
+    Construit un nouvel état complet: données, index, agrégats, modèle, assistant.
+    signaler(nom) est appelé au début de chaque étape (progression).
+    """
+    signaler = signaler or (lambda etape: None)
+    
+    signaler('donnees')
+    print("📊 Chargement des données...")
+    df = trier_par_id(charger_donnees(RAW_PATH, compact=True, mmap=DATA_MMAP))
+    
+    signaler('index')
+    index_etudiants = IndexEtudiants(df['ID'])
+    index_modules = IndexModules(df['Module'], traduire=traduire_module)
+    
+    print(f"✅ {len(df):,} enregistrements chargés")
+    
+    # Agrégats par étudiant / module / filière / (filière, module)
+    signaler('agregats')
+    agregats = construire_agregats(df, traduire=traduire_module)
+    print(f"✅ Agrégats calculés ({agregats.globales['nb_etudiants']:,} étudiants, "
+          f"{agregats.globales['nb_modules']} modules)")
+    
+    # Charger le modèle ML
+    signaler('modele')
+    model_path, compile_path, version = chemins_modele()
+    version_modele = empreinte_modele()
+    if model_path.exists():
+        model_data = charger_modele(model_path, compile_path, df)
+        print("✅ Modèle chargé" + (f" (version {version})" if version else "")
+              + (" (évaluation compilée)" if model_data['modele_compile'] else ""))
+    else:
+        model_data = None
+        print("⚠️ Modèle non trouvé")
+    candidat = charger_candidat(lire_pointeurs(REGISTRE_PATH)['candidat'], df)
+    
+    # Profil ML de chaque étudiant, lu par les pages étudiant sans appel au modèle
+    if model_data is not None:
+        agregats = attacher_profils_ml(agregats, profils_ml_etudiants(df, model_data))
+        print("✅ Profils ML calculés")
+    
+    # Initialiser l'assistant IA avec les données
+    signaler('assistant')
+    assistant_ia = creer_assistant(df, index_etudiants)
+    
+    return EtatDonnees(
+        df=df,
+        agregats=agregats,
+        index_etudiants=index_etudiants,
+        index_modules=index_modules,
+        model_data=model_data,
+        assistant_ia=assistant_ia,
+        version_donnees=version_snapshot() or empreinte_sources(RAW_PATH),
+        version_modele=version_modele,
+        candidat=candidat
+    )
+
+# État courant des données: une seule référence, remplacée d'un bloc
+rechargeur = RechargeurDonnees(construire_etat, empreinte=empreinte_fichiers)
+
+def load_data():
+    """Charge les données et le modèle (bloquant)"""
+    rechargeur.recharger(bloquant=True)
+
+def demarrer(bloquant=False):
+    """
+    Démarrage par étapes (serveur de dev ou worker WSGI): le serveur répond
+    tout de suite, utilisateurs par défaut, données, index, agrégats, modèle
+    et assistant sont chargés en arrière-plan (voir /api/health/ready).
+    """
+    def etapes():
+        init_default_users()
+        load_data()
+        if DATA_WATCH_INTERVAL > 0:
+            rechargeur.surveiller(DATA_WATCH_INTERVAL)
+            print(f"👀 Surveillance des données active (toutes les {DATA_WATCH_INTERVAL}s)")
+    
+    if bloquant:
+        etapes()
+    else:
+        threading.Thread(target=etapes, name="demarrage", daemon=True).start()
+
+# Routes qui répondent sans les données (santé, authentification, BDD)
+ROUTES_SANS_DONNEES = {
+    'health_check', 'health_live', 'health_ready', 'static',
+    'login', 'logout', 'get_current_user', 'get_users', 'register_user',
+    'get_interventions', 'create_intervention', 'get_intervention', 'update_intervention',
+    'delete_intervention', 'get_interventions_stats', 'get_interventions_etudiant',
+    'export_interventions_excel', 'get_email_log', 'test_email',
+    'reload_donnees', 'reload_statut', 'get_rapport_types', 'liste_rapports', 'liste_alertes'
+}
+
+@app.before_request
+def epingler_etat():
+    """Chaque requête travaille sur la version des données présente à son arrivée"""
+    g.etat = rechargeur.etat
+    
+    # Tant que le premier chargement n'est pas terminé: 503 (à réessayer)
+    if g.etat.df is None and request.method != 'OPTIONS' and request.endpoint not in ROUTES_SANS_DONNEES:
+        reponse = jsonify({
+            "error": "Données en cours de chargement",
+            "etape": rechargeur.etape,
+            "derniere_erreur": rechargeur.derniere_erreur
+        })
+        reponse.headers['Retry-After'] = '2'
+        return reponse, 503
 
 def get_profil(moyenne):
     """Retourne le profil basé sur la moyenne"""
@@ -412,6 +584,195 @@ def get_recommandation(profil_nom):
     return recommandations.get(profil_nom, "Suivi personnalisé recommandé")
 
 
+def correspondances_modules(module, index_modules=None):
+    """Modules dont le nom contient `module` (recherche insensible à la casse)"""
+    index_modules = index_modules or g.etat.index_modules
+    return [index_modules.noms[c] for c in index_modules.rechercher(module)]
+
+def scorer_matrice(X, model_data, calibre=True, avec_profil=False):
+    """
+    Probabilités pour une matrice de features: forme compilée (NumPy) si
+    disponible, sinon scaler + modèle scikit-learn / XGBoost.
+    calibre=False: booster seul (xgb_model), sans calibration.
+    Retourne (probabilités n x 2, classes, profils K-Means ou None).
+    """
+    compile_ = model_data.get('modele_compile')
+    if compile_ is not None:
+        X_scaled = compile_.normaliser(X.to_numpy())
+        proba = compile_.predict_proba(X_scaled) if calibre else compile_.predict_proba_brut(X_scaled)
+        profils = compile_.profils(X_scaled) if avec_profil else None
+        return proba, compile_.classes_, profils
+    
+    X_scaled = model_data['scaler'].transform(X)
+    model = model_data['model'] if calibre else model_data['xgb_model']
+    proba = model.predict_proba(X_scaled)
+    profils = profils_normalises(X_scaled, model_data) if avec_profil else None
+    return proba, model.classes_, profils
+
+def profils_normalises(X_scaled, model_data):
+    """Profil K-Means de chaque ligne normalisée: centre exporté le plus proche"""
+    centres, noms = centres_profils(model_data)
+    if centres is None:
+        return np.full(len(X_scaled), 'Inconnu', dtype=object)
+    return noms[centres_plus_proches(X_scaled, centres)]
+
+def profils_ml_etudiants(historique, model_data):
+    """
+    🧩 Profil ML (K-Means) de chaque étudiant de l'historique: ligne type de
+    son historique (module cible non précisé, comme /api/predict) affectée au
+    centre le plus proche, pour tous les étudiants en une seule matrice.
+    Retourne une Series ID -> profil (vide sans modèle ou sans K-Means).
+    """
+    if model_data is None or len(historique) == 0 or centres_profils(model_data)[0] is None:
+        return pd.Series(dtype=object)
+    ids = pd.unique(historique['ID'].astype(object))
+    candidats = pd.DataFrame({'ID': ids, 'Module': None})
+    lignes = features_candidats(preparer_entrainement(historique), candidats, model_data['tables_features'])
+    X = matrice_features(lignes, model_data['feature_columns'])
+    
+    compile_ = model_data.get('modele_compile')
+    if compile_ is not None:
+        profils = compile_.profils(compile_.normaliser(X.to_numpy()))
+    else:
+        profils = profils_normalises(model_data['scaler'].transform(X), model_data)
+    return pd.Series(profils, index=pd.Index(ids, name='ID'), dtype=object)
+
+def predire_candidats(historique, candidats, model_data, avec_profil=False,
+                      correspondances=correspondances_modules):
+    """
+    🧠 Prédiction ML pour des couples (étudiant, module cible): features
+    calculées comme à l'entraînement (feature_engineering), une seule
+    matrice et un seul appel au modèle.
+    
+    Retourne un DataFrame (une ligne par candidat): probabilite, prediction
+    (+ profil_ml si avec_profil).
+    """
+    lignes = features_candidats(preparer_entrainement(historique), candidats,
+                                model_data['tables_features'], correspondances=correspondances)
+    X = matrice_features(lignes, model_data['feature_columns'])
+    
+    # 🎯 PRÉDICTION ML ! (classe la plus probable, comme model.predict)
+    try:
+        proba, classes, profils = scorer_matrice(X, model_data, avec_profil=avec_profil)
+    except Exception:
+        # Profil K-Means indisponible: prédiction seule
+        proba, classes, profils = scorer_matrice(X, model_data)
+        profils = 'Inconnu' if avec_profil else None
+    resultats = pd.DataFrame({
+        'probabilite': proba[:, 1],
+        'prediction': classes[proba.argmax(axis=1)].astype(int)
+    })
+    
+    # Clustering pour déterminer le profil
+    if avec_profil:
+        resultats['profil_ml'] = profils
+    return resultats
+
+def predire_modules(student_data_df, modules, avec_profil=False):
+    """
+    Prédiction ML pour un étudiant et plusieurs modules cibles. Les couples
+    présents dans la table des risques précalculée (même modèle, historique
+    inchangé) y sont lus; puis ceux déjà prédits pour la même version des
+    données et du modèle sont lus dans le cache; les autres sont calculés en
+    un seul appel au modèle puis mémorisés.
+    """
+    etat = g.etat
+    id_etudiant = str(student_data_df['ID'].iloc[0])
+    versions = (etat.version_donnees, etat.version_modele)
+    
+    cles = [(id_etudiant, module) for module in modules]
+    
+    precalcules = table_risques.lire(id_etudiant, empreinte_historique(student_data_df), etat.version_modele) or {}
+    resultats = {cle: precalcules[cle[1]] for cle in cles if cle[1] in precalcules}
+    resultats.update(cache_predictions.lire(versions, [cle for cle in cles if cle not in resultats]))
+    manquants = list(dict.fromkeys(module for cle, module in zip(cles, modules) if cle not in resultats))
+    if manquants:
+        candidats = pd.DataFrame({'ID': id_etudiant, 'Module': manquants})
+        calcules = predire_candidats(student_data_df, candidats, etat.model_data, avec_profil=True)
+        nouveaux = {(id_etudiant, module): r for module, r in zip(manquants, calcules.to_dict('records'))}
+        cache_predictions.ecrire(versions, nouveaux)
+        resultats.update(nouveaux)
+    
+    colonnes = ['probabilite', 'prediction'] + (['profil_ml'] if avec_profil else [])
+    predictions = pd.DataFrame([resultats[cle] for cle in cles], columns=colonnes)
+    
+    # Mode ombre: mêmes couples recalculés par le modèle candidat (hors requête)
+    def calculer_candidat(model_data):
+        candidats = pd.DataFrame({'ID': id_etudiant, 'Module': list(modules)})
+        r = predire_candidats(student_data_df, candidats, model_data,
+                              correspondances=lambda m: correspondances_modules(m, etat.index_modules))
+        return r['probabilite'].tolist(), r['prediction'].tolist()
+    evaluation_ombre.soumettre(
+        etat.candidat,
+        [{'source': 'etudiant', 'etudiant': id_etudiant, 'module': module} for module in modules],
+        {'version': etat.version_modele, 'probabilite': predictions['probabilite'].tolist(),
+         'prediction': predictions['prediction'].tolist()},
+        calculer_candidat
+    )
+    return predictions
+
+def lots_risques(etat, taille_lot=RISQUES_TAILLE_LOT, ids=None):
+    """
+    🗂️ Calcul de la table des risques: pour chaque lot d'étudiants, tous les
+    modules non passés de leur filière, prédits avec les mêmes fonctions que
+    le calcul à la demande (une matrice et un appel au modèle par lot).
+    Produit des couples (empreintes des historiques, prédictions).
+    `ids`: étudiants à calculer (tous par défaut).
+    """
+    df = etat.df
+    index = etat.index_etudiants
+    tous = ids is None
+    ids = index.ids.tolist() if tous else list(ids)
+    modules_filiere = {f: list(m) for f, m in df.groupby('Filiere', observed=True)['Module'].unique().items()}
+    correspondances = lambda module: correspondances_modules(module, etat.index_modules)
+    
+    for debut in range(0, len(ids), taille_lot):
+        lot = ids[debut:debut + taille_lot]
+        if tous:
+            # Lot contigu dans le DataFrame trié par ID
+            historique = df.iloc[index.tranche(lot[0]).start:index.tranche(lot[-1]).stop]
+        else:
+            tranches = [index.tranche(id_etudiant) for id_etudiant in lot]
+            historique = df.iloc[np.concatenate([np.arange(t.start, t.stop) for t in tranches])]
+        
+        candidats = []
+        for id_etudiant, lignes in historique.groupby('ID', observed=True, sort=False):
+            passes = set(lignes['Module'].unique())
+            candidats += [(str(id_etudiant), m) for m in modules_filiere[lignes['Filiere'].iloc[0]]
+                          if m not in passes]
+        candidats = pd.DataFrame(candidats, columns=['ID', 'Module'])
+        
+        risques = predire_candidats(historique, candidats, etat.model_data, avec_profil=True,
+                                    correspondances=correspondances)
+        yield empreintes_historiques(historique), pd.concat([candidats, risques], axis=1)
+
+def calculer_table_risques(etat, taille_lot=RISQUES_TAILLE_LOT, incremental=False):
+    """
+    Recalcule la table des risques pour un état chargé.
+    incremental=True: seuls les étudiants dont l'historique a changé depuis le
+    dernier calcul (notes ingérées, nouveaux étudiants) sont recalculés, ceux
+    qui ont disparu des données sont retirés; calcul complet si la table est
+    absente ou calculée avec un autre modèle.
+    Retourne (nombre de lignes écrites, nombre d'étudiants recalculés).
+    """
+    if etat.df is None or etat.model_data is None:
+        raise ValueError("Données ou modèle non chargés")
+    stockees = table_risques.empreintes(etat.version_modele) if incremental else None
+    if stockees is None:
+        nb_lignes = table_risques.ecrire(lots_risques(etat, taille_lot),
+                                         etat.version_modele, etat.version_donnees)
+        return nb_lignes, len(etat.index_etudiants)
+    
+    actuelles = empreintes_historiques(etat.df)
+    a_rescorer = actuelles.index[actuelles.ne(stockees.reindex(actuelles.index)).to_numpy()]
+    supprimes = stockees.index.difference(actuelles.index)
+    # Ordre du DataFrame (positions croissantes)
+    a_rescorer = set(a_rescorer)
+    ids = [id_etudiant for id_etudiant in etat.index_etudiants.ids if str(id_etudiant) in a_rescorer]
+    nb_lignes = table_risques.ecrire(lots_risques(etat, taille_lot, ids), etat.version_modele,
+                                     etat.version_donnees, incremental=True, supprimes=supprimes)
+    return nb_lignes, len(ids)
+
 def predict_with_ml_model(student_data_df, module_name=None):
     """
     🧠 VRAIE PRÉDICTION ML avec le modèle XGBoost entraîné
@@ -419,159 +780,18 @@ def predict_with_ml_model(student_data_df, module_name=None):
     Utilise le modèle chargé pour prédire le risque d'échec
     basé sur l'historique de l'étudiant et la difficulté du module.
     """
-    global model_data, df
+    model_data = g.etat.model_data
     
     if model_data is None:
         return None, "Modèle ML non chargé"
     
     try:
-        # Extraire les composants du modèle
-        calibrated_model = model_data['model']
-        scaler = model_data['scaler']
-        feature_columns = model_data['feature_columns']
-        le_filiere = model_data['le_filiere']
-        kmeans = model_data['kmeans']
-        profil_mapping = model_data['profil_mapping']
-        SEUIL_VALIDATION = model_data['seuil_validation']
-        
-        # Calculer les stats de l'étudiant à partir de son historique
-        student_id = student_data_df['ID'].iloc[0]
-        filiere = student_data_df['Filiere'].iloc[0]
-        
-        # Stats de l'étudiant
-        moyenne_total = student_data_df['Total'].mean()
-        std_total = student_data_df['Total'].std() if len(student_data_df) > 1 else 0
-        min_total = student_data_df['Total'].min()
-        max_total = student_data_df['Total'].max()
-        nb_modules = len(student_data_df)
-        moyenne_note20 = student_data_df['Note_sur_20'].mean()
-        min_note20 = student_data_df['Note_sur_20'].min()
-        moyenne_practical = student_data_df['Practical'].mean()
-        moyenne_theoretical = student_data_df['Theoretical'].mean()
-        taux_echec_etudiant = student_data_df['Needs_Support'].mean()
-        
-        # Stats du module cible (si spécifié)
-        if module_name and df is not None:
-            module_data = df[df['Module'].str.contains(module_name, case=False, na=False, regex=False)]
-            if len(module_data) > 0:
-                module_avg_total = module_data['Total'].mean()
-                module_avg_note20 = module_data['Note_sur_20'].mean()
-                module_taux_echec = module_data['Needs_Support'].mean()
-                module_effectif = len(module_data)
-                
-                # Stats filière-module combo
-                combo_data = module_data[module_data['Filiere'] == filiere]
-                combo_taux_echec = combo_data['Needs_Support'].mean() if len(combo_data) > 0 else module_taux_echec
-            else:
-                module_avg_total = 50
-                module_avg_note20 = 10
-                module_taux_echec = 0.5
-                module_effectif = 100
-                combo_taux_echec = 0.5
-        else:
-            module_avg_total = 50
-            module_avg_note20 = 10
-            module_taux_echec = 0.5
-            module_effectif = 100
-            combo_taux_echec = 0.5
-        
-        # Peer group stats (étudiants de la même filière)
-        peer_data = df[df['Filiere'] == filiere] if df is not None else student_data_df
-        peer_avg_total = peer_data['Total'].mean()
-        peer_avg_note20 = peer_data['Note_sur_20'].mean()
-        peer_avg_practical = peer_data['Practical'].mean()
-        peer_support_rate = peer_data['Needs_Support'].mean()
-        
-        # Construire le vecteur de features
-        features = {
-            'Practical': moyenne_practical,
-            'Theoretical': moyenne_theoretical,
-            'Total': moyenne_total,
-            'Note_sur_20': moyenne_note20,
-            'Semester': 1,
-            'Annee': student_data_df['Annee'].mode().iloc[0] if len(student_data_df) > 0 else 1,
-            
-            # Peer group features
-            'peer_group_avg_total': peer_avg_total,
-            'peer_group_avg_note20': peer_avg_note20,
-            'peer_group_avg_practical': peer_avg_practical,
-            'peer_group_support_rate': peer_support_rate,
-            'deviation_from_peer': moyenne_total - peer_avg_total,
-            'deviation_note20': moyenne_note20 - peer_avg_note20,
-            
-            # Student profile features
-            'student_avg_total': moyenne_total,
-            'student_std_total': std_total if not np.isnan(std_total) else 0,
-            'student_min_total': min_total,
-            'student_max_total': max_total,
-            'student_module_count': nb_modules,
-            'student_avg_note20': moyenne_note20,
-            'student_min_note20': min_note20,
-            'student_avg_practical': moyenne_practical,
-            'student_avg_theoretical': moyenne_theoretical,
-            'student_support_rate': taux_echec_etudiant,
-            
-            # Module features
-            'module_avg_total': module_avg_total,
-            'module_avg_note20': module_avg_note20,
-            'module_taux_echec': module_taux_echec,
-            'module_effectif': module_effectif,
-            
-            # Combo features
-            'combo_taux_echec': combo_taux_echec,
-            'combo_haut_risque': 1 if combo_taux_echec > 0.5 else 0,
-            
-            # Other features
-            'charge_semestre': nb_modules,
-            'taux_absenteisme': 0,
-            'ratio_pratique': moyenne_practical / (moyenne_total + 1),
-            'ecart_theorie_pratique': moyenne_theoretical - moyenne_practical,
-            'modules_rattrapage': (student_data_df['Needs_Support'] == 1).sum(),
-            'distance_seuil': moyenne_note20 - SEUIL_VALIDATION,
-        }
-        
-        # Encoder la filière
-        try:
-            features['Filiere_encoded'] = le_filiere.transform([filiere])[0]
-        except:
-            features['Filiere_encoded'] = 0
-        
-        # Ajouter pole_encoded
-        features['pole_encoded'] = 0
-        
-        # Ajouter les features manquantes (force_* etc.)
-        for col in feature_columns:
-            if col not in features:
-                if col.startswith('force_'):
-                    features[col] = moyenne_note20
-                else:
-                    features[col] = 0
-        
-        # Créer le DataFrame
-        X_new = pd.DataFrame([features])
-        
-        # Réordonner les colonnes selon le modèle
-        X_new = X_new.reindex(columns=feature_columns, fill_value=0)
-        
-        # Normaliser
-        X_new_scaled = scaler.transform(X_new)
-        
-        # 🎯 PRÉDICTION ML !
-        prediction = calibrated_model.predict(X_new_scaled)[0]
-        probabilite = calibrated_model.predict_proba(X_new_scaled)[0, 1]
-        
-        # Clustering pour déterminer le profil
-        try:
-            cluster = kmeans.predict(X_new_scaled)[0]
-            profil_ml = profil_mapping.get(cluster, 'Inconnu')
-        except:
-            profil_ml = 'Inconnu'
-        
+        resultat = predire_modules(student_data_df, [module_name], avec_profil=True).iloc[0]
         return {
-            'probabilite': float(probabilite),
-            'prediction': int(prediction),
-            'profil_ml': profil_ml,
-            'features_used': len(feature_columns)
+            'probabilite': float(resultat['probabilite']),
+            'prediction': int(resultat['prediction']),
+            'profil_ml': resultat['profil_ml'],
+            'features_used': len(model_data['feature_columns'])
         }, None
         
     except Exception as e:
@@ -860,23 +1080,22 @@ def get_interventions_etudiant(etudiant_id):
 @require_auth
 def export_etudiants_excel():
     """Exporter la liste des étudiants en Excel"""
+    df = g.etat.df
+    agregats = g.etat.agregats
+    
     if df is None:
         return jsonify({'error': 'Données non chargées'}), 500
     
     try:
-        # Préparer les données
-        etudiants = df.groupby('ID').agg({
-            'Filiere': 'first',
-            'Note_sur_20': 'mean',
-            'Needs_Support': 'sum',
-            'Module': 'count',
-            'Annee': 'max'
-        }).reset_index()
-        
-        etudiants.columns = ['Code Étudiant', 'Filière', 'Moyenne', 'Modules en Échec', 'Nb Modules', 'Année']
+        # Préparer les données (agrégats précalculés)
+        etudiants = agregats.etudiants[
+            ['filiere', 'moyenne', 'modules_echec', 'nb_modules', 'annee', 'taux_echec']
+        ].reset_index()
+        
+        etudiants.columns = ['Code Étudiant', 'Filière', 'Moyenne', 'Modules en Échec', 'Nb Modules', 'Année', 'Taux Échec (%)']
         etudiants['Moyenne'] = etudiants['Moyenne'].round(2)
-        etudiants['Taux Échec (%)'] = (etudiants['Modules en Échec'] / etudiants['Nb Modules'] * 100).round(1)
-        etudiants['Profil'] = etudiants['Moyenne'].apply(lambda x: get_profil(x)['nom'])
+        etudiants['Taux Échec (%)'] = etudiants['Taux Échec (%)'].round(1)
+        etudiants['Profil'] = profil_vectorise(etudiants['Moyenne'])
         
         # Trier par moyenne
         etudiants = etudiants.sort_values('Moyenne', ascending=True)
@@ -914,23 +1133,22 @@ def export_etudiants_excel():
 @require_auth
 def export_etudiants_risque_excel():
     """Exporter les étudiants à risque en Excel"""
+    df = g.etat.df
+    agregats = g.etat.agregats
+    
     if df is None:
         return jsonify({'error': 'Données non chargées'}), 500
     
     try:
-        etudiants = df.groupby('ID').agg({
-            'Filiere': 'first',
-            'Note_sur_20': 'mean',
-            'Needs_Support': 'sum',
-            'Module': 'count'
-        }).reset_index()
-        
-        etudiants.columns = ['Code Étudiant', 'Filière', 'Moyenne', 'Modules Échec', 'Nb Modules']
-        etudiants['Taux Échec (%)'] = (etudiants['Modules Échec'] / etudiants['Nb Modules'] * 100).round(1)
-        etudiants['Score Risque'] = etudiants.apply(
-            lambda x: min(0.99, x['Taux Échec (%)'] / 100 + (10 - x['Moyenne']) / 20), axis=1
-        ).round(2)
-        etudiants['Profil'] = etudiants['Moyenne'].apply(lambda x: get_profil(x)['nom'])
+        etudiants = agregats.etudiants[
+            ['filiere', 'moyenne', 'modules_echec', 'nb_modules', 'taux_echec', 'profil']
+        ].reset_index()
+        
+        etudiants.columns = ['Code Étudiant', 'Filière', 'Moyenne', 'Modules Échec', 'Nb Modules', 'Taux Échec (%)', 'Profil']
+        etudiants['Taux Échec (%)'] = etudiants['Taux Échec (%)'].round(1)
+        etudiants.insert(6, 'Score Risque', np.minimum(
+            0.99, etudiants['Taux Échec (%)'] / 100 + (10 - etudiants['Moyenne']) / 20
+        ).round(2))
         
         # Filtrer les étudiants à risque
         etudiants_risque = etudiants[etudiants['Score Risque'] > 0.5].copy()
@@ -971,20 +1189,18 @@ def export_etudiants_risque_excel():
 @require_auth
 def export_modules_excel():
     """Exporter les statistiques des modules en Excel"""
+    df = g.etat.df
+    agregats = g.etat.agregats
+    
     if df is None:
         return jsonify({'error': 'Données non chargées'}), 500
     
     try:
-        modules = df.groupby('Module').agg({
-            'Note_sur_20': 'mean',
-            'Needs_Support': 'mean',
-            'ID': 'nunique'
-        }).reset_index()
+        modules = agregats.modules[['moyenne', 'taux_echec', 'nb_etudiants', 'nom_fr']].reset_index()
         
-        modules.columns = ['Module', 'Moyenne', 'Taux Échec', 'Nb Étudiants']
+        modules.columns = ['Module', 'Moyenne', 'Taux Échec', 'Nb Étudiants', 'Module (FR)']
         modules['Moyenne'] = modules['Moyenne'].round(2)
         modules['Taux Échec (%)'] = (modules['Taux Échec'] * 100).round(1)
-        modules['Module (FR)'] = modules['Module'].apply(traduire_module)
         
         # Difficulté
         def get_diff(taux):
@@ -1087,6 +1303,9 @@ def export_interventions_excel():
 @require_role('admin')
 def export_rapport_complet():
     """Exporter un rapport complet en Excel (multi-onglets)"""
+    df = g.etat.df
+    agregats = g.etat.agregats
+    
     if df is None:
         return jsonify({'error': 'Données non chargées'}), 500
     
@@ -1095,11 +1314,12 @@ def export_rapport_complet():
         with pd.ExcelWriter(output, engine='openpyxl') as writer:
             
             # Onglet 1: Résumé
-            nb_etudiants = df['ID'].nunique()
-            nb_modules = df['Module'].nunique()
-            nb_filieres = df['Filiere'].nunique()
-            moyenne = df['Note_sur_20'].mean()
-            taux_echec = df['Needs_Support'].mean() * 100
+            globales = agregats.globales
+            nb_etudiants = globales['nb_etudiants']
+            nb_modules = globales['nb_modules']
+            nb_filieres = globales['nb_filieres']
+            moyenne = globales['moyenne_generale']
+            taux_echec = globales['taux_echec_global']
             
             resume = pd.DataFrame({
                 'Métrique': ['Nombre d\'étudiants', 'Nombre de modules', 'Nombre de filières', 
@@ -1109,36 +1329,22 @@ def export_rapport_complet():
             resume.to_excel(writer, sheet_name='Résumé', index=False)
             
             # Onglet 2: Étudiants
-            etudiants = df.groupby('ID').agg({
-                'Filiere': 'first',
-                'Note_sur_20': 'mean',
-                'Needs_Support': 'sum',
-                'Module': 'count'
-            }).reset_index()
+            etudiants = agregats.etudiants[['filiere', 'moyenne', 'modules_echec', 'nb_modules']].reset_index()
             etudiants.columns = ['Code', 'Filière', 'Moyenne', 'Échecs', 'Modules']
             etudiants['Moyenne'] = etudiants['Moyenne'].round(2)
-            etudiants['Profil'] = etudiants['Moyenne'].apply(lambda x: get_profil(x)['nom'])
+            etudiants['Profil'] = profil_vectorise(etudiants['Moyenne'])
             etudiants.to_excel(writer, sheet_name='Étudiants', index=False)
             
             # Onglet 3: Modules
-            modules = df.groupby('Module').agg({
-                'Note_sur_20': 'mean',
-                'Needs_Support': 'mean',
-                'ID': 'nunique'
-            }).reset_index()
-            modules.columns = ['Module', 'Moyenne', 'Taux Échec', 'Étudiants']
+            modules = agregats.modules[['moyenne', 'taux_echec', 'nb_etudiants', 'nom_fr']].reset_index()
+            modules.columns = ['Module', 'Moyenne', 'Taux Échec', 'Étudiants', 'Traduction']
             modules['Moyenne'] = modules['Moyenne'].round(2)
             modules['Taux Échec (%)'] = (modules['Taux Échec'] * 100).round(1)
-            modules['Traduction'] = modules['Module'].apply(traduire_module)
+            modules = modules[['Module', 'Moyenne', 'Taux Échec', 'Étudiants', 'Taux Échec (%)', 'Traduction']]
             modules.to_excel(writer, sheet_name='Modules', index=False)
             
             # Onglet 4: Filières
-            filieres = df.groupby('Filiere').agg({
-                'Note_sur_20': 'mean',
-                'Needs_Support': 'mean',
-                'ID': 'nunique',
-                'Module': 'nunique'
-            }).reset_index()
+            filieres = agregats.filieres[['moyenne', 'taux_echec', 'nb_etudiants', 'nb_modules']].reset_index()
             filieres.columns = ['Filière', 'Moyenne', 'Taux Échec', 'Étudiants', 'Modules']
             filieres['Moyenne'] = filieres['Moyenne'].round(2)
             filieres['Taux Échec (%)'] = (filieres['Taux Échec'] * 100).round(1)
@@ -1181,13 +1387,179 @@ def export_rapport_complet():
         return jsonify({'error': str(e)}), 500
 
 
+# =============================================================================
+# ROUTES ADMINISTRATION - RECHARGEMENT DES DONNÉES
+# =============================================================================
+@app.route('/api/admin/reload', methods=['POST'])
+@require_auth
+@require_role('admin')
+def reload_donnees():
+    """Recharge les données et le modèle en arrière-plan (sans interruption)"""
+    lance = rechargeur.recharger()
+    statut = rechargeur.statut()
+    if not lance:
+        return jsonify({"message": "Rechargement déjà en cours", **statut}), 409
+    return jsonify({"message": "Rechargement lancé", **statut}), 202
+
+@app.route('/api/admin/reload', methods=['GET'])
+@require_auth
+@require_role('admin')
+def reload_statut():
+    """État du dernier rechargement et version des données servies"""
+    return jsonify(rechargeur.statut())
+
+@app.route('/api/admin/ingest', methods=['POST'])
+@require_auth
+@require_role('admin')
+def ingest_notes():
+    """
+    Ajoute de nouvelles notes sans recharger toutes les données.
+    Corps JSON {"records": [...]} (colonnes des fichiers raw/*.csv) ou
+    fichier CSV envoyé dans le champ "file".
+    """
+    try:
+        if 'file' in request.files:
+            lignes = pd.read_csv(request.files['file'], encoding='utf-8')
+        else:
+            data = request.get_json(silent=True) or {}
+            lignes = data.get('records')
+            if not isinstance(lignes, list) or not lignes:
+                return jsonify({"error": "Champ 'records' (liste non vide) requis"}), 400
+        
+        resume = rechargeur.appliquer(
+            lambda etat: ingerer_lot(etat, lignes, traduire=traduire_module, creer_assistant=creer_assistant,
+                                     profils_ml=profils_ml_etudiants)
+        )
+        return jsonify({"message": "Notes intégrées", **resume})
+    
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# Opération en cours sur le registre des modèles (une à la fois)
+operation_modele = {'en_cours': None, 'derniere_operation': None, 'derniere_erreur': None}
+verrou_modele = threading.Lock()
+
+def basculer_modele(nom, preparer):
+    """
+    Exécute en arrière-plan une opération du registre: `preparer()` charge
+    le modèle (hors verrou, les requêtes continuent sur l'état courant) et
+    retourne la transformation de l'état, publiée d'un bloc par
+    rechargeur.appliquer(). Retourne False si une opération est en cours.
+    """
+    if not verrou_modele.acquire(blocking=False):
+        return False
+    operation_modele['en_cours'] = nom
+    
+    def executer():
+        try:
+            transformation = preparer()
+            rechargeur.appliquer(lambda etat: (transformation(etat), None))
+            operation_modele['derniere_erreur'] = None
+            print(f"🔁 Registre des modèles: {nom} appliqué (modèle servi {rechargeur.etat.version_modele})")
+        except Exception as e:
+            operation_modele['derniere_erreur'] = str(e)
+            print(f"❌ Registre des modèles: {nom} échoué, l'état courant reste servi: {e}")
+        finally:
+            operation_modele['en_cours'] = None
+            operation_modele['derniere_operation'] = {'operation': nom, 'fin': datetime.now().isoformat()}
+            verrou_modele.release()
+    
+    threading.Thread(target=executer, name="registre-modeles", daemon=True).start()
+    return True
+
+@app.route('/api/admin/modeles', methods=['GET'])
+@require_auth
+@require_role('admin')
+def liste_modeles():
+    """Versions du registre, modèle servi, candidat en mode ombre et ses compteurs"""
+    pointeurs = lire_pointeurs(REGISTRE_PATH)
+    return jsonify({
+        "versions": [{k: v for k, v in meta.items() if k != 'feature_columns'}
+                     for meta in lister_versions(REGISTRE_PATH)],
+        "actif": pointeurs['actif'],
+        "candidat": pointeurs['candidat'],
+        "version_servie": g.etat.version_modele,
+        "candidat_charge": g.etat.candidat['version'] if g.etat.candidat else None,
+        "operation": operation_modele,
+        "ombre": evaluation_ombre.statistiques()
+    })
+
+@app.route('/api/admin/modeles/candidat', methods=['POST'])
+@require_auth
+@require_role('admin')
+def definir_modele_candidat():
+    """
+    Charge en arrière-plan une version du registre comme candidat (mode
+    ombre). Corps JSON {"version": "..."}; {"version": null} retire le candidat.
+    """
+    version = (request.get_json(silent=True) or {}).get('version')
+    if version is not None:
+        try:
+            dossier_version(version, REGISTRE_PATH)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 404
+    
+    def preparer():
+        candidat = charger_candidat(version, rechargeur.etat.df)
+        if version and candidat is None:
+            raise RuntimeError(f"Modèle candidat {version} non chargé")
+        # Pointeur du registre modifié seulement une fois le candidat chargé
+        definir_candidat(version, REGISTRE_PATH)
+        return lambda etat: etat.remplacer(candidat=candidat)
+    
+    if not basculer_modele('candidat', preparer):
+        return jsonify({"error": "Opération déjà en cours sur le registre"}), 409
+    return jsonify({"message": "Chargement du candidat lancé", "candidat": version}), 202
+
+@app.route('/api/admin/modeles/promouvoir', methods=['POST'])
+@require_auth
+@require_role('admin')
+def promouvoir_modele():
+    """
+    Rend une version active sans interruption: chargée en arrière-plan (ou
+    reprise du candidat déjà chargé) puis remplacement atomique du modèle
+    servi. Corps JSON {"version": "..."} (défaut: le candidat courant).
+    """
+    version = (request.get_json(silent=True) or {}).get('version') or \
+        (g.etat.candidat['version'] if g.etat.candidat else None)
+    if not version:
+        return jsonify({"error": "Champ 'version' requis (aucun candidat chargé)"}), 400
+    try:
+        model_path, compile_path = chemins_version(version, REGISTRE_PATH)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    
+    def preparer():
+        etat = rechargeur.etat
+        if etat.candidat and etat.candidat['version'] == version:
+            model_data = etat.candidat['model_data']
+        else:
+            model_data = charger_modele(model_path, compile_path, etat.df)
+        promouvoir(version, REGISTRE_PATH)
+        return lambda etat: etat.remplacer(
+            model_data=model_data,
+            version_modele=version,
+            agregats=attacher_profils_ml(etat.agregats, profils_ml_etudiants(etat.df, model_data)),
+            candidat=None if etat.candidat and etat.candidat['version'] == version else etat.candidat
+        )
+    
+    if not basculer_modele('promotion', preparer):
+        return jsonify({"error": "Opération déjà en cours sur le registre"}), 409
+    return jsonify({"message": "Promotion lancée", "version": version}), 202
+
+
 # =============================================================================
 # ROUTES EXISTANTES
 # =============================================================================
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Vérification de l'état de l'API"""
-    intervention_stats = db.get_intervention_stats()
+    df = g.etat.df
+    model_data = g.etat.model_data
+    
     return jsonify({
         "status": "ok",
         "message": "API Soutien Pédagogique opérationnelle",
@@ -1196,55 +1568,62 @@ def health_check():
         "total_records": len(df) if df is not None else 0,
         "auth_enabled": True,
         "database": "SQLite",
-        "interventions_count": intervention_stats.get('total', 0)
+        "interventions_count": db.count_interventions(),
+        "cache_predictions": cache_predictions.statistiques(),
+        "table_risques": table_risques.statistiques()
     })
 
+@app.route('/api/health/live', methods=['GET'])
+def health_live():
+    """Liveness: le processus répond (aucun accès aux données ni à la BDD)"""
+    return jsonify({"status": "alive"})
+
+@app.route('/api/health/ready', methods=['GET'])
+def health_ready():
+    """Readiness: 200 quand les données sont servies, 503 pendant le chargement"""
+    pret = rechargeur.pret
+    return jsonify({
+        "status": "ready" if pret else "loading",
+        "etape": rechargeur.etape,
+        "etapes": rechargeur.etapes,
+        "derniere_erreur": rechargeur.derniere_erreur,
+        **g.etat.resume()
+    }), 200 if pret else 503
+
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
     """Statistiques générales du système"""
+    df = g.etat.df
+    agregats = g.etat.agregats
+    
     if df is None:
         return jsonify({"error": "Données non chargées"}), 500
     
-    nb_etudiants = df['ID'].nunique()
-    nb_modules = df['Module'].nunique()
-    nb_filieres = df['Filiere'].nunique()
-    moyenne_generale = df['Note_sur_20'].mean()
-    taux_echec_global = df['Needs_Support'].mean() * 100
-    
-    # Répartition par profil
-    etudiants_stats = df.groupby('ID').agg({
-        'Note_sur_20': 'mean',
-        'Filiere': 'first'
-    }).reset_index()
-    
-    profils_count = {
-        "Excellence": len(etudiants_stats[etudiants_stats['Note_sur_20'] >= 14]),
-        "Régulier": len(etudiants_stats[(etudiants_stats['Note_sur_20'] >= 12) & (etudiants_stats['Note_sur_20'] < 14)]),
-        "En Progression": len(etudiants_stats[(etudiants_stats['Note_sur_20'] >= 10) & (etudiants_stats['Note_sur_20'] < 12)]),
-        "En Difficulté": len(etudiants_stats[(etudiants_stats['Note_sur_20'] >= 7) & (etudiants_stats['Note_sur_20'] < 10)]),
-        "À Risque": len(etudiants_stats[etudiants_stats['Note_sur_20'] < 7])
-    }
+    globales = agregats.globales
     
     # Stats par filière
-    filieres_stats = df.groupby('Filiere').agg({
-        'Note_sur_20': 'mean',
-        'Needs_Support': 'mean',
-        'ID': 'nunique'
+    filieres_stats = agregats.filieres[['moyenne', 'taux_echec', 'nb_etudiants']].rename(columns={
+        'moyenne': 'Note_sur_20',
+        'taux_echec': 'Needs_Support',
+        'nb_etudiants': 'ID'
     }).round(2).to_dict('index')
     
     return jsonify({
-        "nb_etudiants": nb_etudiants,
-        "nb_modules": nb_modules,
-        "nb_filieres": nb_filieres,
-        "moyenne_generale": round(moyenne_generale, 2),
-        "taux_echec_global": round(taux_echec_global, 1),
-        "profils_count": profils_count,
+        "nb_etudiants": globales['nb_etudiants'],
+        "nb_modules": globales['nb_modules'],
+        "nb_filieres": globales['nb_filieres'],
+        "moyenne_generale": round(globales['moyenne_generale'], 2),
+        "taux_echec_global": round(globales['taux_echec_global'], 1),
+        "profils_count": dict(agregats.profils_count),
         "filieres_stats": filieres_stats
     })
 
 @app.route('/api/etudiants', methods=['GET'])
 def get_etudiants():
     """Liste des étudiants avec pagination"""
+    df = g.etat.df
+    agregats = g.etat.agregats
+    
     if df is None:
         return jsonify({"error": "Données non chargées"}), 500
     
@@ -1254,26 +1633,16 @@ def get_etudiants():
     filiere_filter = request.args.get('filiere', '', type=str)
     profil_filter = request.args.get('profil', '', type=str)
     
-    # Agrégation par étudiant
-    etudiants = df.groupby('ID').agg({
-        'Filiere': 'first',
-        'Note_sur_20': 'mean',
-        'Needs_Support': 'sum',
-        'Module': 'count',
-        'Annee': 'max'
-    }).reset_index()
-    
-    etudiants.columns = ['id', 'filiere', 'moyenne', 'modules_echec', 'nb_modules', 'annee']
+    # Agrégation par étudiant (précalculée)
+    etudiants = agregats.etudiants[
+        ['filiere', 'moyenne', 'modules_echec', 'nb_modules', 'annee', 'profil']
+    ].rename_axis('id').reset_index()
     
     # Filtres
     if search:
         etudiants = etudiants[etudiants['id'].str.contains(search, case=False)]
     if filiere_filter:
         etudiants = etudiants[etudiants['filiere'] == filiere_filter]
-    
-    # Ajouter profil
-    etudiants['profil'] = etudiants['moyenne'].apply(lambda x: get_profil(x)['nom'])
-    
     if profil_filter:
         etudiants = etudiants[etudiants['profil'] == profil_filter]
     
@@ -1291,6 +1660,7 @@ def get_etudiants():
     for e in etudiants_page:
         e['moyenne'] = round(e['moyenne'], 2)
         e['profil_info'] = get_profil(e['moyenne'])
+        e['profil_ml'] = profil_ml_etudiant(agregats, e['id'])
     
     return jsonify({
         "etudiants": etudiants_page,
@@ -1300,13 +1670,22 @@ def get_etudiants():
         "total_pages": (total + per_page - 1) // per_page
     })
 
+def profil_ml_etudiant(agregats, student_id):
+    """Profil ML précalculé d'un étudiant (None si pas de modèle ou pas encore calculé)"""
+    if 'profil_ml' not in agregats.etudiants or student_id not in agregats.etudiants.index:
+        return None
+    return agregats.etudiants.at[student_id, 'profil_ml']
+
 @app.route('/api/etudiant/<student_id>', methods=['GET'])
 def get_etudiant(student_id):
     """Détails d'un étudiant spécifique"""
+    df = g.etat.df
+    index_etudiants = g.etat.index_etudiants
+    
     if df is None:
         return jsonify({"error": "Données non chargées"}), 500
     
-    etudiant_data = df[df['ID'] == str(student_id)]
+    etudiant_data = index_etudiants.lignes(df, student_id)
     
     if len(etudiant_data) == 0:
         return jsonify({"error": "Étudiant non trouvé"}), 404
@@ -1317,13 +1696,14 @@ def get_etudiant(student_id):
     
     # Détails par module
     modules = []
-    for _, row in etudiant_data.iterrows():
+    noms_fr = TRADUCTEUR_MODULES.traduire_serie(etudiant_data['Module'])
+    for (_, row), nom_fr in zip(etudiant_data.iterrows(), noms_fr):
         modules.append({
-            "nom": traduire_module(row['Module']),
+            "nom": nom_fr,
             "nom_original": row['Module'],
             "note": round(row['Note_sur_20'], 1),
-            "practical": row['Practical'],
-            "theoretical": row['Theoretical'],
+            "practical": float(row['Practical']),
+            "theoretical": float(row['Theoretical']),
             "status": row['Status'],
             "semester": int(row['Semester']),
             "needs_support": bool(row['Needs_Support'])
@@ -1345,6 +1725,7 @@ def get_etudiant(student_id):
         "taux_echec": round(taux_echec, 1),
         "score_risque": round(score_risque, 2),
         "profil": profil,
+        "profil_ml": profil_ml_etudiant(g.etat.agregats, student_id),
         "recommandation": get_recommandation(profil['nom']),
         "modules": sorted(modules, key=lambda x: x['note']),
         "modules_prioritaires": sorted(modules_echec, key=lambda x: x['note'])[:5]
@@ -1353,18 +1734,14 @@ def get_etudiant(student_id):
 @app.route('/api/modules', methods=['GET'])
 def get_modules():
     """Liste des modules avec statistiques"""
+    df = g.etat.df
+    agregats = g.etat.agregats
+    
     if df is None:
         return jsonify({"error": "Données non chargées"}), 500
     
-    modules_stats = df.groupby('Module').agg({
-        'Note_sur_20': 'mean',
-        'Needs_Support': 'mean',
-        'ID': 'nunique'
-    }).reset_index()
-    
-    modules_stats.columns = ['nom', 'moyenne', 'taux_echec', 'nb_etudiants']
+    modules_stats = agregats.modules[['moyenne', 'taux_echec', 'nb_etudiants', 'nom_fr']].rename_axis('nom').reset_index()
     modules_stats['taux_echec'] = modules_stats['taux_echec'] * 100
-    modules_stats['nom_fr'] = modules_stats['nom'].apply(traduire_module)
     
     # Classification difficulté
     def get_difficulte(taux):
@@ -1392,10 +1769,13 @@ def get_modules():
 @app.route('/api/module/<path:module_name>', methods=['GET'])
 def get_module(module_name):
     """Détails d'un module spécifique"""
+    df = g.etat.df
+    index_modules = g.etat.index_modules
+    
     if df is None:
         return jsonify({"error": "Données non chargées"}), 500
     
-    module_data = df[df['Module'].str.contains(module_name, case=False, na=False, regex=False)]
+    module_data = index_modules.lignes(df, module_name)
     
     if len(module_data) == 0:
         return jsonify({"error": "Module non trouvé"}), 404
@@ -1405,7 +1785,7 @@ def get_module(module_name):
     taux_echec = module_data['Needs_Support'].mean() * 100
     
     # Stats par filière
-    filieres_stats = module_data.groupby('Filiere').agg({
+    filieres_stats = module_data.groupby('Filiere', observed=True).agg({
         'Note_sur_20': 'mean',
         'Needs_Support': 'mean',
         'ID': 'count'
@@ -1423,8 +1803,9 @@ def get_module(module_name):
     # Distribution des notes
     bins = [0, 4, 8, 10, 12, 14, 20]
     labels = ['0-4', '4-8', '8-10', '10-12', '12-14', '14-20']
-    module_data['tranche'] = pd.cut(module_data['Note_sur_20'], bins=bins, labels=labels, include_lowest=True)
-    distribution = module_data['tranche'].value_counts().to_dict()
+    # Série locale: module_data est une tranche du DataFrame partagé (pas de colonne ajoutée)
+    tranches = pd.cut(module_data['Note_sur_20'], bins=bins, labels=labels, include_lowest=True)
+    distribution = tranches.value_counts().to_dict()
     distribution = {str(k): int(v) for k, v in distribution.items()}
     
     return jsonify({
@@ -1437,171 +1818,283 @@ def get_module(module_name):
         "distribution": distribution
     })
 
+def lire_entree_prediction(data):
+    """
+    Lit une demande de prédiction (format de /api/predict): liste de modules
+    notés sur 20, ou notes practical / theoretical / total directes.
+    Lève ValueError / TypeError si l'entrée est invalide.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Enregistrement invalide (objet JSON attendu)")
+    
+    # Support pour le nouveau format avec modules
+    modules_input = data.get('modules', [])
+    code_etudiant = data.get('code_etudiant', '')
+    filiere = data.get('filiere', 'EEA')
+    annee = int(data.get('annee', 1))
+    semester = int(data.get('semester', 1))
+    
+    # Si on a des modules, calculer la moyenne
+    if modules_input and len(modules_input) > 0:
+        notes = [m.get('note', 0) for m in modules_input if m.get('note') is not None]
+        if notes:
+            note_sur_20 = sum(notes) / len(notes)
+            total = note_sur_20 * 5  # Convertir sur 100
+            practical = total * 0.4
+            theoretical = total * 0.6
+        else:
+            practical = 0
+            theoretical = 0
+            total = 0
+            note_sur_20 = 0
+    else:
+        # Ancien format direct
+        practical = min(float(data.get('practical', 0)), 50)
+        theoretical = min(float(data.get('theoretical', 0)), 50)
+        total = min(float(data.get('total', practical + theoretical)), 100)
+    
+    return {
+        'code_etudiant': code_etudiant,
+        'modules': modules_input,
+        'filiere': filiere,
+        'annee': annee,
+        'semester': semester,
+        'practical': practical,
+        'theoretical': theoretical,
+        'total': total,
+        'note_sur_20': total / 5
+    }
+
+def historique_entrees(entrees):
+    """
+    Historique construit à partir des entrées (une ligne par module noté,
+    sinon une ligne avec les notes directes), au format des données nettoyées.
+    """
+    lignes = []
+    for i, e in enumerate(entrees):
+        notes = [(m.get('code') or f'module_{j}', float(m['note']))
+                 for j, m in enumerate(e['modules'] or []) if m.get('note') is not None]
+        if notes:
+            # Notes sur 20 -> sur 100 (40% TP / 60% cours, comme lire_entree_prediction)
+            notes_entree = [(module, note * 5 * 0.4, note * 5 * 0.6, note * 5) for module, note in notes]
+        else:
+            notes_entree = [('module_0', e['practical'], e['theoretical'], e['total'])]
+        for module, practical, theoretical, total in notes_entree:
+            lignes.append({
+                'ID': f'entree_{i}',
+                'Filiere': e['filiere'],
+                'Module': module,
+                'Annee': e['annee'],
+                'AnneUniversitaire': '',
+                'Semester': e['semester'],
+                'Practical': practical,
+                'Theoretical': theoretical,
+                'Total': total,
+                'Note_sur_20': total / 5,
+                'Status': 'Fail' if total < 50 else 'Pass'
+            })
+    return pd.DataFrame(lignes)
+
+def matrice_prediction(entrees, model_data):
+    """
+    Matrice de features (une ligne par entrée): features de l'entraînement
+    calculées sur l'historique des entrées, module cible non précisé.
+    """
+    candidats = pd.DataFrame({
+        'ID': [f'entree_{i}' for i in range(len(entrees))],
+        'Module': None,
+        'Semester': [e['semester'] for e in entrees]
+    })
+    historique = preparer_entrainement(historique_entrees(entrees))
+    lignes = features_candidats(historique, candidats, model_data['tables_features'])
+    return matrice_features(lignes, model_data['feature_columns'])
+
+def predire_entrees(entrees, model_data):
+    """
+    Prédictions pour une liste d'entrées: un seul appel au scaler et au
+    modèle. Retourne (prédictions, probabilités de risque).
+    """
+    predictions, probas_risque = scorer_entrees(entrees, model_data)
+    
+    # Mode ombre: mêmes entrées recalculées par le modèle candidat (hors requête)
+    def calculer_candidat(candidat):
+        predictions_candidat, probas_candidat = scorer_entrees(entrees, candidat)
+        return probas_candidat, predictions_candidat
+    evaluation_ombre.soumettre(
+        g.etat.candidat,
+        [{'source': 'predict', 'entree': i, 'etudiant': e.get('code_etudiant'), 'filiere': e.get('filiere')}
+         for i, e in enumerate(entrees)],
+        {'version': g.etat.version_modele, 'probabilite': list(probas_risque), 'prediction': list(predictions)},
+        calculer_candidat
+    )
+    return predictions, probas_risque
+
+def scorer_entrees(entrees, model_data):
+    """Prédictions et probabilités de risque d'un modèle pour des entrées (voir predire_entrees)"""
+    X = matrice_prediction(entrees, model_data)
+    
+    # Prédiction (classe la plus probable, comme model.predict): booster sans calibration
+    if model_data.get('modele_compile') is not None or model_data.get('xgb_model') is not None:
+        proba, classes, _ = scorer_matrice(X, model_data, calibre=False)
+        predictions = classes[proba.argmax(axis=1)].astype(int)
+        probas_risque = proba[:, 1] if proba.shape[1] > 1 else proba[:, 0]
+    else:
+        # Fallback basé sur la note
+        note_sur_20 = X['Note_sur_20'].to_numpy() if 'Note_sur_20' in X else np.zeros(len(entrees))
+        predictions = (note_sur_20 < 10).astype(int)
+        probas_risque = np.maximum(0, (10 - note_sur_20) / 10)
+    return predictions, probas_risque
+
+def resultat_prediction(entree, prediction, proba_risque):
+    """Réponse de /api/predict pour une entrée"""
+    note_sur_20 = entree['note_sur_20']
+    modules_input = entree['modules']
+    proba_risque = float(proba_risque)
+    
+    # Catégorie de risque
+    if proba_risque >= 0.8:
+        categorie = {"niveau": "CRITIQUE", "color": "red", "emoji": "🔴"}
+    elif proba_risque >= 0.6:
+        categorie = {"niveau": "ÉLEVÉ", "color": "orange", "emoji": "🟠"}
+    elif proba_risque >= 0.4:
+        categorie = {"niveau": "MODÉRÉ", "color": "yellow", "emoji": "🟡"}
+    elif proba_risque >= 0.2:
+        categorie = {"niveau": "FAIBLE", "color": "lightgreen", "emoji": "🟢"}
+    else:
+        categorie = {"niveau": "MINIMAL", "color": "green", "emoji": "⚪"}
+    
+    # Profil
+    profil = get_profil(note_sur_20)
+    
+    # Recommandations (liste pour correspondre au frontend)
+    recommandations = []
+    if proba_risque >= 0.8:
+        recommandations = [
+            "🚨 Tutorat individuel URGENT",
+            "📞 Convocation conseiller pédagogique",
+            "📚 Séances de rattrapage obligatoires",
+            "👥 Intégration groupe de soutien"
+        ]
+    elif proba_risque >= 0.6:
+        recommandations = [
+            "📝 Inscription TD de soutien",
+            "📅 Suivi hebdomadaire recommandé",
+            "📖 Révision des fondamentaux",
+            "🎯 Objectifs personnalisés"
+        ]
+    elif proba_risque >= 0.4:
+        recommandations = [
+            "📚 Sessions de révision recommandées",
+            "💻 Ressources en ligne disponibles",
+            "👥 Travail en groupe conseillé"
+        ]
+    elif proba_risque >= 0.2:
+        recommandations = [
+            "📖 Ressources complémentaires disponibles",
+            "🎯 Maintenir le rythme actuel"
+        ]
+    else:
+        recommandations = [
+            "🌟 Excellent travail !",
+            "📈 Ressources avancées disponibles",
+            "👨‍🏫 Possibilité de tutorat pair"
+        ]
+    
+    # Modules similaires à risque (basé sur les modules entrés)
+    modules_similaires = []
+    if modules_input:
+        for m in modules_input:
+            if m.get('note', 20) < 10:
+                modules_similaires.append(m.get('code', 'Module inconnu'))
+    
+    return {
+        "etudiant_code": entree['code_etudiant'] or "NOUVEAU",
+        "risque": bool(prediction),
+        "probabilite": round(proba_risque * 100, 1),
+        "profil": profil.get('nom', 'Non défini') if isinstance(profil, dict) else str(profil),
+        "recommandations": recommandations,
+        "modules_similaires": modules_similaires,
+        "note_sur_20": round(note_sur_20, 1),
+        "categorie_risque": categorie,
+        "details": {
+            "practical": entree['practical'],
+            "theoretical": entree['theoretical'],
+            "total": entree['total'],
+            "filiere": entree['filiere'],
+            "annee": entree['annee'],
+            "semester": entree['semester'],
+            "nb_modules": len(modules_input) if modules_input else 0
+        }
+    }
+
 @app.route('/api/predict', methods=['POST'])
 def predict():
     """Prédiction pour un nouvel étudiant"""
+    model_data = g.etat.model_data
+    
     if model_data is None:
         return jsonify({"error": "Modèle non chargé"}), 500
     
     data = request.json
     
     try:
-        # Support pour le nouveau format avec modules
-        modules_input = data.get('modules', [])
-        code_etudiant = data.get('code_etudiant', '')
-        filiere = data.get('filiere', 'EEA')
-        annee = int(data.get('annee', 1))
-        semester = int(data.get('semester', 1))
-        
-        # Si on a des modules, calculer la moyenne
-        if modules_input and len(modules_input) > 0:
-            notes = [m.get('note', 0) for m in modules_input if m.get('note') is not None]
-            if notes:
-                note_sur_20 = sum(notes) / len(notes)
-                total = note_sur_20 * 5  # Convertir sur 100
-                practical = total * 0.4
-                theoretical = total * 0.6
-            else:
-                practical = 0
-                theoretical = 0
-                total = 0
-                note_sur_20 = 0
-        else:
-            # Ancien format direct
-            practical = min(float(data.get('practical', 0)), 50)
-            theoretical = min(float(data.get('theoretical', 0)), 50)
-            total = min(float(data.get('total', practical + theoretical)), 100)
-            note_sur_20 = total / 5
-        
-        note_sur_20 = total / 5
-        
-        # Créer les features
-        features = {
-            'Practical': practical,
-            'Theoretical': theoretical,
-            'Total': total,
-            'Note_sur_20': note_sur_20,
-            'Semester': semester,
-            'Annee': annee,
-            'Est_Echec': 1 if total < 50 else 0,
-            'Ecart_Validation': total - 50,
-            'Ratio_Practical': practical / total if total > 0 else 0,
-            'Note_Ponderee': note_sur_20 * annee,
-        }
-        
-        # Features encodées
-        le_filiere = model_data.get('le_filiere')
-        if le_filiere and filiere in le_filiere.classes_:
-            features['Filiere_encoded'] = le_filiere.transform([filiere])[0]
-        else:
-            features['Filiere_encoded'] = 0
-        
-        # Ajouter les features manquantes avec des valeurs par défaut
-        feature_columns = model_data.get('feature_columns', [])
-        for col in feature_columns:
-            if col not in features:
-                features[col] = 0
-        
-        # Préparer le vecteur
-        X = pd.DataFrame([features])[feature_columns] if feature_columns else pd.DataFrame([features])
-        
-        # Scaler
-        scaler = model_data.get('scaler')
-        if scaler:
-            X_scaled = scaler.transform(X)
-        else:
-            X_scaled = X.values
-        
-        # Prédiction
-        model = model_data.get('calibrated_model') or model_data.get('xgb_model')
-        if model:
-            prediction = int(model.predict(X_scaled)[0])
-            proba = model.predict_proba(X_scaled)[0]
-            proba_risque = float(proba[1]) if len(proba) > 1 else float(proba[0])
-        else:
-            # Fallback basé sur la note
-            prediction = 1 if note_sur_20 < 10 else 0
-            proba_risque = max(0, (10 - note_sur_20) / 10)
-        
-        # Catégorie de risque
-        if proba_risque >= 0.8:
-            categorie = {"niveau": "CRITIQUE", "color": "red", "emoji": "🔴"}
-        elif proba_risque >= 0.6:
-            categorie = {"niveau": "ÉLEVÉ", "color": "orange", "emoji": "🟠"}
-        elif proba_risque >= 0.4:
-            categorie = {"niveau": "MODÉRÉ", "color": "yellow", "emoji": "🟡"}
-        elif proba_risque >= 0.2:
-            categorie = {"niveau": "FAIBLE", "color": "lightgreen", "emoji": "🟢"}
-        else:
-            categorie = {"niveau": "MINIMAL", "color": "green", "emoji": "⚪"}
-        
-        # Profil
-        profil = get_profil(note_sur_20)
-        
-        # Recommandations (liste pour correspondre au frontend)
-        recommandations = []
-        if proba_risque >= 0.8:
-            recommandations = [
-                "🚨 Tutorat individuel URGENT",
-                "📞 Convocation conseiller pédagogique",
-                "📚 Séances de rattrapage obligatoires",
-                "👥 Intégration groupe de soutien"
-            ]
-        elif proba_risque >= 0.6:
-            recommandations = [
-                "📝 Inscription TD de soutien",
-                "📅 Suivi hebdomadaire recommandé",
-                "📖 Révision des fondamentaux",
-                "🎯 Objectifs personnalisés"
-            ]
-        elif proba_risque >= 0.4:
-            recommandations = [
-                "📚 Sessions de révision recommandées",
-                "💻 Ressources en ligne disponibles",
-                "👥 Travail en groupe conseillé"
-            ]
-        elif proba_risque >= 0.2:
-            recommandations = [
-                "📖 Ressources complémentaires disponibles",
-                "🎯 Maintenir le rythme actuel"
-            ]
-        else:
-            recommandations = [
-                "🌟 Excellent travail !",
-                "📈 Ressources avancées disponibles",
-                "👨‍🏫 Possibilité de tutorat pair"
-            ]
-        
-        # Modules similaires à risque (basé sur les modules entrés)
-        modules_similaires = []
-        if modules_input:
-            for m in modules_input:
-                if m.get('note', 20) < 10:
-                    modules_similaires.append(m.get('code', 'Module inconnu'))
-        
-        return jsonify({
-            "etudiant_code": code_etudiant or "NOUVEAU",
-            "risque": bool(prediction),
-            "probabilite": round(proba_risque * 100, 1),
-            "profil": profil.get('nom', 'Non défini') if isinstance(profil, dict) else str(profil),
-            "recommandations": recommandations,
-            "modules_similaires": modules_similaires,
-            "note_sur_20": round(note_sur_20, 1),
-            "categorie_risque": categorie,
-            "details": {
-                "practical": practical,
-                "theoretical": theoretical,
-                "total": total,
-                "filiere": filiere,
-                "annee": annee,
-                "semester": semester,
-                "nb_modules": len(modules_input) if modules_input else 0
-            }
-        })
+        entree = lire_entree_prediction(data)
+        predictions, probas_risque = predire_entrees([entree], model_data)
+        return jsonify(resultat_prediction(entree, predictions[0], probas_risque[0]))
 
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+# Taille maximale d'un lot pour /api/predict/batch
+PREDICT_BATCH_MAX = int(os.environ.get('PREDICT_BATCH_MAX', '20000'))
+
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    Prédiction pour un lot d'étudiants (une promotion entière).
+    Corps: {"records": [...]} où chaque enregistrement a le format de
+    /api/predict. Une seule matrice de features, un seul appel au scaler et
+    au modèle; résultats dans l'ordre des enregistrements, avec une erreur
+    par enregistrement invalide.
+    """
+    model_data = g.etat.model_data
+    
+    if model_data is None:
+        return jsonify({"error": "Modèle non chargé"}), 500
+    
+    data = request.get_json(silent=True)
+    records = data.get('records') if isinstance(data, dict) else data
+    if not isinstance(records, list):
+        return jsonify({"error": "Champ 'records' (liste) requis"}), 400
+    if len(records) > PREDICT_BATCH_MAX:
+        return jsonify({"error": f"Lot trop volumineux (maximum {PREDICT_BATCH_MAX} enregistrements)"}), 413
+    
+    # Lecture des entrées: les enregistrements invalides sont signalés un par un
+    resultats = [None] * len(records)
+    entrees, positions = [], []
+    for i, record in enumerate(records):
+        try:
+            entrees.append(lire_entree_prediction(record))
+            positions.append(i)
+        except Exception as e:
+            resultats[i] = {"index": i, "error": str(e)}
+    
+    try:
+        if entrees:
+            predictions, probas_risque = predire_entrees(entrees, model_data)
+            for i, entree, prediction, proba in zip(positions, entrees, predictions, probas_risque):
+                resultats[i] = {"index": i, **resultat_prediction(entree, prediction, proba)}
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    
+    nb_erreurs = len(records) - len(entrees)
+    return jsonify({
+        "nb_records": len(records),
+        "nb_predictions": len(entrees),
+        "nb_erreurs": nb_erreurs,
+        "resultats": resultats
+    })
+
 
 @app.route('/api/predict/modules-futurs', methods=['POST'])
 def predict_future_modules():
@@ -1612,6 +2105,11 @@ def predict_future_modules():
     Utilise l'historique de l'étudiant et les statistiques des modules
     pour faire des prédictions préventives.
     """
+    df = g.etat.df
+    model_data = g.etat.model_data
+    agregats = g.etat.agregats
+    index_etudiants = g.etat.index_etudiants
+    
     if df is None or model_data is None:
         return jsonify({"error": "Données ou modèle non chargés"}), 500
     
@@ -1621,8 +2119,8 @@ def predict_future_modules():
         filiere = data.get('filiere', '')  # Optionnel maintenant
         
         # ✅ Si code étudiant fourni, récupérer TOUT depuis la base
-        if code_etudiant and code_etudiant in df['ID'].values:
-            student_history = df[df['ID'] == code_etudiant].copy()
+        if code_etudiant and code_etudiant in index_etudiants:
+            student_history = index_etudiants.lignes(df, code_etudiant).copy()
             
             # 🎯 DÉTECTION AUTOMATIQUE de la filière ET de l'année
             filiere = student_history['Filiere'].iloc[0]
@@ -1637,8 +2135,8 @@ def predict_future_modules():
         moyenne_generale = student_history['Note_sur_20'].mean()
         modules_passes_list = student_history['Module'].unique().tolist() if 'Module' in student_history.columns else []
         
-        # Obtenir tous les modules de la filière
-        all_modules = df[df['Filiere'] == filiere]['Module'].unique().tolist()
+        # Obtenir tous les modules de la filière (agrégats, sans parcourir df)
+        all_modules = agregats.modules_filiere(filiere)
         
         # 🎯 PRÉDIRE POUR TOUTES LES ANNÉES FUTURES (pas juste l'année suivante)
         # Calculer le nombre d'années futures à prédire (jusqu'à l'année 5 max)
@@ -1647,33 +2145,30 @@ def predict_future_modules():
         # Si seulement une année future, limiter aux modules de cette année
         # Sinon, prendre tous les modules non passés
         if len(annees_futures) == 1 and 'Annee' in df.columns:
-            modules_annee_suivante = df[
-                (df['Filiere'] == filiere) & 
-                (df['Annee'] == annees_futures[0])
-            ]['Module'].unique().tolist()
+            modules_annee_suivante = agregats.modules_filiere(filiere, annees_futures[0])
             modules_futurs = [m for m in modules_annee_suivante if m not in modules_passes_list]
         else:
             # Identifier modules futurs (non encore passés) - TOUS
             modules_futurs = [m for m in all_modules if m not in modules_passes_list]
         
-        # Limiter à 25 modules max pour éviter surcharge
-        modules_futurs = modules_futurs[:25]
+        # Prédiction ML pour tous les modules futurs en un seul appel
+        try:
+            ml_preds = predire_modules(student_history, modules_futurs) if modules_futurs else None
+        except Exception as e:
+            print(f"⚠️ ML Error: {e}, using heuristics")
+            ml_preds = None
         
         # Prédire pour chaque module futur
         predictions = []
         
-        for module in modules_futurs:
-            # Utiliser predict_with_ml_model si disponible
-            ml_pred, error = predict_with_ml_model(student_history, module_name=module)
-            
-            if ml_pred and not error:
+        for i, module in enumerate(modules_futurs):
+            if ml_preds is not None:
                 # Utiliser la prédiction ML
-                proba_echec = ml_pred['probabilite']
-                needs_support = ml_pred['prediction']
+                proba_echec = float(ml_preds['probabilite'].iat[i])
+                needs_support = int(ml_preds['prediction'].iat[i])
             else:
                 # Fallback : utiliser statistiques simples
-                module_data = df[df['Module'] == module]
-                module_taux_echec = module_data['Needs_Support'].mean() if len(module_data) > 0 else 0.5
+                module_taux_echec = agregats.modules.at[module, 'taux_echec']
                 
                 # Ajuster selon la moyenne de l'étudiant
                 if moyenne_generale >= 14:
@@ -1689,29 +2184,11 @@ def predict_future_modules():
             
             proba_reussite = 1 - proba_echec
             
-            # Catégoriser le risque
-            if proba_reussite >= 0.8:
-                categorie = {"niveau": "EXCELLENT", "color": "green", "emoji": "✅"}
-                action = "Aucune action nécessaire"
-            elif proba_reussite >= 0.6:
-                categorie = {"niveau": "BON", "color": "lightgreen", "emoji": "🟢"}
-                action = "Suivi normal"
-            elif proba_reussite >= 0.4:
-                categorie = {"niveau": "MODÉRÉ", "color": "yellow", "emoji": "🟡"}
-                action = "Tutorat préventif recommandé"
-            elif proba_reussite >= 0.2:
-                categorie = {"niveau": "RISQUÉ", "color": "orange", "emoji": "🟠"}
-                action = "Tutorat préventif nécessaire"
-            else:
-                categorie = {"niveau": "TRÈS RISQUÉ", "color": "red", "emoji": "🔴"}
-                action = "Reporter si possible ou tutorat intensif"
+            # Catégoriser le risque (mêmes seuils que la table des risques)
+            categorie, action = categorie_reussite(proba_reussite)
             
             # Stats du module
-            module_stats = df[df['Module'] == module].agg({
-                'Note_sur_20': 'mean',
-                'Needs_Support': 'mean',
-                'ID': 'count'
-            })
+            module_stats = agregats.modules.loc[module]
             
             predictions.append({
                 'module': module,
@@ -1722,9 +2199,9 @@ def predict_future_modules():
                 'categorie': categorie,
                 'action_preventive': action,
                 'statistiques_module': {
-                    'moyenne': round(module_stats['Note_sur_20'], 2) if not pd.isna(module_stats['Note_sur_20']) else 10.0,
-                    'taux_echec': round(module_stats['Needs_Support'] * 100, 1) if not pd.isna(module_stats['Needs_Support']) else 50.0,
-                    'nb_etudiants': int(module_stats['ID']) if not pd.isna(module_stats['ID']) else 0
+                    'moyenne': round(module_stats['moyenne'], 2) if not pd.isna(module_stats['moyenne']) else 10.0,
+                    'taux_echec': round(module_stats['taux_echec'] * 100, 1) if not pd.isna(module_stats['taux_echec']) else 50.0,
+                    'nb_etudiants': int(module_stats['effectif'])
                 }
             })
         
@@ -1767,6 +2244,8 @@ def predict_future_modules():
 @app.route('/api/filieres', methods=['GET'])
 def get_filieres():
     """Liste des filières disponibles"""
+    df = g.etat.df
+    
     if df is None:
         return jsonify({"error": "Données non chargées"}), 500
     
@@ -1776,44 +2255,18 @@ def get_filieres():
 @app.route('/api/etudiants-risque', methods=['GET'])
 def get_etudiants_risque():
     """Liste des étudiants à haut risque avec distribution par niveau"""
+    df = g.etat.df
+    agregats = g.etat.agregats
+    
     if df is None:
         return jsonify({"error": "Données non chargées"}), 500
     
     limit = request.args.get('limit', 100, type=int)
     
-    etudiants = df.groupby('ID').agg({
-        'Filiere': 'first',
-        'Note_sur_20': 'mean',
-        'Needs_Support': 'sum',
-        'Module': 'count'
-    }).reset_index()
-    
-    etudiants.columns = ['id', 'filiere', 'moyenne', 'modules_echec', 'nb_modules']
-    etudiants['taux_echec'] = etudiants['modules_echec'] / etudiants['nb_modules'] * 100
-    
-    # Formule de score basée sur la moyenne
-    def calculer_score_risque(row):
-        moyenne = row['moyenne']
-        taux_echec = row['taux_echec']
-        
-        # Score basé principalement sur la moyenne
-        if moyenne < 5:
-            score_base = 0.90  # Critique
-        elif moyenne < 7:
-            score_base = 0.70  # Élevé
-        elif moyenne < 10:
-            score_base = 0.50  # Modéré
-        elif moyenne < 12:
-            score_base = 0.30  # Faible
-        else:
-            score_base = 0.10  # Minimal
-        
-        # Ajustement basé sur le taux d'échec (max +0.09)
-        bonus = (taux_echec / 100) * 0.09
-        
-        return round(min(0.99, score_base + bonus), 2)
-    
-    etudiants['score_risque'] = etudiants.apply(calculer_score_risque, axis=1)
+    # Score basé sur la moyenne + taux d'échec (précalculé dans les agrégats)
+    etudiants = agregats.etudiants[
+        ['filiere', 'moyenne', 'modules_echec', 'nb_modules', 'taux_echec', 'score_niveau']
+    ].rename(columns={'score_niveau': 'score_risque'}).rename_axis('id').reset_index()
     
     # Collecter des étudiants de chaque niveau pour avoir une distribution
     critiques = etudiants[etudiants['score_risque'] >= 0.8].sort_values('score_risque', ascending=False).head(limit // 4)
@@ -1822,7 +2275,6 @@ def get_etudiants_risque():
     faibles = etudiants[(etudiants['score_risque'] >= 0.2) & (etudiants['score_risque'] < 0.4)].sort_values('score_risque', ascending=False).head(limit // 4)
     
     # Combiner tous les niveaux
-    import pandas as pd
     etudiants_risque = pd.concat([critiques, eleves, moderes, faibles])
     etudiants_risque = etudiants_risque.sort_values('score_risque', ascending=False)
     
@@ -1945,15 +2397,16 @@ def liste_rapports():
 @app.route('/api/rapports/global', methods=['GET'])
 def rapport_global():
     """Génère un rapport PDF global"""
+    df = g.etat.df
+    
     try:
         import sys
         sys.path.insert(0, str(BASE_PATH))
         from generate_pdf_reports import generate_global_report
         
-        # Utiliser le DataFrame global déjà préparé
-        global df
+        # Utiliser le DataFrame de la version courante des données
         if df is None:
-            load_data()
+            return jsonify({"error": "Données non chargées"}), 500
         
         fichier = generate_global_report(df)
         
@@ -1972,15 +2425,16 @@ def rapport_global():
 @app.route('/api/rapports/filiere/<filiere>', methods=['GET'])
 def rapport_filiere(filiere):
     """Génère un rapport PDF pour une filière"""
+    df = g.etat.df
+    
     try:
         import sys
         sys.path.insert(0, str(BASE_PATH))
         from generate_pdf_reports import generate_filiere_report
         
-        # Utiliser le DataFrame global déjà préparé
-        global df
+        # Utiliser le DataFrame de la version courante des données
         if df is None:
-            load_data()
+            return jsonify({"error": "Données non chargées"}), 500
         
         fichier = generate_filiere_report(filiere, df)
         
@@ -1999,15 +2453,16 @@ def rapport_filiere(filiere):
 @app.route('/api/rapports/etudiant/<code>', methods=['GET'])
 def rapport_etudiant(code):
     """Génère un rapport PDF pour un étudiant"""
+    df = g.etat.df
+    
     try:
         import sys
         sys.path.insert(0, str(BASE_PATH))
         from generate_pdf_reports import generate_student_report
         
-        # Utiliser le DataFrame global déjà préparé
-        global df
+        # Utiliser le DataFrame de la version courante des données
         if df is None:
-            load_data()
+            return jsonify({"error": "Données non chargées"}), 500
         
         fichier = generate_student_report(code, df)
         
@@ -2026,6 +2481,8 @@ def rapport_etudiant(code):
 @app.route('/api/alertes/preview', methods=['GET'])
 def preview_alertes():
     """Génère les aperçus des alertes email"""
+    df = g.etat.df
+    
     try:
         import sys
         sys.path.insert(0, str(BASE_PATH))
@@ -2054,25 +2511,18 @@ def preview_alertes():
 @app.route('/api/alertes/statistiques', methods=['GET'])
 def stats_alertes():
     """Statistiques sur les alertes potentielles"""
+    df = g.etat.df
+    agregats = g.etat.agregats
+    
     if df is None:
         return jsonify({"error": "Données non chargées"}), 500
     
     # Étudiants à alerter
-    student_stats = df.groupby('ID').agg({
-        'Note_sur_20': 'mean',
-        'Needs_Support': ['sum', 'count']
-    }).reset_index()
-    student_stats.columns = ['ID', 'moyenne', 'echecs', 'total']
-    
-    etudiants_critique = len(student_stats[student_stats['moyenne'] < 7])
-    etudiants_difficulte = len(student_stats[(student_stats['moyenne'] >= 7) & (student_stats['moyenne'] < 10)])
+    etudiants_critique = agregats.profils_count["À Risque"]
+    etudiants_difficulte = agregats.profils_count["En Difficulté"]
     
     # Modules critiques
-    module_stats = df.groupby('Module').agg({
-        'Needs_Support': 'mean'
-    }).reset_index()
-    module_stats['taux'] = module_stats['Needs_Support'] * 100
-    modules_critiques = len(module_stats[module_stats['taux'] >= 50])
+    modules_critiques = int((agregats.modules['taux_echec'] * 100 >= 50).sum())
     
     return jsonify({
         "etudiants_a_alerter": {
@@ -2128,6 +2578,9 @@ def liste_alertes():
 @app.route('/api/alertes/etudiant', methods=['POST', 'OPTIONS'])
 def alerte_etudiant():
     """Envoie une alerte email pour un étudiant"""
+    df = g.etat.df
+    index_etudiants = g.etat.index_etudiants
+    
     if request.method == 'OPTIONS':
         return '', 200
     
@@ -2140,7 +2593,7 @@ def alerte_etudiant():
             return jsonify({"error": "Code étudiant et email requis"}), 400
         
         # Vérifier si l'étudiant existe
-        student_data = df[df['ID'].astype(str) == str(code)]
+        student_data = index_etudiants.lignes(df, code)
         if student_data.empty:
             return jsonify({"error": f"Étudiant {code} non trouvé"}), 404
         
@@ -2285,6 +2738,9 @@ def alerte_etudiant():
 @app.route('/api/alertes/module', methods=['POST', 'OPTIONS'])
 def alerte_module():
     """Envoie une alerte email pour un module critique"""
+    df = g.etat.df
+    index_modules = g.etat.index_modules
+    
     if request.method == 'OPTIONS':
         return '', 200
     
@@ -2297,7 +2753,7 @@ def alerte_module():
             return jsonify({"error": "Nom du module requis"}), 400
         
         # Vérifier si le module existe
-        module_data = df[df['Module'] == module]
+        module_data = index_modules.lignes_module(df, module)
         if module_data.empty:
             return jsonify({"error": f"Module '{module}' non trouvé"}), 404
         
@@ -2438,6 +2894,8 @@ def alerte_module():
 @app.route('/api/alertes/rapport-hebdo', methods=['POST', 'OPTIONS'])
 def alerte_rapport_hebdo():
     """Génère et envoie un rapport hebdomadaire"""
+    agregats = g.etat.agregats
+    
     if request.method == 'OPTIONS':
         return '', 200
     
@@ -2449,15 +2907,13 @@ def alerte_rapport_hebdo():
             return jsonify({"error": "Email requis"}), 400
         
         # Calculer les statistiques
-        nb_etudiants = df['ID'].nunique()
-        nb_risque = len(df[df['Needs_Support'] == 1]['ID'].unique())
-        moyenne_globale = df['Note_sur_20'].mean()
+        nb_etudiants = agregats.globales['nb_etudiants']
+        nb_risque = agregats.globales['nb_etudiants_echec']
+        moyenne_globale = agregats.globales['moyenne_generale']
         
         # Top 5 modules critiques
-        module_stats = df.groupby('Module').agg({
-            'Needs_Support': 'mean'
-        }).reset_index()
-        module_stats['taux_echec'] = module_stats['Needs_Support'] * 100
+        module_stats = agregats.modules[['taux_echec']].reset_index()
+        module_stats['taux_echec'] = module_stats['taux_echec'] * 100
         top_modules = module_stats.nlargest(5, 'taux_echec')
         
         # Générer le rapport
@@ -2629,6 +3085,10 @@ def predict_student_module():
     - Les performances des étudiants similaires
     - Le profil académique de l'étudiant
     """
+    df = g.etat.df
+    index_etudiants = g.etat.index_etudiants
+    index_modules = g.etat.index_modules
+    
     if df is None:
         return jsonify({"error": "Données non chargées"}), 500
     
@@ -2640,7 +3100,7 @@ def predict_student_module():
         return jsonify({"error": "student_id requis"}), 400
     
     # 1. Récupérer l'historique de l'étudiant
-    student_data = df[df['ID'] == student_id]
+    student_data = index_etudiants.lignes(df, student_id)
     
     if len(student_data) == 0:
         return jsonify({"error": f"Étudiant {student_id} non trouvé"}), 404
@@ -2664,8 +3124,8 @@ def predict_student_module():
     module_moyenne = 10
     
     if module_cible:
-        # regex=False pour éviter les erreurs avec les caractères spéciaux (arabe, etc.)
-        module_data = df[df['Module'].str.contains(module_cible, case=False, na=False, regex=False)]
+        # Recherche littérale via l'index des noms de modules (arabe ou français)
+        module_data = index_modules.lignes(df, module_cible)
         if len(module_data) > 0:
             module_taux_echec = (module_data['Needs_Support'].mean()) * 100
             module_moyenne = module_data['Note_sur_20'].mean()
@@ -2821,6 +3281,9 @@ def predict_student_module():
 @app.route('/api/students/search', methods=['GET'])
 def search_students():
     """Recherche d'étudiants par ID partiel"""
+    df = g.etat.df
+    index_etudiants = g.etat.index_etudiants
+    
     if df is None:
         return jsonify({"error": "Données non chargées"}), 500
     
@@ -2831,11 +3294,12 @@ def search_students():
         return jsonify({"students": []})
     
     # Chercher les IDs qui contiennent la requête
-    matching_ids = df[df['ID'].str.contains(query, case=False, na=False)]['ID'].unique()[:limit]
+    ids = index_etudiants.ids
+    matching_ids = ids[ids.str.contains(query, case=False, na=False)].tolist()[:limit]
     
     students = []
     for sid in matching_ids:
-        student_data = df[df['ID'] == sid]
+        student_data = index_etudiants.lignes(df, sid)
         moyenne = student_data['Note_sur_20'].mean()
         filiere = student_data['Filiere'].iloc[0]
         students.append({
@@ -2852,6 +3316,10 @@ def search_students():
 @app.route('/api/modules/search', methods=['GET'])
 def search_modules():
     """Recherche de modules par nom partiel"""
+    df = g.etat.df
+    agregats = g.etat.agregats
+    index_modules = g.etat.index_modules
+    
     if df is None:
         return jsonify({"error": "Données non chargées"}), 500
     
@@ -2861,20 +3329,18 @@ def search_modules():
     if not query or len(query) < 2:
         return jsonify({"modules": []})
     
-    # Chercher les modules qui contiennent la requête
-    matching_modules = df[df['Module'].str.contains(query, case=False, na=False)]['Module'].unique()[:limit]
+    # Chercher les modules qui contiennent la requête (nom arabe ou français)
+    matching_modules = [index_modules.noms[code] for code in index_modules.rechercher(query)][:limit]
     
     modules = []
     for mod in matching_modules:
-        mod_data = df[df['Module'] == mod]
-        taux_echec = mod_data['Needs_Support'].mean() * 100
-        moyenne = mod_data['Note_sur_20'].mean()
+        mod_stats = agregats.modules.loc[mod]
         modules.append({
             "nom": mod,
-            "nom_fr": traduire_module(mod),
-            "taux_echec": round(taux_echec, 1),
-            "moyenne": round(moyenne, 2),
-            "nb_etudiants": len(mod_data)
+            "nom_fr": mod_stats['nom_fr'],
+            "taux_echec": round(mod_stats['taux_echec'] * 100, 1),
+            "moyenne": round(mod_stats['moyenne'], 2),
+            "nb_etudiants": int(mod_stats['effectif'])
         })
     
     return jsonify({"modules": modules})
@@ -2883,11 +3349,15 @@ def search_modules():
 @app.route('/api/students/<student_id>/modules-non-passes', methods=['GET'])
 def get_modules_non_passes(student_id):
     """Retourne les modules que l'étudiant n'a pas encore passés"""
+    df = g.etat.df
+    agregats = g.etat.agregats
+    index_etudiants = g.etat.index_etudiants
+    
     if df is None:
         return jsonify({"error": "Données non chargées"}), 500
     
     # Vérifier que l'étudiant existe
-    student_data = df[df['ID'] == student_id]
+    student_data = index_etudiants.lignes(df, student_id)
     if student_data.empty:
         return jsonify({"error": "Étudiant non trouvé"}), 404
     
@@ -2897,31 +3367,50 @@ def get_modules_non_passes(student_id):
     # Modules déjà passés par l'étudiant
     modules_passes = set(student_data['Module'].unique())
     
-    # Tous les modules de la même filière
-    modules_filiere = df[df['Filiere'] == filiere]['Module'].unique()
+    # Tous les modules de la même filière (agrégats, sans parcourir df)
+    modules_filiere = agregats.modules_filiere(filiere)
     
     # Modules non passés = modules de la filière - modules passés
     modules_non_passes = [m for m in modules_filiere if m not in modules_passes]
     
-    # Calculer les stats pour chaque module non passé
+    # Risque prédit pour l'étudiant (table des risques, sinon calcul à la demande)
+    ml_preds = None
+    if g.etat.model_data is not None and modules_non_passes:
+        try:
+            ml_preds = predire_modules(student_data, modules_non_passes)
+        except Exception as e:
+            print(f"⚠️ ML Error: {e}")
+    
+    # Calculer les stats pour chaque module non passé (agrégats précalculés)
+    stats_modules = agregats.modules
+    stats_filiere = agregats.filiere_module.loc[filiere]
     result = []
-    for mod in modules_non_passes:
-        mod_data = df[df['Module'] == mod]
-        mod_filiere_data = df[(df['Module'] == mod) & (df['Filiere'] == filiere)]
+    for i, mod in enumerate(modules_non_passes):
+        mod_stats = stats_modules.loc[mod]
         
-        taux_echec_global = mod_data['Needs_Support'].mean() * 100 if len(mod_data) > 0 else 50
-        taux_echec_filiere = mod_filiere_data['Needs_Support'].mean() * 100 if len(mod_filiere_data) > 0 else taux_echec_global
-        moyenne = mod_data['Note_sur_20'].mean() if len(mod_data) > 0 else 10
+        taux_echec_global = mod_stats['taux_echec'] * 100
+        taux_echec_filiere = stats_filiere.at[mod, 'taux_echec'] * 100
+        moyenne = mod_stats['moyenne']
         
-        result.append({
+        module = {
             "nom": str(mod),
-            "nom_fr": traduire_module(mod),
+            "nom_fr": mod_stats['nom_fr'],
             "taux_echec": round(float(taux_echec_global), 1),
             "taux_echec_filiere": round(float(taux_echec_filiere), 1),
             "moyenne": round(float(moyenne), 2),
-            "nb_etudiants": int(len(mod_data)),
+            "nb_etudiants": int(mod_stats['effectif']),
             "difficulte": "Difficile" if taux_echec_global >= 50 else "Modéré" if taux_echec_global >= 30 else "Facile"
-        })
+        }
+        if ml_preds is not None:
+            proba_echec = float(ml_preds['probabilite'].iat[i])
+            categorie, action = categorie_reussite(1 - proba_echec)
+            module.update({
+                "probabilite_echec": round(proba_echec * 100, 1),
+                "besoin_soutien": bool(ml_preds['prediction'].iat[i]),
+                "categorie": categorie,
+                "action_preventive": action
+            })
+        result.append(module)
     
     # Trier par taux d'échec décroissant (modules les plus difficiles en premier)
     result.sort(key=lambda x: x['taux_echec'], reverse=True)
@@ -2941,6 +3430,8 @@ def get_modules_non_passes(student_id):
 @app.route('/api/chat/welcome', methods=['GET'])
 def chat_welcome():
     """Message de bienvenue de l'assistant"""
+    assistant_ia = g.etat.assistant_ia
+    
     if assistant_ia is None:
         return jsonify({"error": "Assistant IA non disponible"}), 503
     
@@ -2962,6 +3453,8 @@ def chat_message():
         "context": "Contexte additionnel"  # Optionnel
     }
     """
+    assistant_ia = g.etat.assistant_ia
+    
     if assistant_ia is None:
         return jsonify({"error": "Assistant IA non disponible. Vérifiez la clé OpenAI."}), 503
     
@@ -3001,6 +3494,9 @@ def chat_message():
 @app.route('/api/chat/stats', methods=['GET'])
 def chat_stats():
     """Retourne des statistiques sur l'utilisation de l'assistant IA"""
+    df = g.etat.df
+    assistant_ia = g.etat.assistant_ia
+    
     if assistant_ia is None:
         return jsonify({"error": "Assistant IA non disponible"}), 503
     
@@ -3016,6 +3512,9 @@ def chat_stats():
 @app.route('/api/alertes/test-email', methods=['POST', 'GET'])
 def test_email_simple():
     """Route de test simple pour vérifier l'envoi d'emails avec données complètes"""
+    df = g.etat.df
+    index_etudiants = g.etat.index_etudiants
+    
     try:
         if request.method == 'GET':
             return jsonify({"message": "Route accessible. Utilisez POST pour envoyer un email."})
@@ -3037,8 +3536,8 @@ def test_email_simple():
             }), 500
         
         # Récupérer les données de l'étudiant
-        if code_etudiant and code_etudiant in df['ID'].astype(str).values:
-            student_data = df[df['ID'].astype(str) == code_etudiant]
+        if code_etudiant and code_etudiant in index_etudiants:
+            student_data = index_etudiants.lignes(df, code_etudiant)
             
             # Calculer les statistiques
             moyenne = student_data['Note_sur_20'].mean()
@@ -3262,6 +3761,6 @@ def test_email_simple():
 # =============================================================================
 
 if __name__ == '__main__':
-    load_data()
+    demarrer()
     print("\n🚀 API démarrée sur http://localhost:5000")
     app.run(debug=True, port=5000)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+🗃️ Cache des Prédictions ML
+============================
+Mémorise le résultat du modèle pour un couple (étudiant, module cible):
+les mêmes étudiants sont consultés à répétition (fiche étudiant, modules
+futurs, prédiction avancée) par plusieurs enseignants.
+
+- clé: (version des données, version du modèle, ID étudiant, module)
+- taille bornée: l'entrée la moins récemment utilisée est retirée (LRU)
+- durée de vie: une entrée plus ancienne que `ttl` secondes est recalculée
+- invalidation: un changement de version des données ou du modèle
+  (rechargement, ingestion) vide le cache
+- compteurs: hits, misses, expirations, evictions, invalidations
+
+Un cache par processus (chaque worker WSGI a le sien).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class CachePredictions:
+    """Cache LRU + TTL thread-safe des résultats de prédiction"""
+
+    def __init__(self, taille_max=50000, ttl=3600):
+        self.taille_max = taille_max
+        self.ttl = ttl
+        self._entrees = OrderedDict()
+        self._versions = None
+        self._verrou = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _verifier_versions(self, versions):
+        # Verrou tenu: nouvelle version des données / du modèle -> cache vidé
+        if versions != self._versions:
+            if self._entrees:
+                self.invalidations += 1
+            self._entrees.clear()
+            self._versions = versions
+
+    def lire(self, versions, cles):
+        """
+        Résultats mémorisés pour des clés (ID, module).
+        Retourne {clé: résultat} pour les clés présentes et encore valides.
+        """
+        maintenant = time.monotonic()
+        trouves = {}
+        with self._verrou:
+            self._verifier_versions(versions)
+            for cle in cles:
+                entree = self._entrees.get(cle)
+                if entree is None:
+                    self.misses += 1
+                elif self.ttl and maintenant - entree[0] > self.ttl:
+                    del self._entrees[cle]
+                    self.expirations += 1
+                    self.misses += 1
+                else:
+                    self._entrees.move_to_end(cle)
+                    trouves[cle] = entree[1]
+                    self.hits += 1
+        return trouves
+
+    def ecrire(self, versions, resultats):
+        """Mémorise {clé (ID, module): résultat} pour ces versions"""
+        if self.taille_max <= 0:
+            return
+        maintenant = time.monotonic()
+        with self._verrou:
+            self._verifier_versions(versions)
+            for cle, resultat in resultats.items():
+                self._entrees[cle] = (maintenant, resultat)
+                self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+                self.evictions += 1
+
+    def vider(self):
+        """Vide le cache (les compteurs sont conservés)"""
+        with self._verrou:
+            self._entrees.clear()
+
+    def statistiques(self):
+        """Compteurs et occupation (pour les routes de santé / administration)"""
+        with self._verrou:
+            total = self.hits + self.misses
+            return {
+                'taille': len(self._entrees),
+                'taille_max': self.taille_max,
+                'ttl_s': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'taux_hits': round(self.hits / total, 4) if total else None,
+                'expirations': self.expirations,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
@@ -325,6 +325,13 @@ class Database:
             cursor.execute('DELETE FROM interventions WHERE id = ?', (intervention_id,))
             return cursor.rowcount > 0
     
+    def count_interventions(self) -> int:
+        """Nombre total d'interventions"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COUNT(*) FROM interventions')
+            return cursor.fetchone()[0]
+    
     def get_intervention_stats(self) -> dict:
         """Statistiques des interventions"""
         with get_db_connection() as conn:
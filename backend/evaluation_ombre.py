@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+👥 Évaluation en Mode Ombre (modèle candidat)
+==============================================
+Un échantillon des prédictions servies (taux OMBRE_TAUX) est recalculé avec
+le modèle candidat du registre, hors du chemin de la requête:
+- la requête dépose le travail dans une file bornée (jamais bloquante: file
+  pleine -> prédiction ignorée et comptée)
+- un thread unique calcule la sortie du candidat et journalise les deux
+  sorties (JSON, une ligne par prédiction) dans output_projet4/ombre/
+- compteurs: soumis, évalués, ignorés, erreurs, désaccords de classe et
+  écart moyen des probabilités
+
+Un évaluateur par processus (chaque worker WSGI a le sien et son fichier).
+"""
+
+import json
+import os
+import queue
+import random
+import threading
+from datetime import datetime
+
+
+class EvaluationOmbre:
+    """Recalcule un échantillon des prédictions avec le modèle candidat"""
+
+    def __init__(self, journal_path, taux=0.1, taille_file=1000):
+        self.journal_path = journal_path
+        self.taux = taux
+        self._file = queue.Queue(maxsize=taille_file)
+        self._verrou = threading.Lock()
+        self._thread = None
+        self.soumis = 0
+        self.evalues = 0
+        self.ignores = 0
+        self.erreurs = 0
+        self.desaccords = 0
+        self.somme_ecarts = 0.0
+
+    def soumettre(self, candidat, contexte, actifs, calculer):
+        """
+        Dépose une prédiction servie pour évaluation par le candidat.
+        - candidat: {'version', 'model_data'} (None: pas de mode ombre)
+        - contexte: une entrée par ligne prédite (dict journalisé, ex. étudiant, module)
+        - actifs: {'version', 'probabilite': [...], 'prediction': [...]} servis
+        - calculer(model_data): (probabilités, prédictions) du candidat
+        """
+        if candidat is None or self.taux <= 0 or random.random() >= self.taux:
+            return False
+        self._demarrer()
+        try:
+            self._file.put_nowait((candidat, contexte, actifs, calculer))
+        except queue.Full:
+            with self._verrou:
+                self.ignores += 1
+            return False
+        with self._verrou:
+            self.soumis += 1
+        return True
+
+    def _demarrer(self):
+        with self._verrou:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._boucle, name="evaluation-ombre", daemon=True)
+                self._thread.start()
+
+    def _boucle(self):
+        while True:
+            candidat, contexte, actifs, calculer = self._file.get()
+            try:
+                probabilites, predictions = calculer(candidat['model_data'])
+                self._journaliser(candidat, contexte, actifs, probabilites, predictions)
+            except Exception as e:
+                with self._verrou:
+                    self.erreurs += 1
+                print(f"⚠️ Évaluation ombre échouée: {e}")
+            finally:
+                self._file.task_done()
+
+    def _journaliser(self, candidat, contexte, actifs, probabilites, predictions):
+        horodatage = datetime.now()
+        lignes = []
+        desaccords, ecarts = 0, 0.0
+        for i, infos in enumerate(contexte):
+            proba_actif, proba_candidat = float(actifs['probabilite'][i]), float(probabilites[i])
+            pred_actif, pred_candidat = int(actifs['prediction'][i]), int(predictions[i])
+            desaccords += pred_actif != pred_candidat
+            ecarts += abs(proba_actif - proba_candidat)
+            lignes.append(json.dumps({
+                'horodatage': horodatage.isoformat(),
+                **infos,
+                'version_active': actifs['version'],
+                'version_candidate': candidat['version'],
+                'probabilite_active': round(proba_actif, 6),
+                'probabilite_candidate': round(proba_candidat, 6),
+                'prediction_active': pred_actif,
+                'prediction_candidate': pred_candidat
+            }, ensure_ascii=False, default=str))
+
+        self.journal_path.mkdir(parents=True, exist_ok=True)
+        fichier = self.journal_path / f"ombre_{horodatage:%Y%m%d}_{os.getpid()}.jsonl"
+        with open(fichier, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(lignes) + '\n')
+        with self._verrou:
+            self.evalues += len(lignes)
+            self.desaccords += desaccords
+            self.somme_ecarts += ecarts
+
+    def attendre(self):
+        """Attend que la file soit traitée (scripts, tests)"""
+        self._file.join()
+
+    def statistiques(self):
+        """Compteurs (pour les routes d'administration)"""
+        with self._verrou:
+            return {
+                'taux': self.taux,
+                'en_attente': self._file.qsize(),
+                'soumis': self.soumis,
+                'evalues': self.evalues,
+                'ignores': self.ignores,
+                'erreurs': self.erreurs,
+                'desaccords': self.desaccords,
+                'taux_desaccord': round(self.desaccords / self.evalues, 4) if self.evalues else None,
+                'ecart_moyen': round(self.somme_ecarts / self.evalues, 6) if self.evalues else None
+            }
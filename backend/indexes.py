@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+🔎 Index d'Accès aux Données
+=============================
+Index construits une fois dans load_data() pour éviter les parcours
+complets du DataFrame à chaque requête.
+
+- IndexEtudiants: ID étudiant -> tranche contiguë de lignes
+  (le DataFrame doit être trié par ID, voir trier_par_id)
+- IndexModules: recherche par sous-chaîne (n-grammes) sur les noms distincts
+  des modules (arabe + français) -> positions des lignes de chaque module
+"""
+
+from collections import defaultdict
+
+import pandas as pd
+import numpy as np
+
+
+def trier_par_id(df):
+    """
+    Trie le DataFrame par ID (tri stable: l'ordre des lignes d'un même
+    étudiant est conservé). Ne fait rien si le DataFrame est déjà trié.
+    """
+    if df['ID'].is_monotonic_increasing:
+        return df
+    return df.sort_values('ID', kind='mergesort').reset_index(drop=True)
+
+
+class IndexEtudiants:
+    """ID étudiant -> (début, fin) des lignes de l'étudiant dans le DataFrame trié"""
+
+    def __init__(self, ids):
+        ids = pd.Series(ids)
+        if len(ids) == 0:
+            self._bornes = {}
+            self.ids = pd.Series([], dtype=object)
+            return
+        # Colonne catégorielle: on compare les codes plutôt que les chaînes
+        if isinstance(ids.dtype, pd.CategoricalDtype):
+            valeurs = ids.cat.codes.to_numpy()
+        else:
+            valeurs = ids.to_numpy(dtype=object)
+        changements = np.flatnonzero(valeurs[1:] != valeurs[:-1]) + 1
+        debuts = np.concatenate(([0], changements))
+        fins = np.concatenate((changements, [len(valeurs)]))
+        distincts = ids.iloc[debuts].astype(object).tolist()
+        self._bornes = dict(zip(distincts, zip(debuts.tolist(), fins.tolist())))
+        self.ids = pd.Series(distincts, dtype=object)  # IDs distincts, triés
+        if len(self._bornes) != len(debuts):
+            raise ValueError("IndexEtudiants: le DataFrame doit être trié par ID")
+
+    def __contains__(self, student_id):
+        return str(student_id) in self._bornes
+
+    def __len__(self):
+        return len(self._bornes)
+
+    def tranche(self, student_id):
+        """slice des lignes de l'étudiant, ou None s'il est inconnu"""
+        bornes = self._bornes.get(str(student_id))
+        return slice(*bornes) if bornes else None
+
+    def lignes(self, df, student_id):
+        """Lignes de l'étudiant (DataFrame vide s'il est inconnu)"""
+        tranche = self.tranche(student_id)
+        return df.iloc[tranche] if tranche else df.iloc[0:0]
+
+
+class IndexModules:
+    """
+    Index des noms de modules. La recherche est insensible à la casse et
+    littérale (comme str.contains(..., case=False, regex=False)), mais porte
+    sur les quelques centaines de noms distincts au lieu de toutes les lignes.
+    """
+
+    TAILLE_NGRAMME = 3
+
+    def __init__(self, modules, traduire=None):
+        # Codes dans l'ordre de première apparition des modules
+        codes, noms = pd.factorize(pd.Series(modules))
+        self.noms = list(noms)
+        self._codes = {nom: i for i, nom in enumerate(self.noms)}
+
+        # Module -> positions des lignes (ordre du DataFrame conservé)
+        ordre = np.argsort(codes, kind='stable')
+        bornes = np.searchsorted(codes[ordre], np.arange(len(self.noms) + 1))
+        self._positions = [ordre[bornes[i]:bornes[i + 1]] for i in range(len(self.noms))]
+
+        # Textes indexés: nom original + traduction française
+        self._textes = []
+        for nom in self.noms:
+            textes = [str(nom).upper()]
+            if traduire is not None:
+                nom_fr = str(traduire(nom)).upper()
+                if nom_fr not in textes:
+                    textes.append(nom_fr)
+            self._textes.append(textes)
+
+        self._ngrammes = defaultdict(set)
+        n = self.TAILLE_NGRAMME
+        for code, textes in enumerate(self._textes):
+            for texte in textes:
+                for i in range(len(texte) - n + 1):
+                    self._ngrammes[texte[i:i + n]].add(code)
+
+    def __len__(self):
+        return len(self.noms)
+
+    def _candidats(self, requete):
+        n = self.TAILLE_NGRAMME
+        if len(requete) < n:
+            return range(len(self.noms))
+        listes = sorted(
+            (self._ngrammes.get(requete[i:i + n], set()) for i in range(len(requete) - n + 1)),
+            key=len
+        )
+        return set.intersection(*listes)
+
+    def rechercher(self, requete):
+        """Codes des modules dont le nom contient la requête (ordre d'apparition)"""
+        requete = str(requete).upper()
+        return sorted(
+            code for code in self._candidats(requete)
+            if any(requete in texte for texte in self._textes[code])
+        )
+
+    def positions(self, requete):
+        """Positions (triées) des lignes des modules correspondant à la requête"""
+        codes = self.rechercher(requete)
+        if not codes:
+            return np.array([], dtype=np.intp)
+        if len(codes) == 1:
+            return self._positions[codes[0]]
+        return np.sort(np.concatenate([self._positions[c] for c in codes]))
+
+    def positions_module(self, nom):
+        """Positions des lignes d'un module (nom exact)"""
+        code = self._codes.get(nom)
+        return self._positions[code] if code is not None else np.array([], dtype=np.intp)
+
+    def lignes(self, df, requete):
+        """Lignes des modules correspondant à la requête"""
+        return df.iloc[self.positions(requete)]
+
+    def lignes_module(self, df, nom):
+        """Lignes d'un module (nom exact)"""
+        return df.iloc[self.positions_module(nom)]
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+📥 Ingestion Incrémentale des Notes
+====================================
+Ajoute un lot de notes (format brut des fichiers raw/*.csv) aux données
+servies sans tout recharger:
+- nettoyage du lot avec les règles communes (data_snapshot.nettoyer_donnees)
+- fusion des statistiques suffisantes (effectifs, sommes, sommes des carrés,
+  min/max, échecs) dans les agrégats existants (aggregates.fusionner_agregats)
+- seuls les étudiants touchés voient leur profil ML recalculé; leurs lignes
+  de la table des risques deviennent périmées (empreinte de l'historique) et
+  sont recalculées à la demande, puis par score_risques.py --incremental
+- le lot est conservé dans raw/increments pour les rechargements complets
+
+Le nouvel état est publié via RechargeurDonnees.appliquer().
+"""
+
+from data_snapshot import (RAW_PATH, nettoyer_donnees, preparer_lot, ecrire_increment,
+                           concatener_compact, empreinte_sources)
+from aggregates import fusionner_agregats, attacher_profils_ml
+from indexes import trier_par_id, IndexEtudiants, IndexModules
+from reload import EtatDonnees
+
+
+def ingerer_lot(etat, lignes, traduire=None, creer_assistant=None, profils_ml=None, raw_path=RAW_PATH):
+    """
+    Intègre un lot de notes à l'état courant.
+    `lignes`: liste de dictionnaires ou DataFrame au format brut
+    (ID, Major, Subject, MajorYear, OfficalYear, Practical, Theoretical,
+    Total, Status, Semester).
+    `profils_ml(historique, model_data)`: profils ML (Series ID -> profil)
+    des étudiants de l'historique, recalculés pour les étudiants touchés.
+
+    Retourne (nouvel état, résumé de l'ingestion). Lève ValueError si le lot
+    est invalide ou si aucune donnée n'est chargée.
+    """
+    if etat.df is None or etat.agregats is None:
+        raise ValueError("Données non chargées")
+
+    lot = preparer_lot(lignes)
+    nouvelles = nettoyer_donnees(lot.copy())
+    if len(nouvelles) == 0:
+        raise ValueError("Aucune ligne valide dans le lot")
+
+    agregats, ids_touches = fusionner_agregats(
+        etat.agregats, etat.df, etat.index_etudiants, nouvelles, traduire=traduire
+    )
+
+    df = trier_par_id(concatener_compact(etat.df, nouvelles))
+    index_etudiants = IndexEtudiants(df['ID'])
+    index_modules = IndexModules(df['Module'], traduire=traduire)
+    assistant_ia = creer_assistant(df, index_etudiants) if creer_assistant else etat.assistant_ia
+    if profils_ml and etat.model_data is not None:
+        historique = df[df['ID'].isin(ids_touches)]
+        agregats = attacher_profils_ml(agregats, profils_ml(historique, etat.model_data))
+
+    # Le lot n'est enregistré qu'une fois le nouvel état construit
+    fichier = ecrire_increment(lot, raw_path)
+
+    nouvel_etat = EtatDonnees(
+        df=df,
+        agregats=agregats,
+        index_etudiants=index_etudiants,
+        index_modules=index_modules,
+        model_data=etat.model_data,
+        assistant_ia=assistant_ia,
+        version_donnees=empreinte_sources(raw_path),
+        version_modele=etat.version_modele,
+        candidat=etat.candidat
+    )
+    resume = {
+        'lignes_recues': len(lot),
+        'lignes_integrees': len(nouvelles),
+        'lignes_ignorees': len(lot) - len(nouvelles),
+        'etudiants_touches': sorted(ids_touches),
+        'fichier': fichier.name,
+        'version_donnees': nouvel_etat.version_donnees
+    }
+    return nouvel_etat, resume
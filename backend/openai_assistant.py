@@ -8,7 +8,7 @@ from typing import List, Dict, Optional
 import pandas as pd
 
 class AssistantIA:
-    def __init__(self, df: pd.DataFrame = None):
+    def __init__(self, df: pd.DataFrame = None, index_etudiants=None):
         """
         Initialise l'assistant IA avec la clé OpenAI
         """
@@ -18,6 +18,7 @@ class AssistantIA:
         
         self.client = OpenAI(api_key=api_key)
         self.df = df
+        self.index_etudiants = index_etudiants
         self.model = "gpt-3.5-turbo"  # Économique et rapide
         
         # System prompt optimisé pour le contexte pédagogique
@@ -49,6 +50,12 @@ IMPORTANT:
 - Si les données ne sont pas disponibles, dis-le clairement
 - Sois encourageant et propose toujours des solutions"""
 
+    def _lignes_etudiant(self, code: str) -> pd.DataFrame:
+        """Lignes d'un étudiant via l'index si disponible, sinon par filtrage"""
+        if self.index_etudiants is not None:
+            return self.index_etudiants.lignes(self.df, code)
+        return self.df[self.df['ID'].astype(str) == code]
+
     def get_context_from_data(self, message: str) -> str:
         """
         Extrait du contexte pertinent depuis les données selon la question
@@ -64,7 +71,7 @@ IMPORTANT:
         student_codes = re.findall(r'\b\d{5,}\b', message)
         if student_codes:
             for code in student_codes[:1]:  # Limiter à 1 pour éviter trop de contexte
-                student_data = self.df[self.df['ID'].astype(str) == code]
+                student_data = self._lignes_etudiant(code)
                 if len(student_data) > 0:
                     moyenne = student_data['Note_sur_20'].mean() if 'Note_sur_20' in student_data.columns else 0
                     nb_modules = len(student_data)
@@ -8,9 +8,10 @@ from typing import List, Dict, Optional
 from datetime import datetime
 
 class AssistantIASimule:
-    def __init__(self, df: pd.DataFrame = None):
-        """Initialise l'assistant simulé avec les données"""
+    def __init__(self, df: pd.DataFrame = None, index_etudiants=None):
+        """Initialise l'assistant simulé avec les données (et l'index ID -> lignes si fourni)"""
         self.df = df
+        self.index_etudiants = index_etudiants
         self.model = "simulé-intelligent"
         
     def get_welcome_message(self) -> str:
@@ -122,7 +123,7 @@ Le système ML analyse 43 critères pour identifier précisément qui a besoin d
             
             # Modules avec le plus haut taux d'échec
             if 'Needs_Support' in self.df.columns:
-                module_stats = self.df.groupby('Module').agg({
+                module_stats = self.df.groupby('Module', observed=True).agg({
                     'Needs_Support': 'mean',
                     'Note_sur_20': 'mean'
                 }).sort_values('Needs_Support', ascending=False)
@@ -224,13 +225,19 @@ C'est un vrai système ML, pas une simulation ! ✅"""
 
 **✨ Le système génère des recommandations personnalisées pour chaque étudiant !**"""
 
+    def _lignes_etudiant(self, code: str) -> pd.DataFrame:
+        """Lignes d'un étudiant via l'index si disponible, sinon par filtrage"""
+        if self.index_etudiants is not None:
+            return self.index_etudiants.lignes(self.df, code)
+        return self.df[self.df['ID'].astype(str) == code]
+
     def _reponse_etudiant_specifique(self, message: str) -> str:
         """Répond sur un étudiant spécifique"""
         # Extraire le code étudiant
         codes = re.findall(r'\b\d{5,}\b', message)
         if codes and self.df is not None:
             code = codes[0]
-            student_data = self.df[self.df['ID'].astype(str) == code]
+            student_data = self._lignes_etudiant(code)
             
             if len(student_data) > 0:
                 moyenne = student_data['Note_sur_20'].mean() if 'Note_sur_20' in student_data.columns else 0
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+🔄 Rechargement à Chaud des Données
+====================================
+L'état servi par l'API (DataFrame, index, agrégats, modèle, assistant) est
+regroupé dans un objet immuable EtatDonnees. Un rechargement construit un
+nouvel état en arrière-plan puis remplace une seule référence: les requêtes
+en cours terminent sur l'ancienne version, les suivantes voient la nouvelle.
+
+Déclenchement:
+- POST /api/admin/reload (administrateur)
+- surveillance des fichiers bruts et du modèle (DATA_WATCH_INTERVAL secondes)
+
+Une ingestion de notes (POST /api/admin/ingest) passe par appliquer(): le
+nouvel état est dérivé de l'état courant au lieu d'être reconstruit.
+"""
+
+import threading
+import time
+import traceback
+from datetime import datetime
+
+
+class EtatDonnees:
+    """Version immuable des données servies par l'API"""
+
+    __slots__ = ('df', 'agregats', 'index_etudiants', 'index_modules',
+                 'model_data', 'assistant_ia', 'version_donnees',
+                 'version_modele', 'charge_le', 'candidat')
+
+    def __init__(self, df=None, agregats=None, index_etudiants=None, index_modules=None,
+                 model_data=None, assistant_ia=None, version_donnees=None,
+                 version_modele=None, candidat=None):
+        valeurs = {
+            'df': df,
+            'agregats': agregats,
+            'index_etudiants': index_etudiants,
+            'index_modules': index_modules,
+            'model_data': model_data,
+            'assistant_ia': assistant_ia,
+            'version_donnees': version_donnees,
+            'version_modele': version_modele,
+            'charge_le': datetime.now().isoformat() if df is not None else None,
+            # Modèle candidat du registre évalué en mode ombre: {'version', 'model_data'}
+            'candidat': candidat
+        }
+        for nom, valeur in valeurs.items():
+            object.__setattr__(self, nom, valeur)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("EtatDonnees est immuable - utiliser RechargeurDonnees.recharger()")
+
+    def remplacer(self, **changements):
+        """Nouvel état identique à celui-ci sauf les champs indiqués"""
+        valeurs = {nom: getattr(self, nom) for nom in self.__slots__ if nom != 'charge_le'}
+        valeurs.update(changements)
+        return EtatDonnees(**valeurs)
+
+    def resume(self):
+        """Informations de version (pour les routes d'administration)"""
+        return {
+            'version_donnees': self.version_donnees,
+            'version_modele': self.version_modele,
+            'charge_le': self.charge_le,
+            'nb_enregistrements': len(self.df) if self.df is not None else 0,
+            'version_candidate': self.candidat['version'] if self.candidat else None
+        }
+
+
+class RechargeurDonnees:
+    """
+    Construit les états successifs et publie le dernier.
+    `construire(signaler)` retourne un EtatDonnees et appelle signaler(nom)
+    au début de chaque étape (progression visible dans statut());
+    `empreinte` (optionnelle) retourne une valeur qui change quand les
+    fichiers sources changent (utilisée par la surveillance).
+    """
+
+    def __init__(self, construire, empreinte=None):
+        self._construire = construire
+        self._empreinte = empreinte
+        self._verrou = threading.Lock()
+        self._surveillance = None
+        self.etat = EtatDonnees()
+        self.en_cours = False
+        self.derniere_erreur = None
+        self.dernier_rechargement = None
+        self.derniere_empreinte = None
+        self.etape = None
+        self.etapes = []
+        self._debut_etape = None
+
+    @property
+    def pret(self):
+        """Vrai dès qu'une version des données est servie"""
+        return self.etat.df is not None
+
+    def _signaler(self, etape):
+        maintenant = time.perf_counter()
+        if self.etapes and self._debut_etape is not None:
+            self.etapes[-1]['duree_s'] = round(maintenant - self._debut_etape, 3)
+        self._debut_etape = maintenant
+        self.etape = etape
+        if etape is not None:
+            self.etapes.append({'etape': etape})
+
+    def _executer(self):
+        self.etapes = []
+        try:
+            empreinte = self._empreinte() if self._empreinte else None
+            nouvel_etat = self._construire(self._signaler)
+            # Remplacement atomique d'une seule référence
+            self.etat = nouvel_etat
+            self.derniere_empreinte = empreinte
+            self.derniere_erreur = None
+            self.dernier_rechargement = datetime.now().isoformat()
+            print(f"🔄 Données rechargées (version {nouvel_etat.version_donnees})")
+        except Exception as e:
+            self.derniere_erreur = str(e)
+            print(f"❌ Rechargement échoué, l'ancienne version reste servie: {e}")
+            traceback.print_exc()
+        finally:
+            self._signaler(None)
+            self.en_cours = False
+            self._verrou.release()
+
+    def recharger(self, bloquant=False):
+        """
+        Lance un rechargement. Retourne False si un rechargement est déjà
+        en cours (il n'y en a jamais deux en parallèle).
+        """
+        if not self._verrou.acquire(blocking=False):
+            return False
+        self.en_cours = True
+        if bloquant:
+            self._executer()
+        else:
+            threading.Thread(target=self._executer, name="rechargement-donnees", daemon=True).start()
+        return True
+
+    def appliquer(self, transformation):
+        """
+        Dérive un nouvel état de l'état courant et le publie.
+        `transformation(etat)` retourne (nouvel_etat, resultat); attend la fin
+        d'un éventuel rechargement pour ne pas perdre la modification.
+        En cas d'erreur, l'état courant est conservé et l'exception propagée.
+        """
+        with self._verrou:
+            nouvel_etat, resultat = transformation(self.etat)
+            self.etat = nouvel_etat
+            # Les fichiers modifiés par la transformation sont déjà intégrés
+            if self._empreinte:
+                self.derniere_empreinte = self._empreinte()
+        return resultat
+
+    def surveiller(self, intervalle):
+        """Recharge automatiquement quand l'empreinte des sources change"""
+        if self._empreinte is None or self._surveillance is not None:
+            return
+        arret = threading.Event()
+
+        def boucle():
+            while not arret.wait(intervalle):
+                try:
+                    empreinte = self._empreinte()
+                except OSError:
+                    continue
+                if empreinte != self.derniere_empreinte and not self.en_cours:
+                    print("👀 Changement détecté dans les fichiers sources")
+                    self.recharger()
+
+        self._surveillance = arret
+        threading.Thread(target=boucle, name="surveillance-donnees", daemon=True).start()
+
+    def statut(self):
+        return {
+            'en_cours': self.en_cours,
+            'etape': self.etape,
+            'etapes': self.etapes,
+            'dernier_rechargement': self.dernier_rechargement,
+            'derniere_erreur': self.derniere_erreur,
+            'surveillance_active': self._surveillance is not None,
+            **self.etat.resume()
+        }
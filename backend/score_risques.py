@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+🗂️ Calcul de la Table des Risques (tâche nocturne)
+===================================================
+Prédit le risque d'échec de chaque étudiant pour chaque module non encore
+passé de sa filière et l'enregistre dans output_projet4/table_risques.db.
+L'API lit cette table (voir table_risques.py) et ne calcule à la demande
+que pour les étudiants absents ou dont les notes ont changé depuis.
+--incremental ne recalcule que ces étudiants (par exemple après une
+ingestion de notes); calcul complet si le modèle a changé.
+
+Usage (depuis backend/, par exemple chaque nuit via cron):
+    python score_risques.py
+    python score_risques.py --taille-lot 1000
+    python score_risques.py --incremental
+"""
+
+import sys
+import time
+
+from app import construire_etat, calculer_table_risques, RISQUES_PATH, RISQUES_TAILLE_LOT
+
+
+if __name__ == "__main__":
+    taille_lot = RISQUES_TAILLE_LOT
+    if '--taille-lot' in sys.argv:
+        taille_lot = int(sys.argv[sys.argv.index('--taille-lot') + 1])
+
+    print("=" * 60)
+    print("🗂️ CALCUL DE LA TABLE DES RISQUES")
+    print("=" * 60)
+
+    etat = construire_etat()
+    if etat.model_data is None:
+        print("❌ Modèle non trouvé: entraîner le modèle avant de calculer la table")
+        sys.exit(1)
+
+    debut = time.perf_counter()
+    nb_lignes, nb_etudiants = calculer_table_risques(etat, taille_lot, incremental='--incremental' in sys.argv)
+    print(f"\n✅ {nb_lignes:,} prédictions ({nb_etudiants:,} étudiants recalculés) "
+          f"en {time.perf_counter() - debut:.1f}s")
+    print(f"   Table: {RISQUES_PATH}")
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+🗂️ Table des Risques Précalculée
+=================================
+Probabilité d'échec de chaque étudiant pour chaque module non encore passé
+de sa filière, calculée hors ligne (score_risques.py, tâche nocturne) et
+servie par simple lecture:
+- /api/predict/modules-futurs
+- /api/predict-student-module
+- /api/students/<id>/modules-non-passes
+
+Stockage: base SQLite dédiée (clé primaire (étudiant, module), sans rowid),
+réécrite dans une seule transaction (mode WAL: les workers continuent de
+lire l'ancienne version pendant le calcul). En mode incrémental, seuls les
+étudiants dont l'empreinte stockée diffère de l'historique actuel (notes
+ingérées ou modifiées depuis le dernier calcul) sont recalculés; les
+étudiants disparus des données sont retirés.
+
+Une ligne n'est servie que si:
+- la table a été calculée avec le modèle servi (version_modele)
+- l'historique de l'étudiant n'a pas changé depuis (empreinte des lignes;
+  une ingestion de notes ou un rechargement rend les étudiants touchés
+  absents de la table)
+Sinon l'API calcule la prédiction à la demande (cache des prédictions).
+"""
+
+import sqlite3
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+# Catégories de réussite: (seuil de probabilité de réussite, catégorie, action préventive)
+CATEGORIES_REUSSITE = [
+    (0.8, {"niveau": "EXCELLENT", "color": "green", "emoji": "✅"}, "Aucune action nécessaire"),
+    (0.6, {"niveau": "BON", "color": "lightgreen", "emoji": "🟢"}, "Suivi normal"),
+    (0.4, {"niveau": "MODÉRÉ", "color": "yellow", "emoji": "🟡"}, "Tutorat préventif recommandé"),
+    (0.2, {"niveau": "RISQUÉ", "color": "orange", "emoji": "🟠"}, "Tutorat préventif nécessaire"),
+    (-np.inf, {"niveau": "TRÈS RISQUÉ", "color": "red", "emoji": "🔴"}, "Reporter si possible ou tutorat intensif")
+]
+CATEGORIES_PAR_NIVEAU = {categorie['niveau']: (categorie, action)
+                         for _, categorie, action in CATEGORIES_REUSSITE}
+
+
+def categorie_reussite(proba_reussite):
+    """(catégorie, action préventive) pour une probabilité de réussite"""
+    for seuil, categorie, action in CATEGORIES_REUSSITE:
+        if proba_reussite >= seuil:
+            return dict(categorie), action
+
+
+def niveaux_reussite(proba_reussite):
+    """Niveau de catégorie pour un tableau de probabilités de réussite"""
+    seuils = np.array([seuil for seuil, _, _ in CATEGORIES_REUSSITE])
+    niveaux = np.array([categorie['niveau'] for _, categorie, _ in CATEGORIES_REUSSITE], dtype=object)
+    # Premier seuil (décroissant) atteint
+    rang = (np.asarray(proba_reussite, dtype=float)[:, None] < seuils[None, :]).sum(axis=1)
+    return niveaux[rang]
+
+
+def empreintes_historiques(df):
+    """
+    Empreinte de l'historique de chaque étudiant (somme des hachages des
+    lignes, indépendante de leur ordre). Retourne une Series ID -> empreinte.
+    """
+    hachages = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    ids = df['ID'].astype(str).to_numpy()
+    sommes = pd.Series(hachages).groupby(ids, sort=False).sum()
+    return sommes.map(lambda h: format(int(h) & 0xFFFFFFFFFFFFFFFF, '016x'))
+
+
+def empreinte_historique(lignes):
+    """Empreinte des lignes d'un étudiant (voir empreintes_historiques)"""
+    somme = int(pd.util.hash_pandas_object(lignes, index=False).to_numpy().sum())
+    return format(somme & 0xFFFFFFFFFFFFFFFF, '016x')
+
+
+class TableRisques:
+    """Lecture / écriture de la table des risques (une connexion par thread)"""
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self._local = threading.local()
+        self._verrou = threading.Lock()
+        self.hits = 0
+        self.absents = 0
+        self.perimes = 0
+
+    def _connexion(self):
+        connexion = getattr(self._local, 'connexion', None)
+        if connexion is None:
+            connexion = sqlite3.connect(f"file:{self.chemin}?mode=ro", uri=True)
+            self._local.connexion = connexion
+        return connexion
+
+    def _compter(self, compteur):
+        with self._verrou:
+            setattr(self, compteur, getattr(self, compteur) + 1)
+
+    def lire(self, id_etudiant, empreinte, version_modele):
+        """
+        Prédictions précalculées d'un étudiant: {module: {probabilite,
+        prediction, profil_ml}}, ou None si la table est absente, calculée
+        avec un autre modèle ou si l'historique de l'étudiant a changé.
+        """
+        if not self.chemin.exists():
+            return None
+        try:
+            connexion = self._connexion()
+            meta = dict(connexion.execute("SELECT cle, valeur FROM meta").fetchall())
+            if meta.get('version_modele') != version_modele:
+                self._compter('perimes')
+                return None
+            ligne = connexion.execute(
+                "SELECT empreinte FROM etudiants WHERE id_etudiant = ?", (id_etudiant,)
+            ).fetchone()
+            if ligne is None or ligne[0] != empreinte:
+                self._compter('absents')
+                return None
+            risques = connexion.execute(
+                "SELECT module, probabilite, prediction, profil_ml FROM risques WHERE id_etudiant = ?",
+                (id_etudiant,)
+            ).fetchall()
+        except sqlite3.Error:
+            # Table en cours de création ou illisible: calcul à la demande
+            self._local.connexion = None
+            return None
+        self._compter('hits')
+        return {module: {'probabilite': probabilite, 'prediction': prediction, 'profil_ml': profil_ml}
+                for module, probabilite, prediction, profil_ml in risques}
+
+    def empreintes(self, version_modele):
+        """
+        Empreintes stockées (Series ID -> empreinte) si la table a été calculée
+        avec ce modèle, sinon None (table absente ou autre modèle: tout recalculer).
+        """
+        if not self.chemin.exists():
+            return None
+        try:
+            connexion = sqlite3.connect(str(self.chemin))
+            try:
+                meta = dict(connexion.execute("SELECT cle, valeur FROM meta").fetchall())
+                if meta.get('version_modele') != version_modele:
+                    return None
+                lignes = connexion.execute("SELECT id_etudiant, empreinte FROM etudiants").fetchall()
+            finally:
+                connexion.close()
+        except sqlite3.Error:
+            return None
+        return pd.Series(dict(lignes), dtype=object)
+
+    def ecrire(self, lots, version_modele, version_donnees, incremental=False, supprimes=()):
+        """
+        Remplace le contenu de la table. `lots`: itérable de couples
+        (empreintes: Series ID -> empreinte, risques: DataFrame ID, Module,
+        probabilite, prediction, profil_ml). Retourne le nombre de lignes
+        écrites.
+        incremental=True: seuls les étudiants des lots (et ceux de `supprimes`,
+        retirés) sont remplacés, les autres lignes sont conservées.
+        """
+        self.chemin.parent.mkdir(exist_ok=True)
+        connexion = sqlite3.connect(str(self.chemin))
+        nb_lignes = 0
+        try:
+            connexion.execute("PRAGMA journal_mode=WAL")
+            connexion.executescript("""
+                CREATE TABLE IF NOT EXISTS meta (cle TEXT PRIMARY KEY, valeur TEXT);
+                CREATE TABLE IF NOT EXISTS etudiants (
+                    id_etudiant TEXT PRIMARY KEY,
+                    empreinte TEXT NOT NULL
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS risques (
+                    id_etudiant TEXT NOT NULL,
+                    module TEXT NOT NULL,
+                    probabilite REAL NOT NULL,
+                    prediction INTEGER NOT NULL,
+                    profil_ml TEXT,
+                    niveau TEXT NOT NULL,
+                    action TEXT NOT NULL,
+                    PRIMARY KEY (id_etudiant, module)
+                ) WITHOUT ROWID;
+            """)
+            with connexion:
+                connexion.execute("DELETE FROM meta")
+                if not incremental:
+                    connexion.execute("DELETE FROM etudiants")
+                    connexion.execute("DELETE FROM risques")
+                self._retirer(connexion, supprimes)
+                for empreintes, risques in lots:
+                    if incremental:
+                        self._retirer(connexion, empreintes.index)
+                    connexion.executemany("INSERT INTO etudiants VALUES (?, ?)", empreintes.items())
+                    niveaux = niveaux_reussite(1 - risques['probabilite'].to_numpy())
+                    actions = [CATEGORIES_PAR_NIVEAU[n][1] for n in niveaux]
+                    connexion.executemany(
+                        "INSERT INTO risques VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        zip(risques['ID'].astype(str), risques['Module'].astype(str),
+                            risques['probabilite'].astype(float), risques['prediction'].astype(int),
+                            risques['profil_ml'].astype(str), niveaux, actions)
+                    )
+                    nb_lignes += len(risques)
+                nb_etudiants = connexion.execute("SELECT COUNT(*) FROM etudiants").fetchone()[0]
+                nb_total = connexion.execute("SELECT COUNT(*) FROM risques").fetchone()[0]
+                connexion.executemany("INSERT INTO meta VALUES (?, ?)", [
+                    ('version_modele', version_modele),
+                    ('version_donnees', version_donnees),
+                    ('calcule_le', datetime.now().isoformat()),
+                    ('nb_etudiants', str(nb_etudiants)),
+                    ('nb_lignes', str(nb_total))
+                ])
+        finally:
+            connexion.close()
+        return nb_lignes
+
+    @staticmethod
+    def _retirer(connexion, ids):
+        """Supprime les lignes des étudiants `ids` (dans la transaction en cours)"""
+        cles = [(str(i),) for i in ids]
+        connexion.executemany("DELETE FROM etudiants WHERE id_etudiant = ?", cles)
+        connexion.executemany("DELETE FROM risques WHERE id_etudiant = ?", cles)
+
+    def meta(self):
+        """Versions et date du dernier calcul (dictionnaire vide si absente)"""
+        if not self.chemin.exists():
+            return {}
+        try:
+            return dict(self._connexion().execute("SELECT cle, valeur FROM meta").fetchall())
+        except sqlite3.Error:
+            self._local.connexion = None
+            return {}
+
+    def statistiques(self):
+        """Compteurs et dernier calcul (pour les routes de santé)"""
+        with self._verrou:
+            compteurs = {'hits': self.hits, 'absents': self.absents, 'perimes': self.perimes}
+        return {**self.meta(), **compteurs}
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+"""
+🏭 Point d'Entrée WSGI (plusieurs workers)
+===========================================
+Chaque worker charge les données au démarrage. Les colonnes étant projetées
+en mémoire depuis le snapshot (DATA_MMAP=1, par défaut), tous les workers
+partagent les mêmes pages: seuls les index et agrégats (dictionnaires et
+petites tables) sont propres à chaque processus.
+
+Usage (depuis backend/):
+    gunicorn -w 8 -b 0.0.0.0:5000 wsgi:app
+"""
+
+from app import app, demarrer
+
+demarrer()
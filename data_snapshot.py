@@ -0,0 +1,549 @@
+# -*- coding: utf-8 -*-
+"""
+💾 Snapshot Colonnaire des Données Nettoyées
+=============================================
+Centralise le chargement des notes (raw/*.csv), leur nettoyage et leur
+sauvegarde sous forme de fichiers colonnes .npy versionnés.
+
+Au démarrage, les scripts et l'API lisent directement le snapshot; le
+chemin CSV n'est reparcouru que lorsque les fichiers bruts ont changé.
+
+Stockage compact: colonnes texte en codes entiers (dictionnaire trié),
+nombres réduits au plus petit type sans perte (float32, int8...).
+Avec compact=True, charger_donnees() garde cette représentation en mémoire
+(colonnes texte en Categorical); sinon les types d'origine sont restaurés.
+Avec mmap=True en plus, les colonnes sont projetées en mémoire (lecture
+seule) depuis les fichiers .npy: plusieurs processus (workers WSGI) qui
+chargent le même snapshot partagent les mêmes pages au lieu d'en garder
+chacun une copie.
+
+Usage:
+    python data_snapshot.py            # Construit le snapshot si nécessaire
+    python data_snapshot.py --force    # Reconstruit le snapshot
+"""
+
+import pandas as pd
+import numpy as np
+from pandas.api.types import union_categoricals
+from pathlib import Path
+from datetime import datetime
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+try:
+    import fcntl
+except ImportError:  # Windows: pas de verrous de fichiers partagés
+    fcntl = None
+
+# Chemin absolu basé sur l'emplacement de ce fichier
+BASE_PATH = Path(__file__).parent.absolute()
+RAW_PATH = BASE_PATH / "raw"
+OUTPUT_PATH = BASE_PATH / "output_projet4"
+SNAPSHOT_PATH = OUTPUT_PATH / "snapshot"
+
+RAW_FILES = ["1- one_clean.csv", "2- two_clean.csv"]
+# Lots de notes ajoutés après coup (ingestion incrémentale): raw/increments/*.csv
+INCREMENTS_DIR = "increments"
+COLONNES_BRUTES = ['ID', 'Major', 'Subject', 'MajorYear', 'OfficalYear',
+                   'Practical', 'Theoretical', 'Total', 'Status', 'Semester']
+
+# À incrémenter dès que le format ou les règles de nettoyage changent
+SNAPSHOT_FORMAT_VERSION = 4
+MANIFEST_NAME = "manifest.json"
+# snapshot/courant.json -> dossier de la version servie (snapshot/<version>/)
+POINTEUR_NAME = "courant.json"
+# Verrou de chaque version (partagé par les lecteurs, exclusif pour la supprimer)
+VERROU_NAME = ".verrou"
+VERROU_NETTOYAGE = ".nettoyage.lock"
+# Dossiers temporaires d'écriture plus vieux que ce délai (s): abandonnés
+AGE_TEMPORAIRE_ABANDONNE = 3600
+TENTATIVES_LECTURE = 3
+
+IDS_INVALIDES = ['Unknown', 'unknown', 'nan', 'None', '']
+STATUTS_SOUTIEN = ['Absent', 'Debarred', 'Withdrawal']
+
+
+# =============================================================================
+# NETTOYAGE (chemin CSV)
+# =============================================================================
+
+def nettoyer_donnees(df):
+    """
+    Applique le nettoyage commun à toutes les entrées (API, alertes, rapports).
+    Retourne un nouveau DataFrame trié par ID (tri stable) et indexé de 0 à n-1,
+    pour que les lignes d'un même étudiant soient contiguës.
+    """
+    # Supprimer les lignes avec ID null ou Unknown
+    df['ID'] = df['ID'].astype(str)
+    df = df[~df['ID'].isin(IDS_INVALIDES)].copy()
+
+    # Supprimer les lignes avec Major / Subject Unknown
+    df = df[~df['Major'].astype(str).str.lower().str.contains('unknown', na=False)].copy()
+    df = df[~df['Subject'].astype(str).str.lower().str.contains('unknown', na=False)].copy()
+
+    # Renommer colonnes
+    df = df.rename(columns={
+        'Major': 'Filiere',
+        'Subject': 'Module',
+        'MajorYear': 'Annee',
+        'OfficalYear': 'AnneUniversitaire'
+    })
+
+    df['Practical'] = pd.to_numeric(df['Practical'], errors='coerce').fillna(0)
+    df['Theoretical'] = pd.to_numeric(df['Theoretical'], errors='coerce').fillna(0)
+    df['Total'] = pd.to_numeric(df['Total'], errors='coerce').fillna(df['Practical'] + df['Theoretical'])
+    df['Note_sur_20'] = df['Total'] / 5
+    df['Annee'] = pd.to_numeric(df['Annee'], errors='coerce').fillna(1).astype(int)
+    df['Semester'] = pd.to_numeric(df['Semester'], errors='coerce').fillna(1).astype(int)
+
+    df['Needs_Support'] = ((df['Status'] == 'Fail') |
+                           (df['Total'] < 50) |
+                           (df['Status'].isin(STATUTS_SOUTIEN))).astype(int)
+
+    return df.sort_values('ID', kind='mergesort').reset_index(drop=True)
+
+
+def fichiers_increments(raw_path=RAW_PATH):
+    """Lots ingérés (raw/increments/*.csv), dans l'ordre d'ingestion"""
+    dossier = Path(raw_path) / INCREMENTS_DIR
+    return sorted(dossier.glob("*.csv")) if dossier.exists() else []
+
+
+def lire_csv_bruts(raw_path=RAW_PATH):
+    """Lit et concatène les fichiers CSV bruts (+ lots ingérés)"""
+    chemins = [Path(raw_path) / nom for nom in RAW_FILES] + fichiers_increments(raw_path)
+    frames = [pd.read_csv(chemin, encoding='utf-8') for chemin in chemins]
+    return pd.concat(frames, ignore_index=True)
+
+
+def preparer_lot(lignes):
+    """
+    Met un lot de notes au format brut (colonnes de COLONNES_BRUTES, les
+    colonnes absentes sont ajoutées vides). Lève ValueError si une colonne
+    indispensable manque.
+    """
+    lot = pd.DataFrame(lignes)
+    manquantes = [c for c in ['ID', 'Major', 'Subject', 'Total', 'Status'] if c not in lot.columns]
+    if manquantes:
+        raise ValueError(f"Colonnes manquantes: {', '.join(manquantes)}")
+    for col in COLONNES_BRUTES:
+        if col not in lot.columns:
+            lot[col] = np.nan
+    return lot[COLONNES_BRUTES]
+
+
+def ecrire_increment(lot, raw_path=RAW_PATH):
+    """Enregistre un lot au format brut dans raw/increments (écriture atomique)"""
+    dossier = Path(raw_path) / INCREMENTS_DIR
+    dossier.mkdir(parents=True, exist_ok=True)
+    nom = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.csv"
+    tmp = dossier / f".{nom}.tmp"
+    lot.to_csv(tmp, index=False, encoding='utf-8')
+    os.replace(tmp, dossier / nom)
+    return dossier / nom
+
+
+# =============================================================================
+# EMPREINTE DES FICHIERS SOURCES
+# =============================================================================
+
+def empreinte_sources(raw_path=RAW_PATH):
+    """
+    Empreinte des fichiers bruts (nom, taille, date de modification).
+    Retourne None si un des fichiers est absent.
+    """
+    elements = [f"format={SNAPSHOT_FORMAT_VERSION}"]
+    for nom in RAW_FILES:
+        chemin = Path(raw_path) / nom
+        if not chemin.exists():
+            return None
+        stat = chemin.stat()
+        elements.append(f"{nom}:{stat.st_size}:{stat.st_mtime_ns}")
+    for chemin in fichiers_increments(raw_path):
+        stat = chemin.stat()
+        elements.append(f"{INCREMENTS_DIR}/{chemin.name}:{stat.st_size}:{stat.st_mtime_ns}")
+    return hashlib.sha1("|".join(elements).encode('utf-8')).hexdigest()[:16]
+
+
+# =============================================================================
+# REPRÉSENTATION COMPACTE
+# =============================================================================
+
+def reduire_numerique(valeurs):
+    """Plus petit type numérique représentant les valeurs sans perte"""
+    valeurs = np.asarray(valeurs)
+    if valeurs.dtype.kind == 'f':
+        reduit = valeurs.astype(np.float32)
+        if np.array_equal(reduit, valeurs, equal_nan=True):
+            return reduit
+        return valeurs
+    if valeurs.dtype.kind in 'iu' and len(valeurs) > 0:
+        for type_entier in (np.int8, np.int16, np.int32):
+            info = np.iinfo(type_entier)
+            if info.min <= valeurs.min() and valeurs.max() <= info.max:
+                return valeurs.astype(type_entier)
+    return valeurs
+
+
+def encoder_texte(serie):
+    """Codes int32 (-1 pour les valeurs manquantes) + dictionnaire trié"""
+    manquants = serie.isna()
+    valeurs = serie.astype(object).astype(str).where(~manquants, None)
+    codes, categories = pd.factorize(valeurs, sort=True)
+    return codes.astype(np.int32), [str(c) for c in categories]
+
+
+def type_codes(nb_categories):
+    """
+    Type des codes utilisé par pandas pour ce nombre de catégories: les codes
+    enregistrés dans ce type sont repris tels quels par Categorical.from_codes
+    (sans copie, condition du partage par mmap).
+    """
+    for type_entier in (np.int8, np.int16, np.int32):
+        if nb_categories < np.iinfo(type_entier).max:
+            return type_entier
+    return np.int64
+
+
+def compacter(df):
+    """Version compacte d'un DataFrame nettoyé (Categorical + types réduits)"""
+    data = {}
+    for col in df.columns:
+        serie = df[col]
+        if pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_bool_dtype(serie):
+            data[col] = reduire_numerique(serie.to_numpy())
+        else:
+            codes, categories = encoder_texte(serie)
+            data[col] = pd.Categorical.from_codes(codes, categories=categories)
+    return pd.DataFrame(data)
+
+
+def concatener_compact(df, lot):
+    """
+    Ajoute un lot (nettoyé) à un DataFrame compact: dictionnaires des colonnes
+    texte fusionnés (toujours triés), types numériques réduits à nouveau.
+    """
+    data = {}
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            # Même conversion que encoder_texte, quel que soit le type du lot
+            manquants = lot[col].isna()
+            valeurs = lot[col].astype(object).astype(str).where(~manquants, None)
+            data[col] = union_categoricals([df[col].array, pd.Categorical(valeurs)], sort_categories=True)
+        else:
+            valeurs = pd.to_numeric(lot[col]).to_numpy()
+            data[col] = reduire_numerique(np.concatenate([df[col].to_numpy(), valeurs]))
+    return pd.DataFrame(data)
+
+
+# =============================================================================
+# ÉCRITURE / LECTURE DU SNAPSHOT
+# =============================================================================
+
+def _verrou(chemin, mode):
+    """
+    Verrou fcntl (LOCK_SH / LOCK_EX, éventuellement | LOCK_NB) sur un fichier.
+    Retourne le descripteur (à fermer pour libérer), ou None si le fichier
+    n'existe pas ou si le verrou non bloquant n'est pas obtenu.
+    Sans fcntl (Windows): pas de verrou, retourne -1.
+    """
+    if fcntl is None:
+        return -1
+    try:
+        fd = os.open(chemin, os.O_RDWR | os.O_CREAT if mode & fcntl.LOCK_EX else os.O_RDONLY)
+    except FileNotFoundError:
+        return None
+    try:
+        fcntl.flock(fd, mode)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _liberer(fd):
+    if fd is not None and fd >= 0:
+        os.close(fd)
+
+
+class _VerrouLecture:
+    """
+    Verrou partagé sur une version du snapshot, tenu tant qu'une colonne
+    projetée (mmap) depuis ses fichiers est vivante: le nettoyage ne supprime
+    pas une version encore utilisée par un processus.
+    """
+
+    def __init__(self, fd):
+        self.fd = fd
+
+    def __del__(self):
+        _liberer(self.fd)
+
+
+def _manifest_dossier(dossier):
+    """Manifest d'un dossier de version (None s'il est absent, illisible ou d'un autre format)"""
+    try:
+        with open(Path(dossier) / MANIFEST_NAME, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('format') != SNAPSHOT_FORMAT_VERSION:
+        return None
+    manifest['dossier'] = str(dossier)
+    return manifest
+
+
+def _nettoyer(snapshot_path, courant):
+    """Supprime ce qui n'est plus servi (appelé sous le verrou global, voir nettoyer_snapshots)"""
+    for chemin in snapshot_path.iterdir():
+        if chemin.is_file():
+            # Ancien format à plat (manifest et colonnes à la racine)
+            if chemin.name == MANIFEST_NAME or chemin.name.startswith('col_'):
+                chemin.unlink(missing_ok=True)
+        elif chemin.name.startswith('.tmp-'):
+            # Écriture interrompue (processus arrêté en cours d'écriture)
+            if datetime.now().timestamp() - chemin.stat().st_mtime > AGE_TEMPORAIRE_ABANDONNE:
+                shutil.rmtree(chemin, ignore_errors=True)
+        elif chemin.name != courant:
+            fd = _verrou(chemin / VERROU_NAME, fcntl.LOCK_EX | fcntl.LOCK_NB if fcntl else 0)
+            if fd is None:
+                continue  # version encore projetée en mémoire par un processus
+            try:
+                shutil.rmtree(chemin, ignore_errors=True)
+            finally:
+                _liberer(fd)
+
+
+def _publier(snapshot_path, dossier, tmp_path=None):
+    """
+    Sous le verrou global: renomme le dossier temporaire `tmp_path` en
+    `dossier` (s'il n'existe pas déjà), fait pointer le snapshot courant sur
+    `dossier` (remplacement atomique du pointeur) et supprime les versions
+    inutilisées. Retourne le manifest publié, ou None si `dossier` n'existe
+    plus.
+    """
+    verrou_global = _verrou(snapshot_path / VERROU_NETTOYAGE, fcntl.LOCK_EX if fcntl else 0)
+    try:
+        if tmp_path is not None:
+            if dossier.exists():
+                # Même version déjà publiée par un autre processus: reprise telle quelle
+                shutil.rmtree(tmp_path, ignore_errors=True)
+            else:
+                os.rename(tmp_path, dossier)
+        manifest = _manifest_dossier(dossier)
+        if manifest is None:
+            return None
+        tmp = snapshot_path / f".{POINTEUR_NAME}.tmp{os.getpid()}"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'dossier': dossier.name}, f)
+        os.replace(tmp, snapshot_path / POINTEUR_NAME)
+        _nettoyer(snapshot_path, dossier.name)
+        return manifest
+    finally:
+        _liberer(verrou_global)
+
+
+def nettoyer_snapshots(snapshot_path=SNAPSHOT_PATH):
+    """
+    Supprime les versions autres que la version courante qu'aucun processus
+    n'utilise (verrou exclusif obtenu sur leur fichier de verrou), les
+    dossiers temporaires abandonnés et l'ancien format à plat. Un seul
+    nettoyage ou une seule publication à la fois (verrou global).
+    """
+    snapshot_path = Path(snapshot_path)
+    verrou_global = _verrou(snapshot_path / VERROU_NETTOYAGE, fcntl.LOCK_EX if fcntl else 0)
+    try:
+        manifest = lire_manifest(snapshot_path)
+        if manifest is not None:
+            _nettoyer(snapshot_path, Path(manifest['dossier']).name)
+    finally:
+        _liberer(verrou_global)
+
+
+def ecrire_snapshot(df, version, snapshot_path=SNAPSHOT_PATH, remplacer=False):
+    """
+    Écrit le DataFrame nettoyé en fichiers colonnes .npy + manifest JSON.
+    Les colonnes texte sont stockées en codes (type_codes) + dictionnaire trié,
+    les colonnes numériques dans leur plus petit type sans perte.
+
+    Chaque version est écrite dans son propre dossier (snapshot/<version>/),
+    d'abord sous un nom temporaire renommé à la fin, puis publiée en
+    remplaçant atomiquement le pointeur snapshot/courant.json: un lecteur
+    concurrent voit l'ancienne ou la nouvelle version, jamais un mélange.
+    Si un autre processus a déjà publié le dossier de cette version (mêmes
+    fichiers bruts), il est repris tel quel et les processus partagent ses
+    pages; remplacer=True écrit un nouveau dossier dans tous les cas.
+    """
+    snapshot_path = Path(snapshot_path)
+    snapshot_path.mkdir(parents=True, exist_ok=True)
+    tmp_path = snapshot_path / f".tmp-{version}-{os.getpid()}"
+    if tmp_path.exists():
+        shutil.rmtree(tmp_path)
+    tmp_path.mkdir()
+    (tmp_path / VERROU_NAME).touch()
+
+    colonnes = []
+    for i, col in enumerate(df.columns):
+        fichier = f"col_{i:03d}.npy"
+        serie = df[col]
+        if pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_bool_dtype(serie):
+            np.save(tmp_path / fichier, reduire_numerique(serie.to_numpy()))
+            colonnes.append({
+                'nom': col,
+                'fichier': fichier,
+                'type': 'numerique',
+                'dtype': str(serie.dtype)
+            })
+        else:
+            codes, categories = encoder_texte(serie)
+            np.save(tmp_path / fichier, codes.astype(type_codes(len(categories))))
+            colonnes.append({
+                'nom': col,
+                'fichier': fichier,
+                'type': 'texte',
+                'categories': categories
+            })
+
+    manifest = {
+        'format': SNAPSHOT_FORMAT_VERSION,
+        'version': version,
+        'nb_lignes': int(len(df)),
+        'colonnes': colonnes
+    }
+    with open(tmp_path / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+
+    dossier = snapshot_path / version
+    if remplacer:
+        dossier = snapshot_path / f"{version}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+    manifest = _publier(snapshot_path, dossier, tmp_path)
+    if manifest is None:
+        raise OSError(f"Snapshot {dossier} illisible après publication")
+    return manifest
+
+
+def lire_manifest(snapshot_path=SNAPSHOT_PATH):
+    """
+    Retourne le manifest de la version courante (pointeur lu une seule fois,
+    chemin de la version dans manifest['dossier']), ou None s'il est absent
+    ou illisible.
+    """
+    snapshot_path = Path(snapshot_path)
+    try:
+        with open(snapshot_path / POINTEUR_NAME, encoding='utf-8') as f:
+            pointeur = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return _manifest_dossier(snapshot_path / pointeur['dossier'])
+
+
+def lire_snapshot(snapshot_path=SNAPSHOT_PATH, manifest=None, compact=False, mmap=False):
+    """
+    Reconstruit le DataFrame à partir des fichiers colonnes de la version du
+    manifest (par défaut la version courante).
+    compact=True: colonnes texte en Categorical et types numériques réduits.
+    mmap=True (avec compact): colonnes projetées en lecture seule depuis les
+    fichiers, sans copie (pages partagées entre processus); la version reste
+    verrouillée contre le nettoyage tant que ses colonnes sont vivantes.
+    Retourne None si la version a été supprimée entre-temps.
+    """
+    if manifest is None:
+        manifest = lire_manifest(snapshot_path)
+        if manifest is None:
+            return None
+    dossier = Path(manifest['dossier'])
+
+    fd = _verrou(dossier / VERROU_NAME, fcntl.LOCK_SH if fcntl else 0)
+    if fd is None or not (dossier / MANIFEST_NAME).exists():
+        # Version supprimée par un nettoyage avant la prise du verrou
+        _liberer(fd)
+        return None
+    verrou = _VerrouLecture(fd)
+
+    mmap = mmap and compact
+    data = {}
+    for col in manifest['colonnes']:
+        valeurs = np.load(dossier / col['fichier'], mmap_mode='r' if mmap else None)
+        if mmap:
+            valeurs._verrou_snapshot = verrou
+        valeurs = np.asarray(valeurs)  # vue ndarray (sans copie) du memmap
+        if col['type'] == 'texte':
+            categorie = pd.Categorical.from_codes(valeurs, categories=col['categories'])
+            data[col['nom']] = categorie if compact else categorie.astype(object)
+        else:
+            data[col['nom']] = valeurs if compact else valeurs.astype(col['dtype'])
+    # copy=False: pas de regroupement des colonnes en blocs (qui copierait)
+    return pd.DataFrame(data, copy=False)
+
+
+# =============================================================================
+# POINT D'ENTRÉE COMMUN
+# =============================================================================
+
+def charger_donnees(raw_path=RAW_PATH, snapshot_path=SNAPSHOT_PATH, force=False, verbose=True,
+                    compact=False, mmap=False):
+    """
+    Retourne le DataFrame nettoyé.
+    Utilise le snapshot s'il correspond aux fichiers bruts actuels, sinon
+    reparcourt les CSV et réécrit le snapshot.
+    compact=True: représentation compacte (voir compacter), utilisée par l'API.
+    mmap=True: colonnes projetées depuis le snapshot (voir lire_snapshot).
+    """
+    version = empreinte_sources(raw_path)
+    for _ in range(TENTATIVES_LECTURE):
+        manifest = None if force else lire_manifest(snapshot_path)
+        if manifest is not None and version is not None and manifest['version'] != version:
+            # Version déjà écrite par un autre processus mais pas (ou plus) publiée
+            manifest = _publier(Path(snapshot_path), Path(snapshot_path) / version)
+        if manifest is None or (version is not None and manifest['version'] != version):
+            break
+        if version is None and verbose:
+            print("⚠️ Fichiers bruts absents - utilisation du snapshot existant")
+        df = lire_snapshot(snapshot_path, manifest, compact=compact, mmap=mmap)
+        if df is not None:
+            if verbose:
+                print(f"💾 Snapshot {manifest['version']} chargé ({len(df):,} enregistrements)")
+            return df
+        # Version remplacée et supprimée entre la lecture du pointeur et celle des colonnes
+
+    if version is None:
+        raise FileNotFoundError(f"Fichiers bruts introuvables dans {raw_path} et aucun snapshot disponible")
+
+    if verbose:
+        print("📊 Lecture des fichiers CSV bruts...")
+    df_brut = lire_csv_bruts(raw_path)
+    taille_avant = len(df_brut)
+    df = nettoyer_donnees(df_brut)
+    if verbose:
+        print(f"   • Enregistrements nettoyés: {taille_avant - len(df):,} supprimés")
+
+    try:
+        manifest = ecrire_snapshot(df, version, snapshot_path, remplacer=force)
+        if verbose:
+            print(f"💾 Snapshot {version} écrit dans {manifest['dossier']}")
+        if mmap and compact:
+            df_projete = lire_snapshot(snapshot_path, manifest, compact=True, mmap=True)
+            if df_projete is not None:
+                return df_projete
+    except OSError as e:
+        print(f"⚠️ Impossible d'écrire le snapshot: {e}")
+
+    return compacter(df) if compact else df
+
+
+def version_snapshot(snapshot_path=SNAPSHOT_PATH):
+    """Version (empreinte) du snapshot courant, ou None"""
+    manifest = lire_manifest(snapshot_path)
+    return manifest['version'] if manifest else None
+
+
+if __name__ == "__main__":
+    force = '--force' in sys.argv
+    print("=" * 60)
+    print("💾 CONSTRUCTION DU SNAPSHOT DES DONNÉES")
+    print("=" * 60)
+    df = charger_donnees(force=force)
+    print(f"\n✅ {len(df):,} enregistrements | version {version_snapshot()}")
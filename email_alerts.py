@@ -10,13 +10,14 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
-import pandas as pd
 import numpy as np
 from pathlib import Path
 from datetime import datetime
 import json
 import os
 
+from data_snapshot import charger_donnees
+
 OUTPUT_PATH = Path("output_projet4")
 ALERTS_PATH = OUTPUT_PATH / "alertes"
 ALERTS_PATH.mkdir(exist_ok=True)
@@ -387,7 +388,7 @@ def generate_student_alerts(df, preview_only=True):
     print("\n📧 Génération des alertes étudiants...")
     
     # Calculer les statistiques par étudiant
-    student_stats = df.groupby('ID').agg({
+    student_stats = df.groupby('ID', observed=True).agg({
         'Note_sur_20': 'mean',
         'Filiere': 'first',
         'Needs_Support': ['sum', 'count']
@@ -460,7 +461,7 @@ def generate_module_alerts(df, preview_only=True):
     print("\n📧 Génération des alertes modules...")
     
     # Statistiques par module
-    module_stats = df.groupby(['Module', 'Filiere']).agg({
+    module_stats = df.groupby(['Module', 'Filiere'], observed=True).agg({
         'Note_sur_20': 'mean',
         'Needs_Support': ['sum', 'count'],
         'ID': 'nunique'
@@ -515,12 +516,12 @@ def generate_admin_report(df, preview_only=True):
     # Statistiques générales
     nb_etudiants = df['ID'].nunique()
     
-    student_stats = df.groupby('ID')['Note_sur_20'].mean().reset_index()
+    student_stats = df.groupby('ID', observed=True)['Note_sur_20'].mean().reset_index()
     nb_critiques = len(student_stats[student_stats['Note_sur_20'] < 7])
     nb_difficulte = len(student_stats[(student_stats['Note_sur_20'] >= 7) & (student_stats['Note_sur_20'] < 10)])
     
     # Par filière
-    filiere_stats = df.groupby('Filiere').agg({
+    filiere_stats = df.groupby('Filiere', observed=True).agg({
         'ID': 'nunique',
         'Note_sur_20': 'mean',
         'Needs_Support': 'mean'
@@ -547,7 +548,7 @@ def generate_admin_report(df, preview_only=True):
         """
     
     # Modules critiques
-    module_stats = df.groupby('Module').agg({
+    module_stats = df.groupby('Module', observed=True).agg({
         'Filiere': 'first',
         'Needs_Support': 'mean',
         'ID': 'count'
@@ -602,26 +603,8 @@ def generate_all_alerts():
     print("📧 SYSTÈME D'ALERTES EMAIL - SOUTIEN PÉDAGOGIQUE")
     print("=" * 60)
     
-    # Charger les données
-    RAW_PATH = Path("raw")
-    df1 = pd.read_csv(RAW_PATH / "1- one_clean.csv", encoding='utf-8')
-    df2 = pd.read_csv(RAW_PATH / "2- two_clean.csv", encoding='utf-8')
-    df = pd.concat([df1, df2], ignore_index=True)
-    
-    # Nettoyage
-    df['ID'] = df['ID'].astype(str)
-    df = df[~df['ID'].isin(['Unknown', 'unknown', 'nan', 'None', ''])].copy()
-    df = df[~df['Major'].astype(str).str.lower().str.contains('unknown', na=False)].copy()
-    df = df[~df['Subject'].astype(str).str.lower().str.contains('unknown', na=False)].copy()
-    
-    df = df.rename(columns={'Major': 'Filiere', 'Subject': 'Module'})
-    df['Practical'] = pd.to_numeric(df['Practical'], errors='coerce').fillna(0)
-    df['Theoretical'] = pd.to_numeric(df['Theoretical'], errors='coerce').fillna(0)
-    df['Total'] = pd.to_numeric(df['Total'], errors='coerce').fillna(df['Practical'] + df['Theoretical'])
-    df['Note_sur_20'] = df['Total'] / 5
-    df['Needs_Support'] = ((df['Status'] == 'Fail') | 
-                           (df['Total'] < 50) | 
-                           (df['Status'].isin(['Absent', 'Debarred', 'Withdrawal']))).astype(int)
+    # Charger les données (snapshot nettoyé, CSV seulement si modifiés)
+    df = charger_donnees()
     
     print(f"\n📊 Données chargées: {len(df):,} enregistrements")
     
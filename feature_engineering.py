@@ -0,0 +1,576 @@
+# -*- coding: utf-8 -*-
+"""
+🧮 Features du Modèle de Soutien (entraînement + service)
+==========================================================
+Calcul unique des features utilisées par le modèle XGBoost, partagé par:
+- projet4_support_recommendation.py (entraînement)
+- backend/app.py (prédictions de l'API)
+- predict_external.py (prédictions hors base)
+
+Les statistiques de population (promotion Filière + Année, modules,
+combinaisons Filière-Module) sont calculées une fois à l'entraînement dans
+des tables de correspondance (TablesFeatures) sauvegardées avec le modèle
+(clé 'tables_features' du joblib). Au service, les features sont obtenues
+par jointure sur ces tables: mêmes définitions et mêmes valeurs qu'à
+l'entraînement, sans reparcourir toutes les données.
+
+Les features propres à l'étudiant (profil, charge, absentéisme, forces par
+pôle) sont calculées sur son historique avec les mêmes fonctions.
+"""
+
+import re
+import tracemalloc
+
+import pandas as pd
+import numpy as np
+from sklearn.preprocessing import LabelEncoder
+
+# Seuil de validation au Maroc (note minimale pour valider un module)
+SEUIL_VALIDATION = 10
+
+# Taux d'échec au-delà duquel une combinaison Filière-Module est à haut risque
+SEUIL_COMBO_HAUT_RISQUE = 0.3
+
+# Statuts bruts -> système marocain
+STATUS_MAPPING = {
+    'Pass': 'Validé',
+    'Fail': 'Non_Validé',
+    'Absent': 'Absent',
+    'Debarred': 'Exclu',
+    'Withdrawal': 'Abandon',
+    'Withhold': 'En_Attente',
+    'Exempt': 'Dispensé'
+}
+
+# Statuts comptés dans le taux d'absentéisme
+STATUTS_ABSENCE = ['Absent', 'Exclu', 'Abandon']
+
+# Features hors forces par pôle et variables encodées
+FEATURES_BASE = [
+    'Practical', 'Theoretical', 'Total', 'Note_sur_20', 'Semester', 'Annee',
+    'peer_group_avg_total', 'peer_group_avg_note20', 'peer_group_avg_practical', 'peer_group_support_rate',
+    'deviation_from_peer', 'deviation_note20', 'student_avg_total', 'student_std_total',
+    'student_min_total', 'student_max_total', 'student_module_count',
+    'student_avg_note20', 'student_min_note20',
+    'student_avg_practical', 'student_avg_theoretical', 'student_support_rate',
+    'module_avg_total', 'module_avg_note20', 'module_taux_echec', 'module_effectif',
+    'combo_taux_echec', 'combo_haut_risque', 'charge_semestre',
+    'taux_absenteisme', 'ratio_pratique', 'ecart_theorie_pratique',
+    'modules_rattrapage', 'distance_seuil'
+]
+
+COLONNES_PEER = ['peer_group_avg_total', 'peer_group_avg_note20', 'peer_group_avg_practical',
+                 'peer_group_avg_theoretical', 'peer_group_support_rate']
+COLONNES_MODULE = ['module_avg_total', 'module_avg_note20', 'module_taux_echec', 'module_effectif']
+COLONNES_COMBO = ['combo_taux_echec', 'combo_haut_risque']
+COLONNES_PROFIL = ['student_avg_total', 'student_std_total', 'student_min_total', 'student_max_total',
+                   'student_module_count', 'student_avg_note20', 'student_min_note20',
+                   'student_avg_practical', 'student_avg_theoretical',
+                   'student_support_count', 'student_support_rate']
+# Features calculées ligne à ligne (ou par semestre / étudiant) par ajouter_features
+COLONNES_LIGNE = ['deviation_from_peer', 'deviation_note20', 'charge_semestre', 'taux_absenteisme',
+                  'ratio_pratique', 'ecart_theorie_pratique', 'modules_rattrapage', 'distance_seuil']
+
+
+# =============================================================================
+# VARIABLE CIBLE ET STATUTS
+# =============================================================================
+
+def statut_ma(status):
+    """Statuts bruts -> statuts du système marocain (inconnus conservés)"""
+    return status.map(STATUS_MAPPING).fillna(status)
+
+
+# Statuts marocains qui signalent à eux seuls un besoin de soutien
+# (absentéisme, exclusion, abandon, en attente)
+STATUTS_MA_SOUTIEN = STATUTS_ABSENCE + ['En_Attente']
+
+# Mentions du barème marocain: (note minimale, mention), par seuil décroissant
+MENTIONS_MA = [(16, 'Très_Bien'), (14, 'Bien'), (12, 'Assez_Bien'), (10, 'Passable')]
+
+
+def cible_soutien(df):
+    """
+    Variable cible d'entraînement (Needs_Support) pour chaque ligne.
+    Critères adaptés au système universitaire marocain:
+    1. Statut = Non Validé / Ajourné
+    2. Note < 10/20 (seuil de validation standard, note non nulle)
+    3. Note originale faible (si sur 100, < 50, note non nulle)
+    4. Patterns problématiques (absentéisme, exclusion, abandon)
+    5. En attente (généralement problème administratif ou académique)
+    Calcul vectorisé (voir verifier_vectorisation.py).
+    """
+    note = df['Note_sur_20']
+    total = df['Total']
+    besoin = (
+        (df['Status'] == 'Fail') | (df['Statut_MA'] == 'Non_Validé')
+        | ((note > 0) & (note < SEUIL_VALIDATION))
+        | ((total > 0) & (total < 50))
+        | df['Statut_MA'].isin(STATUTS_MA_SOUTIEN)
+    )
+    return besoin.astype(int)
+
+
+def mentions_ma(notes):
+    """Mention du barème marocain de chaque note /20 (Non_Évalué si absente ou nulle)"""
+    notes = pd.Series(notes)
+    conditions = [notes.isna() | (notes == 0)] + [notes >= seuil for seuil, _ in MENTIONS_MA]
+    choix = ['Non_Évalué'] + [mention for _, mention in MENTIONS_MA]
+    return pd.Series(np.select(conditions, choix, default='Non_Validé'), index=notes.index, dtype=object)
+
+
+def preparer_entrainement(df):
+    """
+    Ajoute Statut_MA et la cible d'entraînement à un DataFrame nettoyé.
+    Utilisé pour ajuster les tables sur les données servies (ancien modèle
+    sans tables) ou pour un historique construit à la volée.
+    """
+    df = df.copy()
+    for col in ['ID', 'Filiere', 'Module', 'Status', 'AnneUniversitaire']:
+        if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object)
+    df['Statut_MA'] = statut_ma(df['Status'])
+    df['Needs_Support'] = cible_soutien(df)
+    return df
+
+
+# =============================================================================
+# PÔLES DE COMPÉTENCES
+# =============================================================================
+
+# Pôles de compétences marocains: (pôle, mots-clés), le premier pôle dont un
+# mot-clé apparaît dans le nom du module (en minuscules) l'emporte
+POLES_MOTS_CLES = [
+    # Sciences fondamentales
+    ('Mathematiques', ['رياضيات', 'math', 'جبر', 'algebra', 'analyse', 'probabilité']),
+    ('Physique', ['فيزياء', 'physics', 'physique', 'mécanique', 'thermodynamique']),
+    # Sciences de l'ingénieur
+    ('Electrique', ['كهربائية', 'electrical', 'électrique', 'دارات', 'circuits']),
+    ('Electronique', ['الكترون', 'electron', 'électronique']),
+    ('Mecanique', ['ميكانيك', 'mechanical', 'mécanique', 'rdm']),
+    ('Automatique', ['تحكم', 'control', 'automatique', 'régulation']),
+    # Informatique
+    ('Informatique', ['برمج', 'program', 'حاسوب', 'computer', 'informatique', 'algorithme']),
+    # Langues et communication
+    ('Langues_Communication', ['انكليزية', 'english', 'لغة', 'français', 'communication', 'tec']),
+    # Gestion et économie
+    ('Gestion_Economie', ['اقتصاد', 'économie', 'gestion', 'management', 'comptabilité']),
+]
+
+
+def categoriser_module(module):
+    """Catégorisation d'un module selon les pôles de compétences marocains"""
+    module_lower = str(module).lower()
+    for pole, mots in POLES_MOTS_CLES:
+        if any(mot in module_lower for mot in mots):
+            return pole
+    return 'Autres'
+
+
+def poles_modules(modules):
+    """
+    Pôle de chaque module: les noms distincts sont catégorisés une fois
+    (recherche vectorisée des mots-clés), puis diffusés par leurs codes.
+    """
+    codes, distincts = pd.factorize(pd.Series(modules).astype(object))
+    noms = pd.Series(distincts, dtype=object).astype(str).str.lower()
+    conditions = [noms.str.contains('|'.join(re.escape(mot) for mot in mots), regex=True).to_numpy(dtype=bool)
+                  for _, mots in POLES_MOTS_CLES]
+    poles = np.select(conditions, [pole for pole, _ in POLES_MOTS_CLES], default='Autres') if len(noms) else []
+    poles = np.append(np.asarray(poles, dtype=object), 'Autres')
+    return pd.Series(poles[codes], index=getattr(modules, 'index', None))
+
+
+# =============================================================================
+# TABLES DE CORRESPONDANCE (ajustées à l'entraînement)
+# =============================================================================
+
+class TablesFeatures:
+    """
+    Statistiques de population figées à l'entraînement:
+    - peer: moyennes par promotion (Filiere, Annee)
+    - modules: difficulté par module
+    - combos: taux d'échec par (Filiere, Module)
+    - defauts: valeurs globales pour les clés inconnues
+    - force_cols, le_filiere, le_pole: colonnes et encodages du modèle
+    """
+
+    def __init__(self, peer, modules, combos, defauts, force_cols, le_filiere, le_pole,
+                 seuil_validation=SEUIL_VALIDATION):
+        self.peer = peer
+        self.modules = modules
+        self.combos = combos
+        self.defauts = defauts
+        self.force_cols = force_cols
+        self.le_filiere = le_filiere
+        self.le_pole = le_pole
+        self.seuil_validation = seuil_validation
+
+    @property
+    def feature_columns(self):
+        """Colonnes du modèle, dans l'ordre de l'entraînement"""
+        return FEATURES_BASE + self.force_cols + ['Filiere_encoded', 'pole_encoded']
+
+    def stats_modules(self, modules, filieres, correspondances=None):
+        """
+        Statistiques module / combinaison pour chaque (module, filière).
+        Un module absent des tables est remplacé par les modules que
+        correspondances(module) lui associe (statistiques regroupées, pondérées
+        par les effectifs); sans correspondance: valeurs globales.
+        """
+        connus = set(self.modules['Module'])
+        paires = []
+        for position, module in enumerate(modules):
+            if module in connus:
+                paires.append((position, module))
+            elif module is not None and correspondances is not None:
+                paires.extend((position, nom) for nom in correspondances(module) if nom in connus)
+        paires = pd.DataFrame(paires, columns=['position', 'Module'])
+        paires['Filiere'] = pd.Series(list(filieres), dtype=object).to_numpy()[paires['position'].to_numpy(dtype=np.int64)]
+
+        # Sommes pondérées par effectif (moyennes exactes sur les modules regroupés)
+        paires = paires.merge(self.modules, on='Module', how='left')
+        paires = paires.merge(self.combos[['Filiere', 'Module', 'combo_taux_echec', 'combo_effectif']],
+                              on=['Filiere', 'Module'], how='left')
+        paires['combo_effectif'] = paires['combo_effectif'].fillna(0)
+        n = paires['module_effectif']
+        sommes = pd.DataFrame({
+            'position': paires['position'],
+            'effectif': n,
+            'total': paires['module_avg_total'] * n,
+            'note20': paires['module_avg_note20'] * n,
+            'echecs': paires['module_taux_echec'] * n,
+            'combo_effectif': paires['combo_effectif'],
+            'combo_echecs': paires['combo_taux_echec'].fillna(0) * paires['combo_effectif']
+        }).groupby('position').sum()
+
+        stats = pd.DataFrame(index=pd.RangeIndex(len(modules)))
+        stats['module_avg_total'] = sommes['total'] / sommes['effectif']
+        stats['module_avg_note20'] = sommes['note20'] / sommes['effectif']
+        stats['module_taux_echec'] = sommes['echecs'] / sommes['effectif']
+        stats['module_effectif'] = sommes['effectif']
+        # Filière absente pour ce module: taux du module
+        stats['combo_taux_echec'] = (sommes['combo_echecs'] / sommes['combo_effectif']).where(
+            sommes['combo_effectif'] > 0, stats['module_taux_echec'])
+        for col in COLONNES_MODULE + ['combo_taux_echec']:
+            stats[col] = stats[col].fillna(self.defauts[col])
+        stats['combo_haut_risque'] = (stats['combo_taux_echec'] > SEUIL_COMBO_HAUT_RISQUE).astype(int)
+        return stats
+
+    def encoder(self, encodeur, valeurs):
+        """Codes d'un LabelEncoder (0 pour une valeur inconnue)"""
+        codes = pd.Index(encodeur.classes_).get_indexer(pd.Index(valeurs).astype(object))
+        return np.where(codes < 0, 0, codes)
+
+
+def ajuster_tables(df):
+    """
+    Calcule les tables à partir du DataFrame d'entraînement (avec Statut_MA
+    et Needs_Support, voir preparer_entrainement).
+    """
+    # Performance du groupe de pairs (Filière + Année)
+    peer = df.groupby(['Filiere', 'Annee']).agg({
+        'Total': 'mean',
+        'Note_sur_20': 'mean',
+        'Practical': 'mean',
+        'Theoretical': 'mean',
+        'Needs_Support': 'mean'
+    }).reset_index()
+    peer.columns = ['Filiere', 'Annee'] + COLONNES_PEER
+
+    # Difficulté des modules
+    modules = df.groupby('Module').agg({
+        'Total': 'mean',
+        'Note_sur_20': 'mean',
+        'Needs_Support': 'mean',
+        'ID': 'count'
+    }).reset_index()
+    modules.columns = ['Module'] + COLONNES_MODULE
+
+    # Combinaisons Filière-Module
+    combos = df.groupby(['Filiere', 'Module']).agg({
+        'Needs_Support': 'mean',
+        'ID': 'count'
+    }).reset_index()
+    combos.columns = ['Filiere', 'Module', 'combo_taux_echec', 'combo_effectif']
+    combos['combo_haut_risque'] = (combos['combo_taux_echec'] > SEUIL_COMBO_HAUT_RISQUE).astype(int)
+
+    # Valeurs globales (clé absente de l'entraînement)
+    taux_global = df['Needs_Support'].mean()
+    defauts = {
+        'peer_group_avg_total': df['Total'].mean(),
+        'peer_group_avg_note20': df['Note_sur_20'].mean(),
+        'peer_group_avg_practical': df['Practical'].mean(),
+        'peer_group_avg_theoretical': df['Theoretical'].mean(),
+        'peer_group_support_rate': taux_global,
+        'module_avg_total': df['Total'].mean(),
+        'module_avg_note20': df['Note_sur_20'].mean(),
+        'module_taux_echec': taux_global,
+        'module_effectif': float(modules['module_effectif'].median()),
+        'combo_taux_echec': taux_global,
+        'combo_haut_risque': int(taux_global > SEUIL_COMBO_HAUT_RISQUE)
+    }
+
+    poles = poles_modules(df['Module'])
+    force_cols = ['force_' + p for p in sorted(poles.unique())]
+
+    le_filiere = LabelEncoder().fit(df['Filiere'].fillna('Inconnue'))
+    le_pole = LabelEncoder().fit(poles.fillna('Autres'))
+
+    return TablesFeatures(peer, modules, combos, defauts, force_cols, le_filiere, le_pole)
+
+
+def tables_modele(model_data, df=None):
+    """
+    Tables du modèle chargé: celles sauvegardées à l'entraînement, ou, pour
+    un modèle qui les précède, tables ajustées sur df (données nettoyées,
+    même variable cible qu'à l'entraînement) en gardant les encodages et les
+    colonnes de forces du modèle.
+    """
+    tables = model_data.get('tables_features')
+    if tables is not None or df is None:
+        return tables
+    tables = ajuster_tables(preparer_entrainement(df))
+    tables.force_cols = [c for c in model_data['feature_columns'] if c.startswith('force_')]
+    tables.le_filiere = model_data.get('le_filiere', tables.le_filiere)
+    tables.le_pole = model_data.get('le_pole', tables.le_pole)
+    tables.seuil_validation = model_data.get('seuil_validation', SEUIL_VALIDATION)
+    return tables
+
+
+def _joindre(df, table, cles, colonnes, defauts):
+    """Jointure gauche sur une table (ordre des lignes conservé)"""
+    df = df.merge(table[cles + colonnes], on=cles, how='left')
+    for col in colonnes:
+        if df[col].isna().any():
+            df[col] = df[col].fillna(defauts[col])
+    return df
+
+
+# =============================================================================
+# FEATURES
+# =============================================================================
+
+def profil_etudiants(df):
+    """Profil de performance par étudiant (historique)"""
+    student_profile = df.groupby('ID').agg({
+        'Total': ['mean', 'std', 'min', 'max', 'count'],
+        'Note_sur_20': ['mean', 'min'],
+        'Practical': 'mean',
+        'Theoretical': 'mean',
+        'Needs_Support': ['sum', 'mean']
+    }).reset_index()
+    student_profile.columns = ['ID'] + COLONNES_PROFIL
+    student_profile['student_std_total'] = student_profile['student_std_total'].fillna(0)
+    return student_profile
+
+
+def charge_semestres(df):
+    """Nombre de modules distincts par (étudiant, année universitaire, semestre)"""
+    workload = df.groupby(['ID', 'AnneUniversitaire', 'Semester'])['Module'].nunique().reset_index()
+    workload.columns = ['ID', 'AnneUniversitaire', 'Semester', 'charge_semestre']
+    return workload
+
+
+def absenteisme(df):
+    """Part des modules en absence / exclusion / abandon, par étudiant"""
+    absence = df['Statut_MA'].isin(STATUTS_ABSENCE).groupby(df['ID']).mean().reset_index()
+    absence.columns = ['ID', 'taux_absenteisme']
+    return absence
+
+
+def forces_poles(df, poles, force_cols):
+    """Moyenne /20 de l'étudiant par pôle de compétences (0 si aucun module)"""
+    pole_perf = df.groupby([df['ID'], poles.rename('pole_competence')])['Note_sur_20'].mean().unstack(fill_value=0)
+    pole_perf = pole_perf.add_prefix('force_').reindex(columns=force_cols, fill_value=0)
+    return pole_perf.reset_index()
+
+
+def _positions(table, cles, df):
+    """Ligne de `table` correspondant à chaque ligne de df (-1: clé absente)"""
+    if len(cles) == 1:
+        return pd.Index(table[cles[0]]).get_indexer(df[cles[0]])
+    return pd.MultiIndex.from_frame(table[cles]).get_indexer(pd.MultiIndex.from_frame(df[cles]))
+
+
+def _prendre(valeurs, positions):
+    """valeurs[positions] (NaN pour une clé absente, comme une jointure gauche)"""
+    valeurs = np.asarray(valeurs)
+    if len(positions) and positions.min() < 0:
+        valeurs = np.append(valeurs.astype(float), np.nan)
+    return valeurs[positions]
+
+
+def _suivre_memoire(suivi, sous_etape):
+    """Mémoire (courante, pic) après une sous-étape, si tracemalloc est actif"""
+    if suivi is not None and tracemalloc.is_tracing():
+        suivi[sous_etape] = tracemalloc.get_traced_memory()
+
+
+def ajouter_features(df, tables, suivi_memoire=None):
+    """
+    Features de chaque ligne (étudiant, module) telles qu'à l'entraînement.
+    df doit contenir Statut_MA et Needs_Support (voir preparer_entrainement).
+
+    Assemblage en une passe: chaque table de groupe (promotion, étudiant,
+    module, combinaison, semestre, pôles) est calculée une fois puis reportée
+    sur les lignes par les positions de leurs clés. Les features réelles sont
+    écrites dans une matrice préallouée (une ligne par colonne) qui devient
+    sans copie le bloc de colonnes du résultat; aucune jointure ne recopie le
+    DataFrame.
+    suivi_memoire: dictionnaire rempli avec (mémoire courante, pic) après
+    chaque sous-étape quand tracemalloc est actif.
+
+    Retourne un nouveau DataFrame (index 0..n-1): colonnes de df puis
+    colonnes de features, dans l'ordre de l'entraînement.
+    """
+    d = tables.defauts
+    nb_colonnes = (len(COLONNES_PEER) + len(COLONNES_PROFIL) + len(COLONNES_MODULE) + len(COLONNES_COMBO)
+                   + len(COLONNES_LIGNE) + len(tables.force_cols))
+    matrice = np.empty((nb_colonnes, len(df)))
+    reelles = []      # colonnes écrites dans la matrice (dans l'ordre)
+    autres = {}       # colonnes entières / texte
+    ordre = []
+
+    def ecrire(col, valeurs):
+        valeurs = np.asarray(valeurs)
+        ordre.append(col)
+        if valeurs.dtype == np.float64:
+            matrice[len(reelles)] = valeurs
+            reelles.append(col)
+        else:
+            autres[col] = valeurs
+
+    def colonne(col):
+        return matrice[reelles.index(col)] if col in reelles else autres[col]
+
+    def joindre(table, cles, noms):
+        positions = _positions(table, cles, df)
+        for col in noms:
+            valeurs = pd.Series(_prendre(table[col].to_numpy(), positions))
+            ecrire(col, valeurs.fillna(d[col]) if valeurs.isna().any() else valeurs)
+
+    def reporter(table, cles, noms):
+        positions = _positions(table, cles, df)
+        for col in noms:
+            ecrire(col, _prendre(table[col].to_numpy(), positions))
+
+    # Performance du groupe de pairs (Filière + Année)
+    joindre(tables.peer, ['Filiere', 'Annee'], COLONNES_PEER)
+    ecrire('deviation_from_peer', df['Total'].to_numpy() - np.nan_to_num(colonne('peer_group_avg_total')))
+    ecrire('deviation_note20', df['Note_sur_20'].to_numpy() - np.nan_to_num(colonne('peer_group_avg_note20')))
+    _suivre_memoire(suivi_memoire, 'pairs')
+
+    # Profil de performance étudiant (historique)
+    profil = profil_etudiants(df)
+    reporter(profil, ['ID'], COLONNES_PROFIL)
+    _suivre_memoire(suivi_memoire, 'profil_etudiant')
+
+    # Difficulté des modules et combinaisons Filière-Module
+    joindre(tables.modules, ['Module'], COLONNES_MODULE)
+    joindre(tables.combos, ['Filiere', 'Module'], COLONNES_COMBO)
+    _suivre_memoire(suivi_memoire, 'modules_combos')
+
+    # Charge de travail par semestre et absentéisme
+    reporter(charge_semestres(df), ['ID', 'AnneUniversitaire', 'Semester'], ['charge_semestre'])
+    reporter(absenteisme(df), ['ID'], ['taux_absenteisme'])
+    _suivre_memoire(suivi_memoire, 'charge_absenteisme')
+
+    # Équilibre TP/Cours
+    ecrire('ratio_pratique', df['Practical'] / (df['Total'] + 1))
+    ecrire('ecart_theorie_pratique', df['Theoretical'] - df['Practical'])
+
+    # Profil de force par pôle de compétences
+    poles = poles_modules(df['Module'])
+    ecrire('pole_competence', poles.to_numpy())
+    reporter(forces_poles(df, poles.rename('pole_competence'), tables.force_cols), ['ID'], tables.force_cols)
+    _suivre_memoire(suivi_memoire, 'poles')
+
+    # Indicateurs spécifiques au système LMD
+    ecrire('modules_rattrapage', colonne('student_support_count'))
+    ecrire('distance_seuil', df['Note_sur_20'] - tables.seuil_validation)
+
+    # Variables encodées
+    ecrire('Filiere_encoded', tables.encoder(tables.le_filiere, df['Filiere'].fillna('Inconnue')))
+    ecrire('pole_encoded', tables.encoder(tables.le_pole, poles.fillna('Autres')))
+
+    # Assemblage: bloc des features réelles (vue de la matrice) puis insertion
+    # des autres colonnes à leur place (chacune est un bloc, rien n'est recopié)
+    resultat = pd.DataFrame(matrice[:len(reelles)].T, columns=reelles, copy=False)
+    for position, col in enumerate(df.columns):
+        resultat.insert(position, col, df[col].array.copy())
+    for position, col in enumerate(ordre, start=len(df.columns)):
+        if col in autres:
+            resultat.insert(position, col, autres[col])
+    _suivre_memoire(suivi_memoire, 'assemblage')
+    return resultat
+
+
+def matrice_features(df, feature_columns):
+    """Matrice du modèle: colonnes dans l'ordre, manquants et infinis à 0"""
+    X = df.reindex(columns=feature_columns).fillna(0)
+    return X.replace([np.inf, -np.inf], 0)
+
+
+def annee_dominante(df):
+    """Année d'études la plus fréquente par étudiant (la plus petite en cas d'égalité)"""
+    effectifs = df.groupby(['ID', 'Annee']).size().rename('n').reset_index()
+    effectifs = effectifs.sort_values(['ID', 'n', 'Annee'], ascending=[True, False, True], kind='mergesort')
+    return effectifs.drop_duplicates('ID')[['ID', 'Annee']]
+
+
+def features_candidats(historique, candidats, tables, correspondances=None):
+    """
+    Features pour des couples (étudiant, module cible) non encore notés:
+    une ligne par candidat, dans l'ordre de `candidats`.
+    - historique: lignes nettoyées des étudiants (voir preparer_entrainement)
+    - candidats: DataFrame avec ID, Module (None = module non précisé) et
+      éventuellement Semester (1 par défaut)
+    - correspondances(module): noms de modules des tables regroupés sous un
+      nom qui n'y figure pas (par défaut aucun: valeurs globales)
+
+    Les features de l'étudiant sont calculées sur son historique avec les
+    mêmes fonctions qu'à l'entraînement; la ligne type (notes, année) est la
+    moyenne de l'historique. Promotion, module et combinaison sont lus dans
+    les tables.
+    """
+    h = historique
+    d = tables.defauts
+    lignes = candidats[['ID', 'Module']].copy()
+    lignes['Semester'] = candidats['Semester'].to_numpy() if 'Semester' in candidats else 1
+
+    # Ligne type de l'étudiant (moyennes de l'historique)
+    par_etudiant = h.groupby('ID')
+    type_etudiant = par_etudiant[['Practical', 'Theoretical', 'Total', 'Note_sur_20']].mean()
+    type_etudiant['Filiere'] = par_etudiant['Filiere'].first()
+    type_etudiant = type_etudiant.reset_index().merge(annee_dominante(h), on='ID', how='left')
+    lignes = lignes.merge(type_etudiant, on='ID', how='left')
+
+    # Performance du groupe de pairs (Filière + Année)
+    lignes = _joindre(lignes, tables.peer, ['Filiere', 'Annee'], COLONNES_PEER, d)
+    lignes['deviation_from_peer'] = lignes['Total'] - lignes['peer_group_avg_total']
+    lignes['deviation_note20'] = lignes['Note_sur_20'] - lignes['peer_group_avg_note20']
+
+    # Profil, absentéisme, forces par pôle: mêmes fonctions que l'entraînement
+    lignes = lignes.merge(profil_etudiants(h), on='ID', how='left')
+    lignes = lignes.merge(absenteisme(h), on='ID', how='left')
+    lignes = lignes.merge(forces_poles(h, poles_modules(h['Module']), tables.force_cols), on='ID', how='left')
+
+    # Charge: moyenne des semestres de l'étudiant
+    charge = charge_semestres(h).groupby('ID')['charge_semestre'].mean().reset_index()
+    lignes = lignes.merge(charge, on='ID', how='left')
+    lignes['modules_rattrapage'] = lignes['student_support_count']
+
+    # Module cible et combinaison Filière-Module
+    stats = tables.stats_modules(lignes['Module'], lignes['Filiere'], correspondances)
+    for col in COLONNES_MODULE + COLONNES_COMBO:
+        lignes[col] = stats[col].to_numpy()
+
+    lignes['ratio_pratique'] = lignes['Practical'] / (lignes['Total'] + 1)
+    lignes['ecart_theorie_pratique'] = lignes['Theoretical'] - lignes['Practical']
+    lignes['distance_seuil'] = lignes['Note_sur_20'] - tables.seuil_validation
+
+    lignes['pole_competence'] = poles_modules(lignes['Module']).to_numpy()
+    lignes['Filiere_encoded'] = tables.encoder(tables.le_filiere, lignes['Filiere'].fillna('Inconnue'))
+    lignes['pole_encoded'] = tables.encoder(tables.le_pole, lignes['pole_competence'])
+    return lignes
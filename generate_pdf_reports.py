@@ -20,6 +20,9 @@ from pathlib import Path
 from datetime import datetime
 import os
 
+from data_snapshot import charger_donnees
+from traduction_modules import TraducteurModules
+
 # Chemin absolu basé sur l'emplacement de ce fichier
 BASE_PATH = Path(__file__).parent.absolute()
 OUTPUT_PATH = BASE_PATH / "output_projet4"
@@ -134,6 +137,16 @@ TRADUCTION_MODULES = {
     'Unknown': 'Inconnu'
 }
 
+def module_non_traduit(nom_str):
+    """Nom sans traduction connue"""
+    # Si le nom contient des caractères arabes, retourner un placeholder
+    if any('\u0600' <= c <= '\u06FF' for c in nom_str):
+        return f'Module ({nom_str[:10]}...)'
+    return nom_str
+
+# Correspondance partielle dans les deux sens (clé dans le nom ou nom dans la clé)
+TRADUCTEUR_MODULES = TraducteurModules(TRADUCTION_MODULES, inverse=True, repli=module_non_traduit)
+
 def traduire_module(nom):
     """Traduit le nom du module de l'arabe vers le français"""
     if pd.isna(nom):
@@ -143,13 +156,7 @@ def traduire_module(nom):
     if nom_str in TRADUCTION_MODULES:
         return TRADUCTION_MODULES[nom_str]
     # Chercher une correspondance partielle
-    for ar, fr in TRADUCTION_MODULES.items():
-        if ar in nom_str or nom_str in ar:
-            return fr
-    # Si le nom contient des caractères arabes, retourner un placeholder
-    if any('\u0600' <= c <= '\u06FF' for c in nom_str):
-        return f'Module ({nom_str[:10]}...)'
-    return nom_str
+    return TRADUCTEUR_MODULES.traduire(nom_str)
 
 # Styles personnalisés - Design professionnel moderne
 def get_custom_styles():
@@ -719,10 +726,11 @@ def generate_student_report(student_id, df):
     # Section: Detail des modules
     elements.append(Paragraph("DETAIL PAR MODULE", styles['SectionTitle']))
     
+    # Traduire les noms des modules (une fois par module distinct)
+    noms_traduits = TRADUCTEUR_MODULES.traduire_serie(student_data['Module'], traduire_module).tolist()
+    
     modules_data = [['Module', 'Note', 'Statut', 'Soutien']]
-    for _, row in student_data.iterrows():
-        # Traduire le nom du module
-        module_name_traduit = traduire_module(row['Module'])
+    for (_, row), module_name_traduit in zip(student_data.iterrows(), noms_traduits):
         module_name = module_name_traduit[:35] + ('...' if len(module_name_traduit) > 35 else '')
         note = f"{row['Note_sur_20']:.1f}/20"
         statut = row['Status']
@@ -740,8 +748,8 @@ def generate_student_report(student_id, df):
     # Preparer les donnees pour le graphique
     chart_notes = []
     chart_labels = []
-    for _, row in student_data.iterrows():
-        module_court = traduire_module(row['Module'])[:12]
+    for (_, row), module_name_traduit in zip(student_data.iterrows(), noms_traduits):
+        module_court = module_name_traduit[:12]
         chart_labels.append(module_court)
         chart_notes.append(float(row['Note_sur_20']))
     
@@ -862,7 +870,7 @@ def generate_filiere_report(filiere, df):
     # Section: Modules critiques
     elements.append(Paragraph("MODULES CRITIQUES (Taux d'echec > 50%)", styles['SectionTitle']))
     
-    modules_stats = filiere_data.groupby('Module').agg({
+    modules_stats = filiere_data.groupby('Module', observed=True).agg({
         'Note_sur_20': 'mean',
         'Needs_Support': 'mean',
         'ID': 'count'
@@ -895,7 +903,7 @@ def generate_filiere_report(filiere, df):
     # Section: Repartition par profil
     elements.append(Paragraph("REPARTITION DES ETUDIANTS PAR PROFIL", styles['SectionTitle']))
     
-    student_avg = filiere_data.groupby('ID')['Note_sur_20'].mean().reset_index()
+    student_avg = filiere_data.groupby('ID', observed=True)['Note_sur_20'].mean().reset_index()
     
     def get_profil(moy):
         if moy >= 14: return "Excellence"
@@ -1059,7 +1067,7 @@ def generate_global_report(df):
     # Statistiques par filiere
     elements.append(Paragraph("PERFORMANCE PAR FILIERE", styles['SectionTitle']))
     
-    filiere_stats = df.groupby('Filiere').agg({
+    filiere_stats = df.groupby('Filiere', observed=True).agg({
         'ID': 'nunique',
         'Note_sur_20': 'mean',
         'Needs_Support': 'mean'
@@ -1125,7 +1133,7 @@ def generate_global_report(df):
     # Graphique: Camembert pour repartition globale des profils
     elements.append(Paragraph("VISUALISATION: Repartition Globale des Profils", styles['SectionTitle']))
     
-    student_avg_global = df.groupby('ID')['Note_sur_20'].mean().reset_index()
+    student_avg_global = df.groupby('ID', observed=True)['Note_sur_20'].mean().reset_index()
     
     def get_profil_global(moy):
         if moy >= 14: return "Excellence"
@@ -1178,7 +1186,7 @@ def generate_global_report(df):
     # Etudiants prioritaires
     elements.append(Paragraph("ETUDIANTS PRIORITAIRES", styles['SectionTitle']))
     
-    student_avg = df.groupby('ID').agg({
+    student_avg = df.groupby('ID', observed=True).agg({
         'Note_sur_20': 'mean',
         'Filiere': 'first',
         'Needs_Support': 'sum',
@@ -1333,32 +1341,8 @@ def generate_all_reports():
     print("GENERATION DES RAPPORTS PDF")
     print("=" * 60)
     
-    # Charger les donnees
-    RAW_PATH = Path("raw")
-    df1 = pd.read_csv(RAW_PATH / "1- one_clean.csv", encoding='utf-8')
-    df2 = pd.read_csv(RAW_PATH / "2- two_clean.csv", encoding='utf-8')
-    df = pd.concat([df1, df2], ignore_index=True)
-    
-    # Nettoyage
-    df['ID'] = df['ID'].astype(str)
-    df = df[~df['ID'].isin(['Unknown', 'unknown', 'nan', 'None', ''])].copy()
-    df = df[~df['Major'].astype(str).str.lower().str.contains('unknown', na=False)].copy()
-    df = df[~df['Subject'].astype(str).str.lower().str.contains('unknown', na=False)].copy()
-    
-    df = df.rename(columns={
-        'Major': 'Filiere',
-        'Subject': 'Module',
-        'MajorYear': 'Annee',
-        'OfficalYear': 'AnneUniversitaire'
-    })
-    
-    df['Practical'] = pd.to_numeric(df['Practical'], errors='coerce').fillna(0)
-    df['Theoretical'] = pd.to_numeric(df['Theoretical'], errors='coerce').fillna(0)
-    df['Total'] = pd.to_numeric(df['Total'], errors='coerce').fillna(df['Practical'] + df['Theoretical'])
-    df['Note_sur_20'] = df['Total'] / 5
-    df['Needs_Support'] = ((df['Status'] == 'Fail') | 
-                           (df['Total'] < 50) | 
-                           (df['Status'].isin(['Absent', 'Debarred', 'Withdrawal']))).astype(int)
+    # Charger les donnees (snapshot nettoye, CSV seulement si modifies)
+    df = charger_donnees()
     
     print(f"\n[INFO] Donnees chargees: {len(df):,} enregistrements")
     
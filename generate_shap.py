@@ -3,11 +3,11 @@ Génération SHAP - Version Adaptée pour CalibratedClassifierCV
 Extrait le modèle XGBoost et génère les visualisations
 """
 import joblib
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import shap
 from pathlib import Path
+from data_snapshot import charger_donnees
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -50,15 +50,7 @@ print(f"✅ Modèle chargé: {len(feature_columns)} features")
 
 # 2. Charger les données
 print("\n2. Chargement des données...")
-df1 = pd.read_csv("raw/1- one_clean.csv", encoding='utf-8')
-df2 = pd.read_csv("raw/2- two_clean.csv", encoding='utf-8')
-df = pd.concat([df1, df2], ignore_index=True)
-
-# Nettoyage
-df['ID'] = df['ID'].astype(str)
-df = df[~df['ID'].isin(['Unknown', 'unknown', 'nan', 'None', ''])].copy()
-df = df.rename(columns={'Major': 'Filiere', 'Subject': 'Module'})
-df['Note_sur_20'] = df['Total'] / 5
+df = charger_donnees()
 
 print(f"✅ {len(df):,} enregistrements chargés")
 
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+📥 Ingestion de Nouvelles Notes
+================================
+Ajoute un fichier CSV de notes (mêmes colonnes que raw/*.csv) aux données.
+
+Usage:
+    python ingest_grades.py notes.csv
+        -> enregistre le lot dans raw/increments (pris en compte au prochain
+           rechargement / démarrage de l'API)
+    python ingest_grades.py notes.csv --api http://localhost:5000 --token <jeton admin>
+        -> envoie le lot à l'API en cours d'exécution (mise à jour immédiate,
+           sans rechargement complet)
+"""
+
+import json
+import sys
+import io
+import urllib.request
+import urllib.error
+
+import pandas as pd
+
+from data_snapshot import RAW_PATH, preparer_lot, nettoyer_donnees, ecrire_increment
+
+# Fixer l'encodage pour Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+
+def envoyer_api(lot, url, token):
+    """POST /api/admin/ingest sur l'API en cours d'exécution"""
+    corps = json.dumps({'records': json.loads(lot.to_json(orient='records'))}).encode('utf-8')
+    requete = urllib.request.Request(
+        url.rstrip('/') + '/api/admin/ingest',
+        data=corps,
+        headers={'Content-Type': 'application/json', 'Authorization': f'Bearer {token}'},
+        method='POST'
+    )
+    try:
+        with urllib.request.urlopen(requete) as reponse:
+            return json.loads(reponse.read().decode('utf-8'))
+    except urllib.error.HTTPError as e:
+        erreur = json.loads(e.read().decode('utf-8') or '{}').get('error', e.reason)
+        raise RuntimeError(f"HTTP {e.code}: {erreur}")
+
+
+def option(nom):
+    """Valeur d'une option --nom valeur de la ligne de commande, ou None"""
+    if nom in sys.argv:
+        i = sys.argv.index(nom)
+        if i + 1 < len(sys.argv):
+            return sys.argv[i + 1]
+    return None
+
+
+if __name__ == "__main__":
+    fichiers = [a for a in sys.argv[1:] if a.endswith('.csv')]
+    if not fichiers:
+        print(__doc__)
+        sys.exit(1)
+
+    print("=" * 60)
+    print("📥 INGESTION DE NOUVELLES NOTES")
+    print("=" * 60)
+
+    try:
+        lot = preparer_lot(pd.concat([pd.read_csv(f, encoding='utf-8') for f in fichiers], ignore_index=True))
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    valides = nettoyer_donnees(lot.copy())
+    print(f"   • Lignes lues: {len(lot):,} | valides: {len(valides):,} | "
+          f"étudiants: {valides['ID'].nunique():,}")
+    if len(valides) == 0:
+        print("❌ Aucune ligne valide")
+        sys.exit(1)
+
+    url = option('--api')
+    if url:
+        token = option('--token')
+        if not token:
+            print("❌ --token requis avec --api")
+            sys.exit(1)
+        try:
+            resume = envoyer_api(lot, url, token)
+        except (RuntimeError, urllib.error.URLError) as e:
+            print(f"❌ Envoi à l'API échoué: {e}")
+            sys.exit(1)
+        print(f"\n✅ {resume['lignes_integrees']:,} notes intégrées | "
+              f"{len(resume['etudiants_touches']):,} étudiants touchés | "
+              f"version {resume['version_donnees']}")
+    else:
+        fichier = ecrire_increment(lot, RAW_PATH)
+        print(f"\n✅ Lot enregistré dans {fichier}")
+        print("   Pris en compte au prochain rechargement (POST /api/admin/reload)")
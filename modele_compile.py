@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+⚡ Modèle Compilé (évaluation NumPy des arbres XGBoost)
+=======================================================
+Exporte le modèle entraîné (StandardScaler + CalibratedClassifierCV sur
+XGBClassifier + K-Means) sous une forme compacte, évaluée avec NumPy seul:
+- arbres de chaque booster aplatis en tableaux contigus (variable, seuil,
+  fils gauche, fils droit, branche des valeurs manquantes, valeur des
+  feuilles), tous les arbres d'un booster parcourus ensemble niveau par
+  niveau pour toutes les lignes
+- constantes de normalisation (moyenne, écart-type du scaler)
+- calibration de chaque pli du CalibratedClassifierCV: sigmoïde (a, b) ou
+  isotonique (points de la fonction en escalier, interpolés linéairement);
+  un seul pli pour un modèle entraîné avec ensemble=False (un booster +
+  calibration hors-pli)
+- centres du K-Means et noms des profils
+
+Mêmes règles que XGBoost: comparaison en float32 (x < seuil -> fils gauche),
+marge = logit(base_score) + somme des feuilles, probabilité = sigmoïde.
+
+Export: python modele_compile.py (ou automatiquement à l'entraînement)
+-> output_projet4/model_soutien_compile.npz, chargé par l'API avec numpy.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+OUTPUT_PATH = Path("output_projet4")
+MODEL_PATH = OUTPUT_PATH / "model_soutien_pedagogique.joblib"
+COMPILE_PATH = OUTPUT_PATH / "model_soutien_compile.npz"
+
+# Version du format .npz (à incrémenter si la structure change)
+FORMAT_VERSION = 2
+
+
+def _sigmoide(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def centres_plus_proches(X, centres, taille_bloc=65536):
+    """
+    Indice du centre le plus proche (distance euclidienne) pour chaque ligne
+    de X, comme KMeans.predict: ||x||² - 2 x.c + ||c||² en un produit
+    matriciel par bloc de lignes (mémoire n x k, pas n x k x d).
+    """
+    X = np.asarray(X, dtype=np.float64)
+    centres = np.asarray(centres, dtype=np.float64)
+    normes_centres = (centres ** 2).sum(axis=1)
+    indices = np.empty(len(X), dtype=np.int64)
+    for debut in range(0, len(X), taille_bloc):
+        bloc = X[debut:debut + taille_bloc]
+        # ||x||² est constant par ligne: inutile pour l'argmin
+        indices[debut:debut + taille_bloc] = (normes_centres - 2.0 * bloc @ centres.T).argmin(axis=1)
+    return indices
+
+
+def centres_profils(model_data):
+    """
+    (centres K-Means, noms des profils) exportés avec le modèle (repris de
+    l'objet KMeans pour les modèles plus anciens), ou (None, None)
+    """
+    centres = model_data.get('centres_profils')
+    if centres is None:
+        kmeans = model_data.get('kmeans')
+        if kmeans is None:
+            return None, None
+        centres = kmeans.cluster_centers_
+    mapping = model_data.get('profil_mapping', {})
+    noms = np.array([mapping.get(c, 'Inconnu') for c in range(len(centres))], dtype=object)
+    return np.asarray(centres, dtype=np.float64), noms
+
+
+class ForetCompilee:
+    """Arbres d'un booster XGBoost (objectif binary:logistic) en tableaux NumPy"""
+
+    CHAMPS = ('variable', 'seuil', 'gauche', 'droite', 'manquant', 'racines')
+
+    def __init__(self, variable, seuil, gauche, droite, manquant, racines, base_marge, profondeur):
+        self.variable = np.ascontiguousarray(variable, dtype=np.int32)
+        self.seuil = np.ascontiguousarray(seuil, dtype=np.float32)
+        self.gauche = np.ascontiguousarray(gauche, dtype=np.int32)
+        self.droite = np.ascontiguousarray(droite, dtype=np.int32)
+        self.manquant = np.ascontiguousarray(manquant, dtype=np.int32)
+        self.racines = np.ascontiguousarray(racines, dtype=np.int32)
+        self.base_marge = float(base_marge)
+        self.profondeur = int(profondeur)
+
+    @classmethod
+    def depuis_booster(cls, booster):
+        """Aplatit les arbres d'un xgboost.Booster (modèle JSON exact, float32)"""
+        modele = json.loads(booster.save_raw('json'))
+        apprenant = modele['learner']
+        objectif = apprenant['objective']['name']
+        if objectif != 'binary:logistic' or apprenant['gradient_booster']['name'] != 'gbtree':
+            raise ValueError(f"Booster non supporté: {objectif}")
+        base_score = float(apprenant['learner_model_param']['base_score'].strip('[]'))
+
+        variable, seuil, gauche, droite, manquant, racines = [], [], [], [], [], []
+        profondeur = 0
+        decalage = 0
+        for arbre in apprenant['gradient_booster']['model']['trees']:
+            g = np.array(arbre['left_children'], dtype=np.int64)
+            d = np.array(arbre['right_children'], dtype=np.int64)
+            feuille = g < 0
+            # Feuille: pointe sur elle-même (point fixe du parcours), seuil = valeur
+            indices = np.arange(len(g)) + decalage
+            g = np.where(feuille, indices, g + decalage)
+            d = np.where(feuille, indices, d + decalage)
+            defaut_gauche = np.array(arbre['default_left'], dtype=bool)
+            variable.append(np.where(feuille, 0, arbre['split_indices']))
+            seuil.append(np.array(arbre['split_conditions'], dtype=np.float32))
+            gauche.append(g)
+            droite.append(d)
+            manquant.append(np.where(defaut_gauche, g, d))
+            racines.append(decalage)
+            profondeur = max(profondeur, cls._profondeur(arbre['left_children'], arbre['right_children']))
+            decalage += len(g)
+
+        return cls(np.concatenate(variable), np.concatenate(seuil), np.concatenate(gauche),
+                   np.concatenate(droite), np.concatenate(manquant), racines,
+                   np.log(base_score / (1 - base_score)), profondeur)
+
+    @staticmethod
+    def _profondeur(gauche, droite):
+        profondeur, niveau = 0, [0]
+        while True:
+            niveau = [f for n in niveau for f in (gauche[n], droite[n]) if f >= 0]
+            if not niveau:
+                return profondeur
+            profondeur += 1
+
+    def marge(self, X):
+        """Marge (logit) pour chaque ligne de X (float32, n x nb_variables)"""
+        X = np.asarray(X, dtype=np.float32)
+        lignes = np.arange(len(X))[:, None]
+        noeuds = np.broadcast_to(self.racines, (len(X), len(self.racines)))
+        for _ in range(self.profondeur):
+            x = X[lignes, self.variable[noeuds]]
+            suivant = np.where(x < self.seuil[noeuds], self.gauche[noeuds], self.droite[noeuds])
+            noeuds = np.where(np.isnan(x), self.manquant[noeuds], suivant)
+        # Les feuilles sont des points fixes: seuil = valeur de la feuille
+        return self.base_marge + self.seuil[noeuds].sum(axis=1, dtype=np.float64)
+
+    def proba(self, X):
+        """Probabilité de la classe positive (comme predict_proba[:, 1])"""
+        return _sigmoide(self.marge(X))
+
+    def tableaux(self, prefixe):
+        valeurs = {f'{prefixe}{c}': getattr(self, c) for c in self.CHAMPS}
+        valeurs[f'{prefixe}constantes'] = np.array([self.base_marge, self.profondeur])
+        return valeurs
+
+    @classmethod
+    def depuis_tableaux(cls, npz, prefixe):
+        base_marge, profondeur = npz[f'{prefixe}constantes']
+        return cls(*(npz[f'{prefixe}{c}'] for c in cls.CHAMPS), base_marge, profondeur)
+
+
+class ModeleCompile:
+    """
+    Modèle complet sous forme compacte:
+    - normaliser(X): (X - moyenne) / echelle
+    - predict_proba(X_norm): moyenne des plis calibrés
+    - predict_proba_brut(X_norm): booster seul, sans calibration (xgb_model)
+    - profils(X_norm): nom du profil K-Means le plus proche
+
+    calibration: une entrée par pli, ('sigmoid', (a, b)) ou
+    ('isotonic', (seuils x, valeurs y)).
+    """
+
+    def __init__(self, moyenne, echelle, plis, calibration, brut, centres, profils, classes):
+        self.moyenne = np.asarray(moyenne, dtype=np.float64)
+        self.echelle = np.asarray(echelle, dtype=np.float64)
+        self.plis = plis
+        self.calibration = [(methode, tuple(np.asarray(v, dtype=np.float64) for v in params))
+                            for methode, params in calibration]
+        self.brut = brut
+        self.centres = None if centres is None else np.asarray(centres, dtype=np.float64)
+        self.noms_profils = None if profils is None else np.asarray(profils, dtype=object)
+        self.classes_ = np.asarray(classes)
+
+    def normaliser(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.moyenne) / self.echelle
+
+    def predict_proba(self, X_norm):
+        p = np.zeros(len(X_norm))
+        for foret, (methode, params) in zip(self.plis, self.calibration):
+            # Sortie du pli (float32 comme XGBoost) puis calibration
+            f = foret.proba(X_norm).astype(np.float32).astype(np.float64)
+            if methode == 'sigmoid':
+                a, b = params
+                p += 1.0 / (1.0 + np.exp(a * f + b))
+            else:
+                p += np.interp(f, *params)
+        p /= len(self.plis)
+        return np.column_stack([1 - p, p])
+
+    def predict_proba_brut(self, X_norm):
+        p = self.brut.proba(X_norm).astype(np.float32).astype(np.float64)
+        return np.column_stack([1 - p, p])
+
+    def profils(self, X_norm):
+        if self.centres is None:
+            return np.full(len(X_norm), 'Inconnu', dtype=object)
+        return self.noms_profils[centres_plus_proches(X_norm, self.centres)]
+
+
+def compiler_modele(model_data):
+    """ModeleCompile à partir du dictionnaire du .joblib (lève ValueError si non supporté)"""
+    scaler = model_data['scaler']
+    calibre = model_data['model']
+    methode = getattr(calibre, 'method', None)
+    if methode not in ('sigmoid', 'isotonic'):
+        raise ValueError(f"Calibration non supportée: {methode}")
+
+    plis, calibration = [], []
+    for pli in calibre.calibrated_classifiers_:
+        plis.append(ForetCompilee.depuis_booster(pli.estimator.get_booster()))
+        calibrateur = pli.calibrators[0]
+        if methode == 'sigmoid':
+            calibration.append(('sigmoid', (calibrateur.a_, calibrateur.b_)))
+        else:
+            calibration.append(('isotonic', (calibrateur.X_thresholds_, calibrateur.y_thresholds_)))
+
+    # Booster final partagé avec la calibration (ensemble=False): compilé une fois
+    xgb_model = model_data['xgb_model']
+    if len(plis) == 1 and xgb_model is calibre.calibrated_classifiers_[0].estimator:
+        brut = plis[0]
+    else:
+        brut = ForetCompilee.depuis_booster(xgb_model.get_booster())
+
+    centres, profils = centres_profils(model_data)
+
+    return ModeleCompile(scaler.mean_, scaler.scale_, plis, calibration, brut,
+                         centres, profils, calibre.classes_)
+
+
+def exporter_modele(modele, chemin=COMPILE_PATH):
+    """Écrit le modèle compilé dans un .npz (écriture atomique)"""
+    chemin = Path(chemin)
+    tableaux = {
+        'format_version': np.array([FORMAT_VERSION]),
+        'moyenne': modele.moyenne,
+        'echelle': modele.echelle,
+        'classes': modele.classes_,
+        'nb_plis': np.array([len(modele.plis)]),
+        'methodes': np.array([methode for methode, _ in modele.calibration])
+    }
+    for i, (foret, (methode, params)) in enumerate(zip(modele.plis, modele.calibration)):
+        tableaux.update(foret.tableaux(f'pli{i}_'))
+        for j, valeurs in enumerate(params):
+            tableaux[f'pli{i}_calibration{j}'] = np.atleast_1d(valeurs)
+    if modele.brut is modele.plis[0]:
+        tableaux['brut_pli0'] = np.array([1])
+    else:
+        tableaux.update(modele.brut.tableaux('brut_'))
+    if modele.centres is not None:
+        tableaux['centres'] = modele.centres
+        tableaux['profils'] = np.array(modele.noms_profils, dtype=str)
+
+    temporaire = chemin.with_name(chemin.stem + '.tmp.npz')
+    np.savez(temporaire, **tableaux)
+    temporaire.replace(chemin)
+    return chemin
+
+
+def charger_modele_compile(chemin=COMPILE_PATH):
+    """Lit un .npz exporté (numpy seul), ou None s'il est absent / d'un autre format"""
+    chemin = Path(chemin)
+    if not chemin.exists():
+        return None
+    with np.load(chemin, allow_pickle=False) as npz:
+        if int(npz['format_version'][0]) != FORMAT_VERSION:
+            return None
+        plis, calibration = [], []
+        for i, methode in enumerate(npz['methodes']):
+            plis.append(ForetCompilee.depuis_tableaux(npz, f'pli{i}_'))
+            params = (npz[f'pli{i}_calibration0'], npz[f'pli{i}_calibration1'])
+            if methode == 'sigmoid':
+                params = tuple(float(v[0]) for v in params)
+            calibration.append((str(methode), params))
+        brut = plis[0] if 'brut_pli0' in npz else ForetCompilee.depuis_tableaux(npz, 'brut_')
+        return ModeleCompile(
+            npz['moyenne'], npz['echelle'], plis, calibration, brut,
+            npz['centres'] if 'centres' in npz else None,
+            npz['profils'] if 'profils' in npz else None,
+            npz['classes']
+        )
+
+
+if __name__ == "__main__":
+    import joblib
+
+    if not MODEL_PATH.exists():
+        print(f"❌ Modèle introuvable: {MODEL_PATH}")
+        sys.exit(1)
+    modele = compiler_modele(joblib.load(MODEL_PATH))
+    chemin = exporter_modele(modele)
+    nb_noeuds = sum(len(f.seuil) for f in {id(f): f for f in modele.plis + [modele.brut]}.values())
+    print(f"✅ Modèle compilé: {chemin} ({len(modele.plis)} plis, {nb_noeuds:,} nœuds)")
@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+"""
+🧱 Pipeline d'Entraînement par Étapes (avec cache)
+===================================================
+Le script d'entraînement est découpé en étapes nommées qui déclarent leurs
+entrées et leurs sorties (artefacts nommés: DataFrames, modèles, tableaux).
+
+Chaque étape a une clé: empreinte de son code (et des modules dont elle
+dépend), de ses paramètres et du contenu de ses entrées. Ses sorties sont
+mises en cache sur disque sous cette clé:
+
+    output_projet4/cache_pipeline/
+        features/
+            3f9c1a2b.../
+                meta.json              -> empreintes du contenu des sorties
+                df.joblib
+                tables_features.joblib
+
+Une étape dont la clé est déjà en cache (et dont les fichiers produits
+existent) n'est pas réexécutée: modifier un graphique ou un seuil ne relance
+que l'étape concernée et celles dont les entrées changent réellement (une
+sortie recalculée identique ne relance rien en aval). Les sorties ne sont
+lues sur disque que si une étape à exécuter en a besoin.
+
+Chaque étape exécutée affiche sa durée et, avec --memoire, son pic de
+mémoire (allocations Python / NumPy / pandas suivies par tracemalloc, en plus
+de la mémoire occupée au démarrage de l'étape; le suivi ralentit surtout les
+étapes de graphiques).
+
+Usage (voir Pipeline.main):
+    --lister              -> état de chaque étape (à jour / à recalculer)
+    --etape NOM           -> une seule étape (+ ses dépendances périmées)
+    --etapes DEBUT:FIN    -> une plage d'étapes (bornes optionnelles)
+    --forcer              -> réexécute les étapes demandées malgré le cache
+    --memoire             -> pic de mémoire de chaque étape exécutée
+
+Une option inconnue ou sans sa valeur arrête le script (usage affiché)
+avant toute étape; --help affiche l'usage.
+"""
+
+import hashlib
+import inspect
+import json
+import shutil
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import joblib
+
+# Entrées conservées en cache par étape (les plus récentes)
+ENTREES_PAR_ETAPE = 3
+
+# Options de Pipeline.main: nom -> type de la valeur (None: option sans valeur)
+OPTIONS_PIPELINE = {'--lister': None, '--etape': str, '--etapes': str, '--forcer': None, '--memoire': None}
+
+
+def lire_options(argv, options, usage=None):
+    """
+    Options de la ligne de commande (argv sans le nom du script):
+    {nom: valeur} (True pour une option sans valeur). Une option inconnue,
+    un argument inattendu ou une valeur manquante / invalide affiche l'usage
+    et arrête le script (code 2); --help ou -h affiche l'usage (code 0).
+    """
+    def arreter(message):
+        if message:
+            print(f"❌ {message}")
+        if usage:
+            print(usage.strip('\n'))
+        else:
+            print("Options: " + ' '.join(f"{nom} VALEUR" if type_valeur else nom
+                                         for nom, type_valeur in options.items()))
+        sys.exit(2 if message else 0)
+
+    valeurs = {}
+    i = 0
+    while i < len(argv):
+        nom = argv[i]
+        if nom in ('--help', '-h'):
+            arreter(None)
+        if nom not in options:
+            arreter(f"Option inconnue: {nom}" if nom.startswith('-') else f"Argument inattendu: {nom}")
+        type_valeur = options[nom]
+        if type_valeur is None:
+            valeurs[nom] = True
+            i += 1
+            continue
+        if i + 1 >= len(argv) or argv[i + 1].startswith('--'):
+            arreter(f"Valeur manquante pour {nom}")
+        try:
+            valeurs[nom] = type_valeur(argv[i + 1])
+        except ValueError:
+            arreter(f"Valeur invalide pour {nom}: {argv[i + 1]}")
+        i += 2
+    return valeurs
+
+
+def empreinte_fichiers(chemins):
+    """Empreinte du contenu d'une liste de fichiers (ordre compris)"""
+    h = hashlib.sha1()
+    for chemin in chemins:
+        h.update(str(Path(chemin).name).encode('utf-8'))
+        with open(chemin, 'rb') as f:
+            for bloc in iter(lambda: f.read(1 << 20), b''):
+                h.update(bloc)
+    return h.hexdigest()
+
+
+def empreinte_valeur(valeur):
+    """Empreinte du contenu d'un artefact (DataFrame, modèle, tableau...)"""
+    return joblib.hash(valeur)
+
+
+class Etape:
+    """Étape du pipeline: fonction(**entrées, **paramètres) -> {sortie: valeur}"""
+
+    def __init__(self, nom, fonction, entrees=(), sorties=(), parametres=None,
+                 fichiers=(), modules=(), cache=True):
+        self.nom = nom
+        self.fonction = fonction
+        self.entrees = list(entrees)
+        self.sorties = list(sorties)
+        self.parametres = dict(parametres or {})
+        self.fichiers = [Path(f) for f in fichiers]
+        self.modules = list(modules)
+        self.cache = cache
+
+    def empreinte_code(self):
+        """Code de la fonction et des modules déclarés"""
+        h = hashlib.sha1(inspect.getsource(self.fonction).encode('utf-8'))
+        for module in self.modules:
+            h.update(Path(inspect.getfile(module)).read_bytes())
+        return h.hexdigest()
+
+    def cle(self, empreintes_entrees):
+        contenu = json.dumps({
+            'etape': self.nom,
+            'code': self.empreinte_code(),
+            'parametres': self.parametres,
+            'entrees': {nom: empreintes_entrees[nom] for nom in self.entrees}
+        }, sort_keys=True, default=str)
+        return hashlib.sha1(contenu.encode('utf-8')).hexdigest()
+
+
+class Pipeline:
+    """Étapes ordonnées, artefacts nommés et cache disque des sorties"""
+
+    def __init__(self, cache_path):
+        self.cache_path = Path(cache_path)
+        self.etapes = []
+        self.sources = {}
+        self._producteurs = {}
+        self._valeurs = {}
+        self._empreintes = {}
+        self._emplacements = {}
+
+    # -------------------------------------------------------------------------
+    # Déclaration
+    # -------------------------------------------------------------------------
+
+    def source(self, nom, chemins):
+        """Artefact d'entrée lu sur disque (empreinte = contenu des fichiers)"""
+        self.sources[nom] = [Path(c) for c in chemins]
+
+    def etape(self, nom, entrees=(), sorties=(), parametres=None, fichiers=(), modules=(), cache=True):
+        """
+        Décorateur déclarant une étape (dans l'ordre d'exécution).
+        - entrees / sorties: noms des artefacts lus / produits
+        - parametres: passés à la fonction et inclus dans la clé
+        - fichiers: fichiers produits (étape réexécutée s'ils manquent)
+        - modules: modules dont le code entre dans la clé
+        - cache=False: toujours exécutée (affichages)
+        """
+        def decorateur(fonction):
+            etape = Etape(nom, fonction, entrees, sorties, parametres, fichiers, modules, cache)
+            for entree in etape.entrees:
+                if entree not in self._producteurs and entree not in self.sources:
+                    raise ValueError(f"Étape {nom}: entrée inconnue {entree}")
+            for sortie in etape.sorties:
+                self._producteurs[sortie] = etape
+            self.etapes.append(etape)
+            return fonction
+        return decorateur
+
+    def _etape(self, nom):
+        for etape in self.etapes:
+            if etape.nom == nom:
+                return etape
+        raise ValueError(f"Étape inconnue: {nom} (étapes: {', '.join(e.nom for e in self.etapes)})")
+
+    def selection(self, debut=None, fin=None):
+        """Étapes de la plage [debut, fin] (ordre de déclaration)"""
+        noms = [e.nom for e in self.etapes]
+        i = noms.index(self._etape(debut).nom) if debut else 0
+        j = noms.index(self._etape(fin).nom) if fin else len(noms) - 1
+        return self.etapes[i:j + 1]
+
+    def _dependances(self, etapes):
+        """Étapes demandées + étapes qui produisent leurs entrées (récursivement)"""
+        requises = {e.nom for e in etapes}
+        for etape in reversed(self.etapes):
+            if etape.nom in requises:
+                requises.update(self._producteurs[n].nom for n in etape.entrees if n in self._producteurs)
+        return [e for e in self.etapes if e.nom in requises]
+
+    # -------------------------------------------------------------------------
+    # Cache
+    # -------------------------------------------------------------------------
+
+    def _dossier(self, etape, cle):
+        return self.cache_path / etape.nom / cle
+
+    def _lire_meta(self, etape, cle):
+        chemin = self._dossier(etape, cle) / 'meta.json'
+        if not chemin.exists():
+            return None
+        return json.loads(chemin.read_text(encoding='utf-8'))
+
+    def _ecrire(self, etape, cle, sorties, empreintes):
+        """Écrit les sorties dans un dossier temporaire renommé (jamais partiel)"""
+        dossier = self._dossier(etape, cle)
+        temporaire = dossier.with_name(f".{cle}.tmp")
+        shutil.rmtree(temporaire, ignore_errors=True)
+        temporaire.mkdir(parents=True)
+        for nom, valeur in sorties.items():
+            joblib.dump(valeur, temporaire / f"{nom}.joblib")
+        (temporaire / 'meta.json').write_text(json.dumps({
+            'etape': etape.nom,
+            'cree_le': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'empreintes': empreintes
+        }, indent=2), encoding='utf-8')
+        shutil.rmtree(dossier, ignore_errors=True)
+        temporaire.rename(dossier)
+
+        # Purge: seules les entrées les plus récentes de l'étape sont gardées
+        anciennes = sorted((d for d in dossier.parent.iterdir() if d.is_dir() and not d.name.startswith('.')),
+                           key=lambda d: d.stat().st_mtime, reverse=True)
+        for ancienne in anciennes[ENTREES_PAR_ETAPE:]:
+            shutil.rmtree(ancienne, ignore_errors=True)
+
+    def valeur(self, nom):
+        """Valeur d'un artefact (lue dans le cache au premier accès)"""
+        if nom not in self._valeurs:
+            if nom in self.sources:
+                self._valeurs[nom] = self.sources[nom]
+            else:
+                self._valeurs[nom] = joblib.load(self._emplacements[nom] / f"{nom}.joblib")
+        return self._valeurs[nom]
+
+    def _empreinte_source(self, nom):
+        if nom not in self._empreintes:
+            self._empreintes[nom] = empreinte_fichiers(self.sources[nom])
+        return self._empreintes[nom]
+
+    def _cle(self, etape):
+        for nom in etape.entrees:
+            if nom in self.sources:
+                self._empreinte_source(nom)
+        return etape.cle(self._empreintes)
+
+    def _en_cache(self, etape, cle):
+        """Métadonnées de l'entrée en cache, ou None (absente, fichiers manquants, cache=False)"""
+        if not etape.cache:
+            return None
+        meta = self._lire_meta(etape, cle)
+        if meta is None or not all(f.exists() for f in etape.fichiers):
+            return None
+        return meta
+
+    # -------------------------------------------------------------------------
+    # Exécution
+    # -------------------------------------------------------------------------
+
+    def executer(self, debut=None, fin=None, forcer=False, memoire=False):
+        """
+        Exécute la plage [debut, fin]: chaque étape est lue dans le cache si
+        sa clé y figure (sauf forcer), exécutée sinon. Les étapes hors plage
+        nécessaires à ses entrées sont lues dans le cache ou exécutées si elles
+        sont périmées. memoire=True: pic de mémoire de chaque étape exécutée.
+        Retourne {étape: 'cache' | 'executee'}.
+        """
+        demandees = {e.nom for e in self.selection(debut, fin)}
+        bilan = {}
+        for etape in self._dependances(self.selection(debut, fin)):
+            cle = self._cle(etape)
+            meta = None if (forcer and etape.nom in demandees) else self._en_cache(etape, cle)
+            if meta is not None:
+                print(f"\n⏭️ Étape '{etape.nom}': inchangée (cache {cle[:8]})")
+                # Entrée utilisée: la plus récente pour la purge
+                self._dossier(etape, cle).touch()
+                for nom in etape.sorties:
+                    self._valeurs.pop(nom, None)
+                    self._empreintes[nom] = meta['empreintes'][nom]
+                    self._emplacements[nom] = self._dossier(etape, cle)
+                bilan[etape.nom] = 'cache'
+                continue
+
+            debut_etape = time.perf_counter()
+            entrees = {nom: self.valeur(nom) for nom in etape.entrees}
+            # Pic de mémoire de l'étape (allocations Python / NumPy / pandas)
+            demarrer_suivi = memoire and not tracemalloc.is_tracing()
+            if demarrer_suivi:
+                tracemalloc.start()
+            if memoire:
+                tracemalloc.reset_peak()
+                base_memoire = tracemalloc.get_traced_memory()[0]
+            try:
+                sorties = etape.fonction(**entrees, **etape.parametres) or {}
+                pic_memoire = tracemalloc.get_traced_memory()[1] - base_memoire if memoire else None
+            finally:
+                if demarrer_suivi:
+                    tracemalloc.stop()
+            manquantes = set(etape.sorties) - set(sorties)
+            if manquantes:
+                raise ValueError(f"Étape {etape.nom}: sorties manquantes {sorted(manquantes)}")
+            sorties = {nom: sorties[nom] for nom in etape.sorties}
+            empreintes = {nom: empreinte_valeur(valeur) for nom, valeur in sorties.items()}
+            self._valeurs.update(sorties)
+            self._empreintes.update(empreintes)
+            if etape.cache:
+                self._ecrire(etape, cle, sorties, empreintes)
+                for nom in etape.sorties:
+                    self._emplacements[nom] = self._dossier(etape, cle)
+            duree = f"{time.perf_counter() - debut_etape:.1f}s"
+            if pic_memoire is not None:
+                duree += f" (pic mémoire: {pic_memoire / 1e6:,.0f} Mo)"
+            print(f"   ⏱️ Étape '{etape.nom}': {duree}")
+            bilan[etape.nom] = 'executee'
+        return bilan
+
+    def statut(self):
+        """(étape, 'à jour' | 'à recalculer' | 'toujours exécutée') sans rien exécuter"""
+        statuts = []
+        for etape in self.etapes:
+            if not etape.cache:
+                statuts.append((etape, 'toujours exécutée'))
+                continue
+            # Entrée produite par une étape à recalculer: contenu encore inconnu
+            connues = all(n in self._empreintes or n in self.sources for n in etape.entrees)
+            meta = self._en_cache(etape, self._cle(etape)) if connues else None
+            if meta is None:
+                statuts.append((etape, 'à recalculer'))
+            else:
+                self._empreintes.update(meta['empreintes'])
+                statuts.append((etape, 'à jour'))
+        return statuts
+
+    def main(self, argv, options=None, usage=None):
+        """
+        Ligne de commande: --lister, --etape NOM, --etapes DEBUT:FIN, --forcer,
+        --memoire. `options`: options propres au script (voir lire_options),
+        acceptées en plus de celles du pipeline.
+        """
+        valeurs = lire_options(argv[1:], {**OPTIONS_PIPELINE, **(options or {})}, usage)
+        debut = fin = valeurs.get('--etape')
+        if '--etapes' in valeurs and debut is None:
+            debut, _, fin = valeurs['--etapes'].partition(':')
+        try:
+            self.selection(debut or None, fin or None)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(2)
+
+        if '--lister' in valeurs:
+            print("=" * 60)
+            print("🧱 ÉTAPES DU PIPELINE")
+            print("=" * 60)
+            for etape, etat in self.statut():
+                marque = {'à jour': '🟢', 'à recalculer': '🟡'}.get(etat, '🔁')
+                print(f"{marque} {etape.nom:<20} {etat:<18} -> {', '.join(etape.sorties) or '-'}")
+            return {}
+
+        return self.executer(debut or None, fin or None, forcer='--forcer' in valeurs,
+                             memoire='--memoire' in valeurs)
@@ -9,14 +9,31 @@ Usage:
     1. Préparez vos données dans un fichier CSV avec les colonnes requises
     2. Exécutez ce script
     3. Obtenez les prédictions et recommandations
+
+Mode batch (non interactif, gros exports):
+    python predict_external.py export.csv
+    python predict_external.py export.csv --sortie resultats.parquet --taille-lot 50000 --processus 4
+
+    Le CSV est lu par lots (--taille-lot lignes, 20 000 par défaut): une
+    matrice de features et un appel au modèle par lot, lots répartis sur
+    --processus processus (0 = tous les cœurs), résultats écrits au fur et à
+    mesure (CSV, ou Parquet si la sortie se termine par .parquet, pyarrow
+    requis). Mémoire bornée quelle que soit la taille du fichier.
 """
 
 import pandas as pd
 import numpy as np
 import joblib
 from pathlib import Path
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import os
 import sys
 import io
+import time
+
+from feature_engineering import tables_modele, preparer_entrainement, features_candidats, matrice_features
+from modele_compile import centres_profils, centres_plus_proches
 
 # Fixer l'encodage pour Windows
 if sys.platform == 'win32':
@@ -25,6 +42,9 @@ if sys.platform == 'win32':
 
 OUTPUT_PATH = Path("output_projet4")
 
+# Mode batch: lignes lues par lot
+TAILLE_LOT = 20000
+
 print("=" * 70)
 print("🔮 SYSTÈME DE PRÉDICTION - SOUTIEN PÉDAGOGIQUE")
 print("=" * 70)
@@ -51,10 +71,15 @@ scaler = model_data['scaler']
 feature_columns = model_data['feature_columns']
 le_filiere = model_data['le_filiere']
 le_pole = model_data['le_pole']
-kmeans = model_data['kmeans']
-profil_mapping = model_data['profil_mapping']
+centres_kmeans, noms_profils = centres_profils(model_data)
 SEUIL_VALIDATION = model_data['seuil_validation']
 
+# Tables de features de l'entraînement (ajustées sur raw/ pour un ancien modèle)
+tables_features = tables_modele(model_data)
+if tables_features is None:
+    from data_snapshot import charger_donnees
+    tables_features = tables_modele(model_data, charger_donnees(verbose=False))
+
 print(f"✅ Modèle chargé avec succès!")
 print(f"   • Features attendues: {len(feature_columns)}")
 print(f"   • Seuil de validation: {SEUIL_VALIDATION}/20")
@@ -63,6 +88,96 @@ print(f"   • Seuil de validation: {SEUIL_VALIDATION}/20")
 # 2. FONCTION DE PRÉDICTION
 # =============================================================================
 
+# Catégories de risque: (seuil de probabilité, catégorie, recommandation)
+CATEGORIES_RISQUE = [
+    (0.8, 'CRITIQUE', "🔴 Tutorat individuel URGENT + Convocation conseiller pédagogique"),
+    (0.6, 'ÉLEVÉ', "🟠 Inscription obligatoire TD de soutien + Suivi bi-hebdomadaire"),
+    (0.4, 'MODÉRÉ', "🟡 Groupes d'entraide + Ressources en ligne"),
+    (0.2, 'FAIBLE', "🟢 Auto-évaluation + Permanences optionnelles"),
+    (-np.inf, 'MINIMAL', "⚪ Encouragement + Ressources avancées")
+]
+
+
+def predire_lot(lot):
+    """
+    Prédictions vectorisées pour un lot d'enregistrements (DataFrame au
+    format du CSV): une matrice de features et un appel au modèle pour tout
+    le lot. Chaque ligne est un étudiant dont l'historique est la note saisie.
+    
+    Colonnes lues (valeur par défaut si absente):
+    ID (index), Practical (0), Theoretical (0), Total (Practical + Theoretical),
+    Filiere ou Major (EEA), Module ou Subject (non précisé),
+    Annee ou MajorYear (1), Semester (1)
+    
+    Retourne un DataFrame: ID, Module, note_sur_20, besoin_soutien,
+    probabilite_risque, categorie_risque, profil, recommandation.
+    """
+    n = len(lot)
+    
+    def colonne(noms, defaut):
+        for nom in noms:
+            if nom in lot:
+                return lot[nom].to_numpy()
+        return np.full(n, defaut, dtype=object)
+    
+    practical = colonne(['Practical'], 0).astype(float)
+    theoretical = colonne(['Theoretical'], 0).astype(float)
+    
+    # Calculer Total si non fourni, sans dépasser 100, puis note sur 20
+    total = practical + theoretical
+    if 'Total' in lot:
+        total = lot['Total'].astype(float).fillna(pd.Series(total, index=lot.index)).to_numpy()
+    total = np.minimum(total, 100)
+    note_sur_20 = total / 5
+    
+    # Historique de chaque étudiant: la note saisie (features calculées comme à l'entraînement)
+    modules = pd.Series(colonne(['Module', 'Subject'], None), dtype=object)
+    modules = modules.where(modules.notna(), None)
+    semestres = colonne(['Semester'], 1)
+    ids = np.arange(n).astype(str)
+    historique = pd.DataFrame({
+        'ID': ids,
+        'Filiere': colonne(['Filiere', 'Major'], 'EEA'),
+        'Module': modules.where(modules.astype(bool), 'Inconnu').to_numpy(),
+        'Annee': colonne(['Annee', 'MajorYear'], 1),
+        'AnneUniversitaire': '',
+        'Semester': semestres,
+        'Practical': np.minimum(practical, 50),
+        'Theoretical': np.minimum(theoretical, 50),
+        'Total': total,
+        'Note_sur_20': note_sur_20,
+        'Status': np.where(note_sur_20 < SEUIL_VALIDATION, 'Fail', 'Pass')
+    })
+    candidats = pd.DataFrame({'ID': ids, 'Module': modules.to_numpy(), 'Semester': semestres})
+    lignes = features_candidats(preparer_entrainement(historique), candidats, tables_features)
+    X_new = matrice_features(lignes, feature_columns)
+    
+    # Normaliser
+    X_new_scaled = scaler.transform(X_new)
+    
+    # Prédiction (classe déduite de la probabilité: un seul passage dans le modèle)
+    proba = calibrated_model.predict_proba(X_new_scaled)
+    probabilite = proba[:, 1]
+    
+    # Profil: centre K-Means le plus proche (centres exportés avec le modèle)
+    profils = noms_profils[centres_plus_proches(X_new_scaled, centres_kmeans)]
+    
+    # Catégorie de risque: premier seuil atteint
+    seuils = np.array([seuil for seuil, _, _ in CATEGORIES_RISQUE])
+    rang = (probabilite[:, None] < seuils[None, :]).sum(axis=1)
+    
+    return pd.DataFrame({
+        'ID': lot['ID'].to_numpy() if 'ID' in lot else lot.index.to_numpy(),
+        'Module': colonne(['Module', 'Subject'], 'Inconnu'),
+        'note_sur_20': note_sur_20,
+        'besoin_soutien': calibrated_model.classes_[proba.argmax(axis=1)].astype(int),
+        'probabilite_risque': probabilite,
+        'categorie_risque': np.array([c for _, c, _ in CATEGORIES_RISQUE], dtype=object)[rang],
+        'profil': profils,
+        'recommandation': np.array([r for _, _, r in CATEGORIES_RISQUE], dtype=object)[rang]
+    })
+
+
 def predire_besoin_soutien(donnees_etudiant):
     """
     Prédit le besoin de soutien pour un nouvel étudiant.
@@ -87,130 +202,83 @@ def predire_besoin_soutien(donnees_etudiant):
         - 'profil': Excellence, Régulier, En_Progression, En_Difficulté, À_Risque
         - 'recommandation': Action recommandée
     """
-    
-    # Calculer Total si non fourni
-    if 'Total' not in donnees_etudiant or pd.isna(donnees_etudiant.get('Total')):
-        donnees_etudiant['Total'] = donnees_etudiant.get('Practical', 0) + donnees_etudiant.get('Theoretical', 0)
-    
-    # S'assurer que Total ne dépasse pas 100
-    total = min(donnees_etudiant['Total'], 100)
-    
-    # Convertir en note sur 20
-    note_sur_20 = total / 5
-    
-    # Créer le vecteur de features
-    features = {}
-    
-    # Features de base
-    features['Practical'] = min(donnees_etudiant.get('Practical', 0), 50)
-    features['Theoretical'] = min(donnees_etudiant.get('Theoretical', 0), 50)
-    features['Total'] = total
-    features['Note_sur_20'] = note_sur_20
-    features['Semester'] = donnees_etudiant.get('Semester', 1)
-    features['Annee'] = donnees_etudiant.get('Annee', 1)
-    
-    # Features dérivées (valeurs moyennes par défaut)
-    features['peer_group_avg_total'] = 50  # Moyenne typique
-    features['peer_group_avg_note20'] = 10
-    features['peer_group_avg_practical'] = 25
-    features['peer_group_support_rate'] = 0.5
-    features['deviation_from_peer'] = donnees_etudiant['Total'] - 50
-    features['deviation_note20'] = note_sur_20 - 10
-    
-    # Profil étudiant (valeurs par défaut pour nouvel étudiant)
-    features['student_avg_total'] = donnees_etudiant['Total']
-    features['student_std_total'] = 0
-    features['student_min_total'] = donnees_etudiant['Total']
-    features['student_max_total'] = donnees_etudiant['Total']
-    features['student_module_count'] = 1
-    features['student_avg_note20'] = note_sur_20
-    features['student_min_note20'] = note_sur_20
-    features['student_avg_practical'] = donnees_etudiant.get('Practical', 0)
-    features['student_avg_theoretical'] = donnees_etudiant.get('Theoretical', 0)
-    features['student_support_rate'] = 0.5 if note_sur_20 < 10 else 0
-    
-    # Module stats (valeurs moyennes)
-    features['module_avg_total'] = 50
-    features['module_avg_note20'] = 10
-    features['module_taux_echec'] = 0.5
-    features['module_effectif'] = 100
-    
-    # Combo filière-module
-    features['combo_taux_echec'] = 0.5
-    features['combo_haut_risque'] = 1 if note_sur_20 < 10 else 0
-    
-    # Autres features
-    features['charge_semestre'] = 6
-    features['taux_absenteisme'] = 0
-    features['ratio_pratique'] = donnees_etudiant.get('Practical', 0) / (donnees_etudiant['Total'] + 1)
-    features['ecart_theorie_pratique'] = donnees_etudiant.get('Theoretical', 0) - donnees_etudiant.get('Practical', 0)
-    features['modules_rattrapage'] = 1 if note_sur_20 < 10 else 0
-    features['distance_seuil'] = note_sur_20 - SEUIL_VALIDATION
-    
-    # Features de force par pôle (valeurs par défaut)
-    for col in feature_columns:
-        if col.startswith('force_') and col not in features:
-            features[col] = note_sur_20
-    
-    # Encoder la filière
-    filiere = donnees_etudiant.get('Filiere', 'EEA')
-    try:
-        features['Filiere_encoded'] = le_filiere.transform([filiere])[0]
-    except:
-        features['Filiere_encoded'] = 0  # Filière inconnue
-    
-    # Encoder le pôle de compétences
-    features['pole_encoded'] = 0  # Par défaut
-    
-    # Créer le DataFrame
-    X_new = pd.DataFrame([features])
-    
-    # S'assurer que toutes les colonnes sont présentes
-    for col in feature_columns:
-        if col not in X_new.columns:
-            X_new[col] = 0
-    
-    # Réordonner les colonnes
-    X_new = X_new[feature_columns]
-    
-    # Normaliser
-    X_new_scaled = scaler.transform(X_new)
-    
-    # Prédiction
-    prediction = calibrated_model.predict(X_new_scaled)[0]
-    probabilite = calibrated_model.predict_proba(X_new_scaled)[0, 1]
-    
-    # Clustering pour le profil
-    cluster = kmeans.predict(X_new_scaled)[0]
-    profil = profil_mapping.get(cluster, 'Inconnu')
-    
-    # Catégorie de risque
-    if probabilite >= 0.8:
-        categorie = 'CRITIQUE'
-        recommandation = "🔴 Tutorat individuel URGENT + Convocation conseiller pédagogique"
-    elif probabilite >= 0.6:
-        categorie = 'ÉLEVÉ'
-        recommandation = "🟠 Inscription obligatoire TD de soutien + Suivi bi-hebdomadaire"
-    elif probabilite >= 0.4:
-        categorie = 'MODÉRÉ'
-        recommandation = "🟡 Groupes d'entraide + Ressources en ligne"
-    elif probabilite >= 0.2:
-        categorie = 'FAIBLE'
-        recommandation = "🟢 Auto-évaluation + Permanences optionnelles"
-    else:
-        categorie = 'MINIMAL'
-        recommandation = "⚪ Encouragement + Ressources avancées"
-    
+    resultat = predire_lot(pd.DataFrame([donnees_etudiant])).iloc[0]
     return {
-        'besoin_soutien': int(prediction),
-        'probabilite_risque': float(probabilite),
-        'categorie_risque': categorie,
-        'profil': profil,
-        'note_sur_20': note_sur_20,
-        'recommandation': recommandation
+        'besoin_soutien': int(resultat['besoin_soutien']),
+        'probabilite_risque': float(resultat['probabilite_risque']),
+        'categorie_risque': resultat['categorie_risque'],
+        'profil': resultat['profil'],
+        'note_sur_20': float(resultat['note_sur_20']),
+        'recommandation': resultat['recommandation']
     }
 
 
+def _initialiser_processus():
+    """Processus du pool: un seul thread XGBoost chacun (les lots se partagent les cœurs)"""
+    for calibre in getattr(calibrated_model, 'calibrated_classifiers_', []):
+        calibre.estimator.set_params(n_jobs=1)
+
+
+def predire_flux(fichier_csv, taille_lot=TAILLE_LOT, processus=1):
+    """
+    Prédictions d'un fichier CSV lu par lots: produit un DataFrame de
+    résultats par lot, dans l'ordre du fichier. Avec processus > 1, les lots
+    sont répartis sur un pool de processus (au plus deux lots en attente par
+    processus: la mémoire reste bornée).
+    """
+    lots = pd.read_csv(fichier_csv, encoding='utf-8', chunksize=taille_lot)
+    if processus <= 1:
+        for lot in lots:
+            yield predire_lot(lot)
+        return
+    
+    with ProcessPoolExecutor(max_workers=processus, initializer=_initialiser_processus) as pool:
+        en_cours = deque()
+        for lot in lots:
+            en_cours.append(pool.submit(predire_lot, lot))
+            if len(en_cours) >= 2 * processus:
+                yield en_cours.popleft().result()
+        while en_cours:
+            yield en_cours.popleft().result()
+
+
+def ecrire_resultats(resultats, sortie):
+    """
+    Écrit les résultats lot par lot dès qu'ils sont prêts: Parquet si
+    `sortie` se termine par .parquet (pyarrow), CSV sinon.
+    Retourne (nombre de lignes, nombre de besoins de soutien).
+    """
+    sortie = Path(sortie)
+    nb_lignes = nb_soutien = 0
+    
+    if sortie.suffix.lower() == '.parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Sortie Parquet: installer pyarrow (pip install pyarrow)")
+        writer = None
+        try:
+            for lot in resultats:
+                # Types fixes d'un lot à l'autre (schéma unique du fichier)
+                table = pa.Table.from_pandas(lot.astype({'ID': 'string', 'Module': 'string'}), preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(sortie, table.schema)
+                writer.write_table(table)
+                nb_lignes += len(lot)
+                nb_soutien += int(lot['besoin_soutien'].sum())
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        with open(sortie, 'w', encoding='utf-8-sig', newline='') as f:
+            for lot in resultats:
+                lot.to_csv(f, header=nb_lignes == 0, index=False)
+                nb_lignes += len(lot)
+                nb_soutien += int(lot['besoin_soutien'].sum())
+    return nb_lignes, nb_soutien
+
+
 def predire_depuis_csv(fichier_csv):
     """
     Fait des prédictions pour tous les étudiants dans un fichier CSV.
@@ -220,32 +288,8 @@ def predire_depuis_csv(fichier_csv):
     """
     print(f"\n📂 Lecture du fichier: {fichier_csv}")
     
-    df = pd.read_csv(fichier_csv, encoding='utf-8')
-    print(f"   • {len(df)} enregistrements trouvés")
-    
-    resultats = []
-    
-    for idx, row in df.iterrows():
-        donnees = {
-            'Practical': row.get('Practical', 0),
-            'Theoretical': row.get('Theoretical', 0),
-            'Total': row.get('Total', None),
-            'Filiere': row.get('Filiere', row.get('Major', 'EEA')),
-            'Annee': row.get('Annee', row.get('MajorYear', 1)),
-            'Semester': row.get('Semester', 1)
-        }
-        
-        prediction = predire_besoin_soutien(donnees)
-        prediction['ID'] = row.get('ID', idx)
-        prediction['Module'] = row.get('Module', row.get('Subject', 'Inconnu'))
-        resultats.append(prediction)
-    
-    df_resultats = pd.DataFrame(resultats)
-    
-    # Réordonner les colonnes
-    cols = ['ID', 'Module', 'note_sur_20', 'besoin_soutien', 'probabilite_risque', 
-            'categorie_risque', 'profil', 'recommandation']
-    df_resultats = df_resultats[[c for c in cols if c in df_resultats.columns]]
+    df_resultats = pd.concat(list(predire_flux(fichier_csv)), ignore_index=True)
+    print(f"   • {len(df_resultats)} enregistrements trouvés")
     
     return df_resultats
 
@@ -415,10 +459,47 @@ def menu_prediction():
 # EXÉCUTION
 # =============================================================================
 
+def option(nom, defaut=None):
+    """Valeur d'une option --nom valeur de la ligne de commande, ou defaut"""
+    if nom in sys.argv:
+        i = sys.argv.index(nom)
+        if i + 1 < len(sys.argv):
+            return sys.argv[i + 1]
+    return defaut
+
+
 if __name__ == "__main__":
+    entrees = [a for a in sys.argv[1:] if a.lower().endswith('.csv') and a != option('--sortie')]
+    
+    if not entrees:
+        print("\n" + "=" * 70)
+        print("🎯 SYSTÈME PRÊT POUR LES PRÉDICTIONS EXTERNES")
+        print("=" * 70)
+        
+        # Lancer le menu
+        menu_prediction()
+        sys.exit(0)
+    
+    # Mode batch: lecture par lots, écriture au fur et à mesure
+    sortie = Path(option('--sortie', OUTPUT_PATH / 'predictions_externes.csv'))
+    taille_lot = int(option('--taille-lot', TAILLE_LOT))
+    processus = int(option('--processus', 1)) or os.cpu_count()
+    
     print("\n" + "=" * 70)
-    print("🎯 SYSTÈME PRÊT POUR LES PRÉDICTIONS EXTERNES")
+    print("🚀 PRÉDICTIONS PAR LOTS")
     print("=" * 70)
+    print(f"   • Entrée: {entrees[0]}")
+    print(f"   • Sortie: {sortie}")
+    print(f"   • Lots de {taille_lot:,} lignes sur {processus} processus")
     
-    # Lancer le menu
-    menu_prediction()
+    debut = time.perf_counter()
+    try:
+        nb_lignes, nb_soutien = ecrire_resultats(predire_flux(entrees[0], taille_lot, processus), sortie)
+    except (OSError, RuntimeError, ValueError) as e:
+        print(f"❌ Erreur: {e}")
+        sys.exit(1)
+    duree = time.perf_counter() - debut
+    
+    print(f"\n✅ {nb_lignes:,} prédictions en {duree:.1f}s ({nb_lignes / max(duree, 1e-9):,.0f} lignes/s)")
+    print(f"   • Étudiants nécessitant un soutien: {nb_soutien:,}")
+    print(f"   💾 Résultats sauvegardés: {sortie}")
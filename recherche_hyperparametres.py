@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+🔎 Recherche d'Hyperparamètres XGBoost (parallèle, arrêt précoce)
+==================================================================
+Mode --recherche du script d'entraînement (étape 'recherche'):
+- configurations tirées au hasard dans ESPACE_RECHERCHE; la configuration
+  par défaut (XGB_PARAMS) est toujours évaluée en premier
+- une seule matrice d'entraînement quantifiée (xgb.QuantileDMatrix, méthode
+  hist) construite une fois et partagée par tous les essais, et un pli de
+  validation stratifié quantifié avec les mêmes seuils
+- essais évalués en parallèle (threads: XGBoost libère le GIL pendant
+  l'entraînement), les cœurs étant répartis entre les essais
+- arrêt précoce sur l'AUC du pli de validation
+- élagage: à chaque palier (PALIERS_ELAGAGE tours), un essai dont la
+  meilleure AUC est sous la médiane des essais ayant atteint ce palier est
+  arrêté
+- classement de tous les essais écrit dans
+  output_projet4/recherche_hyperparametres.csv
+
+La meilleure configuration (nombre d'arbres = meilleure itération sur le pli
+de validation) remplace XGB_PARAMS pour l'étape 'modele' et figure dans les
+métadonnées de la version du registre. Les essais étant parallèles, les
+décisions d'élagage dépendent de leur ordre d'arrivée.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.model_selection import train_test_split
+
+# Espace de recherche: paramètre -> (loi, minimum, maximum)
+ESPACE_RECHERCHE = {
+    'max_depth': ('entier', 3, 10),
+    'learning_rate': ('log', 0.02, 0.3),
+    'subsample': ('uniforme', 0.6, 1.0),
+    'colsample_bytree': ('uniforme', 0.5, 1.0),
+    'min_child_weight': ('log', 1.0, 20.0),
+    'reg_lambda': ('log', 0.1, 10.0),
+    'gamma': ('uniforme', 0.0, 2.0)
+}
+# Valeurs par défaut de XGBoost pour les paramètres absents de XGB_PARAMS
+DEFAUTS_XGBOOST = {'min_child_weight': 1.0, 'reg_lambda': 1.0, 'gamma': 0.0}
+
+MAX_BIN = 256
+MAX_TOURS = 1000
+ARRET_PRECOCE = 30
+PALIERS_ELAGAGE = (25, 50, 100, 200, 400)
+# Essais ayant atteint un palier avant que l'élagage n'y soit appliqué
+ESSAIS_AVANT_ELAGAGE = 4
+
+
+def tirer_configuration(rng):
+    """Configuration tirée au hasard dans ESPACE_RECHERCHE"""
+    configuration = {}
+    for nom, (loi, minimum, maximum) in ESPACE_RECHERCHE.items():
+        if loi == 'entier':
+            configuration[nom] = int(rng.integers(minimum, maximum + 1))
+        elif loi == 'log':
+            configuration[nom] = float(np.exp(rng.uniform(np.log(minimum), np.log(maximum))))
+        else:
+            configuration[nom] = float(rng.uniform(minimum, maximum))
+    return configuration
+
+
+class ElagageMedian:
+    """Arrête un essai moins bon que la médiane des essais au même palier"""
+
+    def __init__(self, paliers=PALIERS_ELAGAGE, essais_min=ESSAIS_AVANT_ELAGAGE):
+        self.paliers = set(paliers)
+        self.essais_min = essais_min
+        self._scores = {}
+        self._verrou = threading.Lock()
+
+    def elaguer(self, palier, score):
+        """Enregistre le score de l'essai au palier; True s'il faut l'arrêter"""
+        with self._verrou:
+            scores = self._scores.setdefault(palier, [])
+            elague = len(scores) >= self.essais_min and score < np.median(scores)
+            scores.append(score)
+        return elague
+
+
+class _RappelElagage(xgb.callback.TrainingCallback):
+    """Suit la meilleure AUC de validation et applique l'élagage aux paliers"""
+
+    def __init__(self, elagage):
+        super().__init__()
+        self.elagage = elagage
+        self.meilleur = -np.inf
+        self.elague_a = None
+
+    def after_iteration(self, model, epoch, evals_log):
+        self.meilleur = max(self.meilleur, evals_log['validation']['auc'][-1])
+        tours = epoch + 1
+        if tours in self.elagage.paliers and self.elagage.elaguer(tours, self.meilleur):
+            self.elague_a = tours
+            return True
+        return False
+
+
+def _essai(numero, configuration, dtrain, dval, elagage, nthread, fixes):
+    """Entraîne une configuration sur la matrice partagée; retourne sa ligne du classement"""
+    params = {
+        'objective': 'binary:logistic',
+        'eval_metric': 'auc',
+        'tree_method': 'hist',
+        'max_bin': MAX_BIN,
+        'nthread': nthread,
+        'seed': fixes.get('random_state', 0),
+        **configuration
+    }
+    rappel = _RappelElagage(elagage)
+    debut = time.perf_counter()
+    booster = xgb.train(params, dtrain, num_boost_round=MAX_TOURS, evals=[(dval, 'validation')],
+                        early_stopping_rounds=ARRET_PRECOCE, callbacks=[rappel], verbose_eval=False)
+    return {
+        'essai': numero,
+        'statut': 'élagué' if rappel.elague_a else 'terminé',
+        'auc_validation': float(rappel.meilleur),
+        'meilleur_tour': int(booster.best_iteration) + 1,
+        'tours': rappel.elague_a or booster.num_boosted_rounds(),
+        'duree_s': round(time.perf_counter() - debut, 2),
+        **configuration
+    }
+
+
+def rechercher(X, y, params_defaut, n_essais=30, n_processus=None, taille_validation=0.2,
+               random_state=42, classement_path=None):
+    """
+    Recherche des hyperparamètres de XGBClassifier sur (X, y).
+    Retourne (meilleurs paramètres pour XGBClassifier, classement des essais).
+    """
+    n_processus = n_processus or os.cpu_count() or 1
+    X_fit, X_val, y_fit, y_val = train_test_split(
+        X, y, test_size=taille_validation, random_state=random_state, stratify=y
+    )
+
+    # Matrice quantifiée une fois, partagée (lecture seule) par tous les essais
+    dtrain = xgb.QuantileDMatrix(X_fit, label=y_fit, max_bin=MAX_BIN)
+    dval = xgb.QuantileDMatrix(X_val, label=y_val, ref=dtrain, max_bin=MAX_BIN)
+
+    fixes = {k: v for k, v in params_defaut.items() if k not in ESPACE_RECHERCHE and k != 'n_estimators'}
+    rng = np.random.default_rng(random_state)
+    configurations = [{nom: params_defaut.get(nom, DEFAUTS_XGBOOST.get(nom)) for nom in ESPACE_RECHERCHE}]
+    configurations += [tirer_configuration(rng) for _ in range(max(0, n_essais - 1))]
+
+    paralleles = min(n_processus, len(configurations))
+    nthread = max(1, n_processus // paralleles)
+    print(f"   • {len(configurations)} configurations, {paralleles} en parallèle ({nthread} thread(s) chacune)")
+    print(f"   • Entraînement: {len(y_fit):,} lignes | Validation: {len(y_val):,} lignes | hist, {MAX_BIN} seuils")
+
+    elagage = ElagageMedian()
+
+    def evaluer(numero_configuration):
+        numero, configuration = numero_configuration
+        ligne = _essai(numero, configuration, dtrain, dval, elagage, nthread, fixes)
+        marque = '✂️' if ligne['statut'] == 'élagué' else '•'
+        print(f"   {marque} Essai {numero:>3}/{len(configurations)}: AUC {ligne['auc_validation']:.4f} "
+              f"({ligne['tours']} tours, {ligne['statut']}, {ligne['duree_s']:.1f}s)")
+        return ligne
+
+    with ThreadPoolExecutor(max_workers=paralleles) as executeur:
+        lignes = list(executeur.map(evaluer, enumerate(configurations, start=1)))
+
+    classement = pd.DataFrame(lignes)
+    # Essais terminés d'abord, puis par AUC de validation décroissante
+    classement = classement.sort_values(['statut', 'auc_validation'], ascending=[True, False], kind='mergesort',
+                                        key=lambda c: c.eq('élagué') if c.name == 'statut' else c)
+    classement.insert(0, 'rang', range(1, len(classement) + 1))
+    if classement_path is not None:
+        classement.to_csv(classement_path, index=False, encoding='utf-8-sig')
+
+    meilleur = classement.iloc[0]
+    meilleurs_parametres = {
+        **fixes,
+        **{nom: (int(meilleur[nom]) if loi == 'entier' else float(meilleur[nom]))
+           for nom, (loi, _, _) in ESPACE_RECHERCHE.items()},
+        'n_estimators': int(meilleur['meilleur_tour']),
+        'tree_method': 'hist',
+        'max_bin': MAX_BIN
+    }
+    return meilleurs_parametres, classement
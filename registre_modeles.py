@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+🗄️ Registre des Modèles Versionnés
+===================================
+Chaque entraînement enregistre une version immuable du modèle:
+
+    output_projet4/registre/
+        registre.json                       -> {"actif": "...", "candidat": "..."}
+        20250114-0230-3f9c1a2b/
+            model_soutien_pedagogique.joblib
+            model_soutien_compile.npz
+            metadata.json                   -> métriques, features, empreinte des données
+
+- version active: servie par l'API
+- version candidate: chargée à côté de la version active, évaluée en mode
+  ombre sur un échantillon des requêtes (sorties des deux modèles journalisées)
+  avant d'être promue
+
+Le premier modèle enregistré devient actif; les suivants deviennent
+candidats (ou actifs directement avec activer=True).
+
+La version active est aussi copiée dans output_projet4/
+(model_soutien_pedagogique.joblib, model_soutien_compile.npz), lus par les
+scripts hors API (predict_external, generate_shap, generate_lime...): ces
+fichiers ne changent qu'à l'activation ou à la promotion d'une version,
+jamais pour un candidat.
+
+Usage:
+    python registre_modeles.py                        -> liste des versions
+    python registre_modeles.py --candidat <version>   -> définit le candidat
+    python registre_modeles.py --promouvoir <version> -> version active
+    python registre_modeles.py --importer             -> enregistre output_projet4/model_soutien_pedagogique.joblib
+"""
+
+import hashlib
+import json
+import shutil
+import sys
+from datetime import datetime
+from pathlib import Path
+
+BASE_PATH = Path(__file__).parent.absolute()
+OUTPUT_PATH = BASE_PATH / "output_projet4"
+MODEL_PATH = OUTPUT_PATH / "model_soutien_pedagogique.joblib"
+REGISTRE_PATH = OUTPUT_PATH / "registre"
+
+POINTEURS_NAME = "registre.json"
+MODELE_NAME = "model_soutien_pedagogique.joblib"
+COMPILE_NAME = "model_soutien_compile.npz"
+METADATA_NAME = "metadata.json"
+
+
+def _ecrire_json(chemin, contenu):
+    """Écriture atomique d'un fichier JSON"""
+    temporaire = chemin.with_name(chemin.name + '.tmp')
+    temporaire.write_text(json.dumps(contenu, indent=2, ensure_ascii=False, default=str), encoding='utf-8')
+    temporaire.replace(chemin)
+
+
+def lire_pointeurs(registre_path=REGISTRE_PATH):
+    """Versions active et candidate ({'actif': None, 'candidat': None} sans registre)"""
+    chemin = Path(registre_path) / POINTEURS_NAME
+    pointeurs = {'actif': None, 'candidat': None}
+    if chemin.exists():
+        pointeurs.update(json.loads(chemin.read_text(encoding='utf-8')))
+    return pointeurs
+
+
+def _ecrire_pointeurs(pointeurs, registre_path=REGISTRE_PATH):
+    _ecrire_json(Path(registre_path) / POINTEURS_NAME, pointeurs)
+
+
+def dossier_version(version, registre_path=REGISTRE_PATH):
+    """Dossier d'une version (ValueError si elle n'existe pas)"""
+    dossier = Path(registre_path) / str(version)
+    if not version or not (dossier / METADATA_NAME).exists():
+        raise ValueError(f"Version inconnue: {version}")
+    return dossier
+
+
+def lire_metadata(version, registre_path=REGISTRE_PATH):
+    return json.loads((dossier_version(version, registre_path) / METADATA_NAME).read_text(encoding='utf-8'))
+
+
+def lister_versions(registre_path=REGISTRE_PATH):
+    """Métadonnées de toutes les versions (plus ancienne en premier)"""
+    registre_path = Path(registre_path)
+    if not registre_path.exists():
+        return []
+    return [json.loads((d / METADATA_NAME).read_text(encoding='utf-8'))
+            for d in sorted(registre_path.iterdir()) if (d / METADATA_NAME).exists()]
+
+
+def enregistrer_modele(model_data, metriques=None, empreinte_donnees=None, parametres=None,
+                       activer=False, registre_path=REGISTRE_PATH):
+    """
+    Enregistre une nouvelle version (modèle joblib, forme compilée et
+    métadonnées). Elle devient active si activer=True ou si aucune version
+    n'est active, candidate sinon. Retourne le numéro de version.
+    """
+    import joblib
+    from modele_compile import compiler_modele, exporter_modele
+
+    registre_path = Path(registre_path)
+    registre_path.mkdir(parents=True, exist_ok=True)
+    cree_le = datetime.now()
+    empreinte = hashlib.sha1(
+        f"{cree_le.isoformat()}|{empreinte_donnees}|{model_data['feature_columns']}".encode('utf-8')
+    ).hexdigest()[:8]
+    version = f"{cree_le:%Y%m%d-%H%M%S}-{empreinte}"
+
+    # Version écrite dans un dossier temporaire puis renommée (jamais partielle)
+    temporaire = registre_path / f".{version}.tmp"
+    temporaire.mkdir()
+    try:
+        joblib.dump(model_data, temporaire / MODELE_NAME)
+        try:
+            exporter_modele(compiler_modele(model_data), temporaire / COMPILE_NAME)
+        except Exception as e:
+            print(f"⚠️ Forme compilée non enregistrée ({e})")
+        _ecrire_json(temporaire / METADATA_NAME, {
+            'version': version,
+            'cree_le': cree_le.isoformat(),
+            'metriques': metriques or {},
+            'parametres': parametres or {},
+            'feature_columns': list(model_data['feature_columns']),
+            'nb_features': len(model_data['feature_columns']),
+            'empreinte_donnees': empreinte_donnees
+        })
+        temporaire.rename(registre_path / version)
+    except Exception:
+        shutil.rmtree(temporaire, ignore_errors=True)
+        raise
+
+    pointeurs = lire_pointeurs(registre_path)
+    if activer or pointeurs['actif'] is None:
+        pointeurs['actif'] = version
+        _copier_actif(version, registre_path)
+    else:
+        pointeurs['candidat'] = version
+    _ecrire_pointeurs(pointeurs, registre_path)
+    return version
+
+
+def _copier_actif(version, registre_path=REGISTRE_PATH):
+    """
+    Copie le modèle et la forme compilée d'une version à côté du registre
+    (output_projet4/), par fichier temporaire puis remplacement atomique.
+    """
+    dossier = dossier_version(version, registre_path)
+    for nom in (MODELE_NAME, COMPILE_NAME):
+        cible = Path(registre_path).parent / nom
+        if not (dossier / nom).exists():
+            # Pas de forme compilée pour cette version: pas d'ancienne à côté du nouveau modèle
+            cible.unlink(missing_ok=True)
+            continue
+        temporaire = cible.with_name(cible.name + '.tmp')
+        shutil.copyfile(dossier / nom, temporaire)
+        temporaire.replace(cible)
+
+
+def definir_candidat(version, registre_path=REGISTRE_PATH):
+    """Définit (ou retire avec None) la version candidate"""
+    if version is not None:
+        dossier_version(version, registre_path)
+    pointeurs = lire_pointeurs(registre_path)
+    pointeurs['candidat'] = version
+    _ecrire_pointeurs(pointeurs, registre_path)
+    return pointeurs
+
+
+def promouvoir(version, registre_path=REGISTRE_PATH):
+    """Rend une version active (elle cesse d'être candidate)"""
+    dossier_version(version, registre_path)
+    pointeurs = lire_pointeurs(registre_path)
+    pointeurs['actif'] = version
+    if pointeurs['candidat'] == version:
+        pointeurs['candidat'] = None
+    _copier_actif(version, registre_path)
+    _ecrire_pointeurs(pointeurs, registre_path)
+    return pointeurs
+
+
+def chemins_version(version, registre_path=REGISTRE_PATH):
+    """(chemin du .joblib, chemin du .npz compilé) d'une version"""
+    dossier = dossier_version(version, registre_path)
+    return dossier / MODELE_NAME, dossier / COMPILE_NAME
+
+
+if __name__ == "__main__":
+    def option(nom):
+        i = sys.argv.index(nom)
+        return sys.argv[i + 1] if i + 1 < len(sys.argv) else None
+
+    try:
+        if '--importer' in sys.argv:
+            import joblib
+            if not MODEL_PATH.exists():
+                print(f"❌ Modèle introuvable: {MODEL_PATH}")
+                sys.exit(1)
+            version = enregistrer_modele(joblib.load(MODEL_PATH), parametres={'importe_depuis': MODEL_PATH.name})
+            print(f"✅ Version enregistrée: {version}")
+        if '--candidat' in sys.argv:
+            definir_candidat(option('--candidat'))
+        if '--promouvoir' in sys.argv:
+            promouvoir(option('--promouvoir'))
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    pointeurs = lire_pointeurs()
+    print("=" * 60)
+    print("🗄️ REGISTRE DES MODÈLES")
+    print("=" * 60)
+    for meta in lister_versions():
+        marque = ('🟢 actif   ' if meta['version'] == pointeurs['actif']
+                  else '🟡 candidat' if meta['version'] == pointeurs['candidat'] else '          ')
+        metriques = ' | '.join(f"{k}={v:.4f}" for k, v in meta['metriques'].items() if isinstance(v, float))
+        print(f"{marque} {meta['version']}  {meta['nb_features']} features  {metriques}")
@@ -5,7 +5,6 @@
 Ce script permet de tester le modèle avec de nouveaux étudiants
 """
 
-import pandas as pd
 import numpy as np
 import pickle
 from pathlib import Path
@@ -22,6 +21,8 @@ from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.calibration import CalibratedClassifierCV
 import xgboost as xgb
 
+from data_snapshot import charger_donnees
+
 RAW_PATH = Path("raw")
 OUTPUT_PATH = Path("output_projet4")
 
@@ -34,40 +35,11 @@ print("=" * 70)
 # =============================================================================
 print("\n📊 Chargement des données...")
 
-df1 = pd.read_csv(RAW_PATH / "1- one_clean.csv", encoding='utf-8')
-df2 = pd.read_csv(RAW_PATH / "2- two_clean.csv", encoding='utf-8')
-df = pd.concat([df1, df2], ignore_index=True)
-
-# Nettoyage complet des données
-taille_avant = len(df)
-
-# Supprimer les lignes avec ID null ou Unknown
-df['ID'] = df['ID'].astype(str)
-df = df[~df['ID'].isin(['Unknown', 'unknown', 'nan', 'None', ''])].copy()
-df = df[df['ID'].notna()].copy()
-
-# Supprimer les lignes avec Major Unknown
-df = df[~df['Major'].astype(str).str.lower().str.contains('unknown', na=False)].copy()
-
-# Supprimer les lignes avec Subject Unknown  
-df = df[~df['Subject'].astype(str).str.lower().str.contains('unknown', na=False)].copy()
-
-print(f"   • Enregistrements nettoyés (Unknown supprimés): {taille_avant - len(df):,}")
-
-df = df.rename(columns={'Major': 'Filiere', 'Subject': 'Module', 'MajorYear': 'Annee', 'OfficalYear': 'AnneUniversitaire'})
-
-df['Practical'] = pd.to_numeric(df['Practical'], errors='coerce').fillna(0)
-df['Theoretical'] = pd.to_numeric(df['Theoretical'], errors='coerce').fillna(0)
-df['Total'] = pd.to_numeric(df['Total'], errors='coerce').fillna(df['Practical'] + df['Theoretical'])
-df['Note_sur_20'] = df['Total'] / 5 if df['Total'].max() > 20 else df['Total']
-df['Annee'] = pd.to_numeric(df['Annee'], errors='coerce').fillna(1).astype(int)
-df['Semester'] = pd.to_numeric(df['Semester'], errors='coerce').fillna(1).astype(int)
+# Snapshot nettoyé (les CSV ne sont relus que s'ils ont changé)
+df = charger_donnees(RAW_PATH)
 
-# Variable cible
+# Seuil de validation (Needs_Support est calculé au nettoyage)
 SEUIL_VALIDATION = 10
-df['Needs_Support'] = ((df['Status'] == 'Fail') | 
-                        (df['Total'] < 50) | 
-                        (df['Status'].isin(['Absent', 'Debarred', 'Withdrawal']))).astype(int)
 
 # Dictionnaire de traduction Arabe -> Français pour les modules principaux
 TRADUCTION_MODULES = {
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+🌐 Traduction des Noms de Modules
+==================================
+Moteur de traduction construit une fois à partir d'un dictionnaire
+(clé arabe -> nom français):
+- automate d'Aho-Corasick sur les clés: toutes les clés contenues dans un
+  nom sont trouvées en un seul parcours du nom (au lieu d'un test de
+  sous-chaîne par clé du dictionnaire)
+- mémo nom distinct -> traduction: chaque nom n'est analysé qu'une fois
+- traduire_serie(): traduction d'une colonne entière (valeurs distinctes
+  traduites une fois, puis réindexées)
+
+Règle de correspondance inchangée: la première clé (dans l'ordre du
+dictionnaire) contenue dans le nom l'emporte.
+"""
+
+from collections import deque
+
+import pandas as pd
+import numpy as np
+
+
+class TraducteurModules:
+    """
+    Traducteur de noms de modules.
+    - traductions: dictionnaire clé -> traduction (l'ordre fixe la priorité)
+    - inverse=True: une clé qui contient le nom correspond aussi
+      (nom abrégé ou tronqué)
+    - repli: fonction appelée sur le nom sans correspondance (par défaut le
+      nom est retourné tel quel)
+    """
+
+    def __init__(self, traductions, inverse=False, repli=None):
+        self.cles = list(traductions.keys())
+        self.valeurs = list(traductions.values())
+        self.inverse = inverse
+        self.repli = repli
+        self._memo = {}
+        self._construire_automate()
+
+    def _construire_automate(self):
+        # Transitions par état, lien d'échec, plus petit rang de clé reconnue
+        self._transitions = [{}]
+        self._echec = [0]
+        self._rang = [None]
+        for rang, cle in enumerate(self.cles):
+            etat = 0
+            for car in cle:
+                suivant = self._transitions[etat].get(car)
+                if suivant is None:
+                    suivant = len(self._transitions)
+                    self._transitions[etat][car] = suivant
+                    self._transitions.append({})
+                    self._echec.append(0)
+                    self._rang.append(None)
+                etat = suivant
+            if self._rang[etat] is None:
+                self._rang[etat] = rang
+
+        # Parcours en largeur: liens d'échec et rangs hérités des suffixes
+        file = deque(self._transitions[0].values())
+        while file:
+            etat = file.popleft()
+            for car, suivant in self._transitions[etat].items():
+                repli = self._echec[etat]
+                while repli and car not in self._transitions[repli]:
+                    repli = self._echec[repli]
+                cible = self._transitions[repli].get(car, 0)
+                self._echec[suivant] = cible if cible != suivant else 0
+                herite = self._rang[self._echec[suivant]]
+                if herite is not None and (self._rang[suivant] is None or herite < self._rang[suivant]):
+                    self._rang[suivant] = herite
+                file.append(suivant)
+
+    def rang_correspondance(self, texte):
+        """Rang de la première clé (ordre du dictionnaire) liée au texte, ou None"""
+        meilleur = None
+        etat = 0
+        for car in texte:
+            while etat and car not in self._transitions[etat]:
+                etat = self._echec[etat]
+            etat = self._transitions[etat].get(car, 0)
+            rang = self._rang[etat]
+            if rang is not None and (meilleur is None or rang < meilleur):
+                meilleur = rang
+                if meilleur == 0:
+                    break
+        if self.inverse:
+            for rang in range(len(self.cles) if meilleur is None else meilleur):
+                if texte in self.cles[rang]:
+                    return rang
+        return meilleur
+
+    def traduire(self, nom):
+        """Traduction d'un nom (mémorisée par nom distinct)"""
+        try:
+            return self._memo[nom]
+        except KeyError:
+            pass
+        except TypeError:  # nom non hachable
+            return self._traduire(nom)
+        traduction = self._memo[nom] = self._traduire(nom)
+        return traduction
+
+    def _traduire(self, nom):
+        rang = self.rang_correspondance(str(nom))
+        if rang is not None:
+            return self.valeurs[rang]
+        return self.repli(nom) if self.repli else nom
+
+    def __call__(self, nom):
+        return self.traduire(nom)
+
+    def traduire_serie(self, serie, traduire=None):
+        """
+        Traduit une colonne entière: chaque valeur distincte n'est traduite
+        qu'une fois. `traduire` permet d'utiliser une fonction d'habillage
+        (par défaut self.traduire).
+        """
+        traduire = traduire or self.traduire
+        codes, distincts = pd.factorize(serie)
+        # Dernière case: traduction des valeurs manquantes (code -1)
+        traductions = np.empty(len(distincts) + 1, dtype=object)
+        traductions[:-1] = [traduire(nom) for nom in distincts]
+        traductions[-1] = traduire(np.nan)
+        return pd.Series(traductions[codes], index=getattr(serie, 'index', None),
+                         name=getattr(serie, 'name', None))
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+🧪 Vérification des Calculs Vectorisés (cible et features)
+============================================================
+Compare les fonctions vectorisées de feature_engineering aux anciennes
+implémentations ligne par ligne (copiées ci-dessous telles quelles):
+- cible_soutien       <-> df.apply(needs_support_ma, axis=1)
+- mentions_ma         <-> Note_sur_20.apply(classification_ma)
+- poles_modules       <-> [categoriser_module(m) for m in modules]
+- absenteisme         <-> groupby('ID').apply(lambda ...)
+
+Jeux de données: les données réelles (raw/ ou snapshot, si présentes) et un
+jeu synthétique avec les cas limites (notes manquantes, nulles, négatives,
+statuts inconnus, catégories, modules arabes / vides / manquants).
+
+Usage:
+    python verifier_vectorisation.py
+    python verifier_vectorisation.py --lignes 500000   -> taille du jeu synthétique
+"""
+
+import sys
+import io
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from feature_engineering import (SEUIL_VALIDATION, STATUTS_ABSENCE, statut_ma, cible_soutien,
+                                 mentions_ma, poles_modules, absenteisme)
+
+# Fixer l'encodage pour les caractères arabes sur Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+# Avertissements de pandas sur les implémentations de référence
+warnings.filterwarnings('ignore')
+
+
+# =============================================================================
+# IMPLÉMENTATIONS DE RÉFÉRENCE (ligne par ligne)
+# =============================================================================
+
+def needs_support_ma(row):
+    if row['Status'] == 'Fail' or row['Statut_MA'] == 'Non_Validé':
+        return 1
+    if pd.notna(row['Note_sur_20']) and row['Note_sur_20'] > 0 and row['Note_sur_20'] < SEUIL_VALIDATION:
+        return 1
+    if pd.notna(row['Total']) and row['Total'] > 0 and row['Total'] < 50:
+        return 1
+    if row['Statut_MA'] in ['Absent', 'Exclu', 'Abandon']:
+        return 1
+    if row['Statut_MA'] == 'En_Attente':
+        return 1
+    return 0
+
+
+def classification_ma(note):
+    if pd.isna(note) or note == 0:
+        return 'Non_Évalué'
+    elif note >= 16:
+        return 'Très_Bien'
+    elif note >= 14:
+        return 'Bien'
+    elif note >= 12:
+        return 'Assez_Bien'
+    elif note >= 10:
+        return 'Passable'
+    else:
+        return 'Non_Validé'
+
+
+def categoriser_module(module):
+    module_lower = str(module).lower()
+    if any(word in module_lower for word in ['رياضيات', 'math', 'جبر', 'algebra', 'analyse', 'probabilité']):
+        return 'Mathematiques'
+    elif any(word in module_lower for word in ['فيزياء', 'physics', 'physique', 'mécanique', 'thermodynamique']):
+        return 'Physique'
+    elif any(word in module_lower for word in ['كهربائية', 'electrical', 'électrique', 'دارات', 'circuits']):
+        return 'Electrique'
+    elif any(word in module_lower for word in ['الكترون', 'electron', 'électronique']):
+        return 'Electronique'
+    elif any(word in module_lower for word in ['ميكانيك', 'mechanical', 'mécanique', 'rdm']):
+        return 'Mecanique'
+    elif any(word in module_lower for word in ['تحكم', 'control', 'automatique', 'régulation']):
+        return 'Automatique'
+    elif any(word in module_lower for word in ['برمج', 'program', 'حاسوب', 'computer', 'informatique', 'algorithme']):
+        return 'Informatique'
+    elif any(word in module_lower for word in ['انكليزية', 'english', 'لغة', 'français', 'communication', 'tec']):
+        return 'Langues_Communication'
+    elif any(word in module_lower for word in ['اقتصاد', 'économie', 'gestion', 'management', 'comptabilité']):
+        return 'Gestion_Economie'
+    else:
+        return 'Autres'
+
+
+def taux_absenteisme(df):
+    absence = df.groupby('ID').apply(
+        lambda x: x['Statut_MA'].isin(STATUTS_ABSENCE).sum() / len(x)
+    ).reset_index()
+    absence.columns = ['ID', 'taux_absenteisme']
+    return absence
+
+
+# =============================================================================
+# JEUX DE DONNÉES
+# =============================================================================
+
+MODULES_TEST = [
+    'رياضيات 1', 'الفيزياء العامة', 'لغة انكليزية 2', 'الورش الكهربائية والالكترونية', 'تحكم حديث',
+    'Mathématiques Appliquées', 'Mécanique des fluides', 'RDM', 'Programmation C', 'Architecture',
+    'Thermodynamique', 'Electronique numérique', 'Gestion de projet', 'Technique d\'expression',
+    'Circuits électriques', 'MATH', '', 'nan', 'Analyse (1) [a+b]*', 'Économie générale'
+]
+STATUTS_TEST = ['Pass', 'Fail', 'Absent', 'Debarred', 'Withdrawal', 'Withhold', 'Exempt', 'Inconnu']
+
+
+def jeu_synthetique(n, graine=0):
+    """Lignes aléatoires couvrant les cas limites de chaque critère"""
+    rng = np.random.default_rng(graine)
+    total = rng.choice([np.nan, 0, -5, 49.99, 50, 60, 100], n) * rng.choice([1, 1, 0.5], n)
+    note = np.where(rng.random(n) < 0.5, total / 5, rng.choice([np.nan, 0, -1, 9.99, 10, 12, 14, 16, 20], n))
+    modules = np.array(MODULES_TEST + [None], dtype=object)[rng.integers(0, len(MODULES_TEST) + 1, n)]
+    df = pd.DataFrame({
+        'ID': rng.integers(0, max(1, n // 8), n).astype(str),
+        'Module': modules,
+        'Status': rng.choice(STATUTS_TEST, n),
+        'Total': total,
+        'Note_sur_20': note
+    })
+    df['Statut_MA'] = statut_ma(df['Status'])
+    return df
+
+
+def jeu_reel():
+    """Données nettoyées (None si ni raw/ ni snapshot)"""
+    try:
+        from data_snapshot import charger_donnees
+        df = charger_donnees(verbose=False)
+    except Exception as e:
+        print(f"⚠️ Données réelles indisponibles ({e})")
+        return None
+    df = df.copy()
+    for col in ['ID', 'Module', 'Status']:
+        df[col] = df[col].astype(object)
+    df['Statut_MA'] = statut_ma(df['Status'])
+    return df
+
+
+# =============================================================================
+# COMPARAISONS
+# =============================================================================
+
+def comparer(nom, reference, vectorise):
+    """Exécute les deux versions, compare leurs sorties et affiche les durées"""
+    debut = time.perf_counter()
+    attendu = reference()
+    duree_reference = time.perf_counter() - debut
+    debut = time.perf_counter()
+    obtenu = vectorise()
+    duree_vectorise = time.perf_counter() - debut
+
+    try:
+        if isinstance(attendu, pd.DataFrame):
+            pd.testing.assert_frame_equal(obtenu.reset_index(drop=True), attendu.reset_index(drop=True))
+        else:
+            pd.testing.assert_series_equal(pd.Series(obtenu).reset_index(drop=True),
+                                           pd.Series(attendu).reset_index(drop=True),
+                                           check_names=False, check_dtype=False)
+            if len(attendu) and pd.Series(obtenu).dtype != pd.Series(attendu).dtype:
+                raise AssertionError(f"types différents: {pd.Series(obtenu).dtype} != {pd.Series(attendu).dtype}")
+    except AssertionError as e:
+        print(f"   ❌ {nom}: différences\n{e}")
+        return False
+    gain = duree_reference / duree_vectorise if duree_vectorise > 0 else float('inf')
+    print(f"   ✅ {nom:<15} identiques  ({duree_reference:.3f}s -> {duree_vectorise:.3f}s, x{gain:.0f})")
+    return True
+
+
+def verifier(df):
+    resultats = [
+        comparer('cible_soutien', lambda: df.apply(needs_support_ma, axis=1) if len(df)
+                 else pd.Series([], index=df.index, dtype=int),
+                 lambda: cible_soutien(df)),
+        comparer('mentions_ma', lambda: df['Note_sur_20'].apply(classification_ma).astype(object),
+                 lambda: mentions_ma(df['Note_sur_20'])),
+        comparer('poles_modules', lambda: pd.Series([categoriser_module(m) for m in df['Module']], dtype=object),
+                 lambda: poles_modules(df['Module'])),
+    ]
+    if len(df):
+        resultats.append(comparer('absenteisme', lambda: taux_absenteisme(df), lambda: absenteisme(df)))
+    # Statuts catégoriels (snapshot compact de l'API)
+    categoriel = df.assign(Status=df['Status'].astype('category'), Statut_MA=df['Statut_MA'].astype('category'))
+    resultats.append(comparer('cible (catég.)', lambda: df.apply(needs_support_ma, axis=1) if len(df)
+                              else pd.Series([], index=df.index, dtype=int),
+                              lambda: cible_soutien(categoriel)))
+    return all(resultats)
+
+
+if __name__ == "__main__":
+    n = 200_000
+    if '--lignes' in sys.argv:
+        n = int(sys.argv[sys.argv.index('--lignes') + 1])
+
+    print("=" * 70)
+    print("🧪 VÉRIFICATION DES CALCULS VECTORISÉS")
+    print("=" * 70)
+
+    jeux = [('synthétique', jeu_synthetique(n)), ('vide', jeu_synthetique(0)), ('une ligne', jeu_synthetique(1))]
+    df_reel = jeu_reel()
+    if df_reel is not None:
+        jeux.insert(0, ('données réelles', df_reel))
+
+    ok = True
+    for nom, df in jeux:
+        print(f"\n📊 Jeu {nom}: {len(df):,} lignes")
+        ok = verifier(df) and ok
+
+    print("\n" + ("✅ Sorties identiques aux implémentations ligne par ligne" if ok
+                  else "❌ Des sorties diffèrent des implémentations ligne par ligne"))
+    sys.exit(0 if ok else 1)